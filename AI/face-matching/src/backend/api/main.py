@@ -4,18 +4,24 @@ FastAPI main application for Smart Parking System with Face Recognition
 from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import asyncio
 import logging
 import sys
 import os
-from typing import Optional
+from typing import Any, Dict, Optional
 
 # Add backend directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.models.models.vggface2 import VGGFace2Model
-from backend.api.schemas import FaceMatchRequest, FaceMatchResponse, RegisterResponse
+from backend.models.models.face_detectors import create_face_detector
+from backend.inference.batcher import EmbeddingBatcher
+from backend.inference.executor import InferenceExecutor
+from backend.api.schemas import FaceMatchRequest, FaceMatchResponse, RegisterResponse, IdentifyRequest, IdentifyResponse
 from backend.utils.firebase import FirebaseService
 from backend.utils.cloudinary import CloudinaryService
+from backend.utils.evidence_queue import EvidenceUploadQueue
+from backend.utils.image_decode import DecodedFrame
 from backend.config.settings import settings
 
 # Configure logging
@@ -26,6 +32,25 @@ logger = logging.getLogger(__name__)
 vggface_model = VGGFace2Model(model_type="auto")  # Automatically choose best available backend
 firebase_service = FirebaseService()
 cloudinary_service = CloudinaryService()
+inference_executor = InferenceExecutor(
+    kind=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_WORKERS
+)
+embedding_batcher = EmbeddingBatcher(
+    vggface_model,
+    max_batch_size=settings.BATCH_MAX_SIZE,
+    max_wait_ms=settings.BATCH_MAX_WAIT_MS
+)
+# Frames are decoded (JPEG DCT scaling) only as large as the face detector needs
+decode_width = settings.FACE_DETECTION_WIDTH if settings.DECODE_REDUCED else 0
+evidence_queue = EvidenceUploadQueue(
+    uploader=cloudinary_service.upload_encoded_evidence,
+    on_uploaded=firebase_service.update_evidence_url,
+    spool_dir=settings.EVIDENCE_SPOOL_DIR,
+    max_size=settings.EVIDENCE_QUEUE_SIZE,
+    workers=settings.EVIDENCE_WORKERS,
+    max_retries=settings.EVIDENCE_MAX_RETRIES
+)
 
 app = FastAPI(
     title="Smart Parking Face Recognition API",
@@ -55,11 +80,44 @@ async def verify_api_key(x_api_key: str = Header(...)):
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting Smart Parking Face Recognition API...")
+    logger.info(f"Loading face detector ({settings.FACE_DETECTOR})...")
+    vggface_model.set_face_detector(create_face_detector(
+        settings.FACE_DETECTOR,
+        model_dir=settings.FACE_DETECTOR_MODEL_DIR,
+        confidence=settings.FACE_DETECTOR_CONFIDENCE
+    ), detection_width=settings.FACE_DETECTION_WIDTH)
     logger.info("Loading VGGFace model...")
     await vggface_model.load_model()
     logger.info("VGGFace model loaded successfully")
+    if inference_executor.kind == "process" and vggface_model.supports_batching():
+        logger.warning("Process pool is not supported for the PyTorch backend, using thread pool")
+        inference_executor.kind = "thread"
+    inference_executor.start()
+    vggface_model.set_executor(inference_executor)
+    if settings.BATCHING_ENABLED and vggface_model.supports_batching():
+        await embedding_batcher.start()
+        vggface_model.set_batcher(embedding_batcher)
+    if settings.EMBEDDING_CACHE_WARM and firebase_service.is_connected():
+        await firebase_service.warm_embedding_cache()
+    if settings.FACE_INDEX_ENABLED and firebase_service.is_connected():
+        await firebase_service.load_face_index()
+    if settings.EVIDENCE_ASYNC and cloudinary_service.is_configured():
+        await evidence_queue.start()
     logger.info("API ready to serve requests")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background workers on shutdown"""
+    await evidence_queue.stop()
+    await firebase_service.flush_writes()
+    vggface_model.set_batcher(None)
+    await embedding_batcher.stop()
+    vggface_model.set_executor(None)
+    inference_executor.shutdown()
+    await cloudinary_service.close()
+    if settings.FACE_INDEX_ENABLED:
+        firebase_service.save_face_index()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -76,9 +134,76 @@ async def health_check():
         "status": "healthy",
         "model_loaded": vggface_model.is_loaded(),
         "firebase_connected": firebase_service.is_connected(),
-        "cloudinary_configured": cloudinary_service.is_configured()
+        "cloudinary_configured": cloudinary_service.is_configured(),
+        "embedding_cache": firebase_service.embedding_cache.get_stats(),
+        "firestore_writes": firebase_service.write_buffer.get_stats() if firebase_service.write_buffer else None,
+        "face_index": firebase_service.face_index.get_stats(),
+        "image_downloads": cloudinary_service.http_client.get_stats(),
+        "image_cache": cloudinary_service.image_cache.get_stats() if cloudinary_service.image_cache else None,
+        "evidence_uploads": evidence_queue.get_stats(),
+        "inference": {
+            "face_detector": vggface_model.get_face_detector().get_stats(),
+            "executor": inference_executor.get_metrics(),
+            "batching": embedding_batcher.get_stats()
+        }
     }
 
+async def submit_evidence(
+    frame: DecodedFrame,
+    plate_number: str,
+    is_registration: bool,
+    source_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Hand the evidence image to the background upload queue
+
+    The face document must already exist: the queue patches its image URL
+    once the upload completes. Falls back to an inline upload when the queue
+    is disabled or full. When EVIDENCE_MODE is copy or reference and the
+    source image is already on our Cloudinary account, it is copied there
+    server-side or recorded as-is instead of being re-encoded and uploaded.
+
+    A failed inline upload does not fail the request (the face document is
+    already saved); it is reported in evidence_error instead.
+
+    Returns:
+        Response fields: evidence_url (when recorded inline), evidence_pending
+        (when queued) and evidence_error (when the inline upload failed)
+    """
+    async def evidence_image():
+        # The reduced decode is enough when evidence is downscaled to at most its width
+        return await asyncio.to_thread(frame.for_width, settings.EVIDENCE_MAX_WIDTH)
+
+    reuse_source = (
+        source_url is not None
+        and settings.EVIDENCE_MODE != "upload"
+        and cloudinary_service.parse_source_url(source_url) is not None
+    )
+
+    try:
+        if reuse_source and settings.EVIDENCE_MODE == "reference":
+            await firebase_service.update_evidence_url(plate_number, source_url, is_registration)
+            return {"evidence_url": source_url, "evidence_pending": False}
+
+        if evidence_queue.is_running():
+            if reuse_source:
+                job_id = await evidence_queue.enqueue_copy(source_url, plate_number, is_registration)
+            else:
+                jpeg = cloudinary_service.encode_evidence(await evidence_image())
+                job_id = await evidence_queue.enqueue(jpeg, plate_number, is_registration)
+            if job_id:
+                return {"evidence_url": None, "evidence_pending": True}
+
+        if reuse_source:
+            evidence_url = await cloudinary_service.copy_evidence(source_url, plate_number, is_registration)
+        else:
+            evidence_url = await cloudinary_service.upload_evidence(await evidence_image(), plate_number, is_registration)
+        await firebase_service.update_evidence_url(plate_number, evidence_url, is_registration)
+        return {"evidence_url": evidence_url, "evidence_pending": False}
+    except Exception as e:
+        logger.error(f"Evidence upload for plate {plate_number} failed: {str(e)}")
+        return {"evidence_url": None, "evidence_pending": False, "evidence_error": str(e)}
+
 @app.post("/facematch", response_model=dict)
 async def face_match(
     request: FaceMatchRequest,
@@ -97,38 +222,37 @@ async def face_match(
     try:
         logger.info(f"Processing face match request for plate: {request.plate_number}, gate: {request.gate}")
 
-        # Download and process image with face detection
-        image = await cloudinary_service.download_image(request.image_url)
+        # Download and decode at the detection working resolution (full resolution on demand)
+        frame = await cloudinary_service.download_frame(request.image_url, decode_width)
 
         # Extract face embedding (includes detection, preprocessing, and embedding extraction)
-        embedding = await vggface_model.process_image_with_face_detection(image)
-
-        # Upload image as evidence
-        is_registration = (request.gate == 0)
-        evidence_url = await cloudinary_service.upload_evidence(
-            image, request.plate_number, is_registration
-        )
+        embedding = await vggface_model.process_image_with_face_detection(frame)
 
         if request.gate == 0:  # Registration
-            # Save embedding and metadata to Firebase
+            # Save embedding and metadata to Firebase (evidence URL is patched in after upload)
             await firebase_service.save_face_data(
                 plate_number=request.plate_number,
                 embedding=embedding,
-                image_url=evidence_url
+                image_url=None
+            )
+
+            # Upload image as evidence in the background
+            evidence = await submit_evidence(
+                frame, request.plate_number, is_registration=True, source_url=str(request.image_url)
             )
 
             logger.info(f"Successfully registered face for plate: {request.plate_number}")
             return {
                 "success": True,
                 "message": f"Face registered successfully for plate {request.plate_number}",
-                "evidence_url": evidence_url
+                **evidence
             }
 
         elif request.gate == 1:  # Verification
-            # Retrieve stored embedding
-            stored_data = await firebase_service.get_face_data(request.plate_number)
+            # Retrieve stored embedding (local cache first)
+            stored_embedding = await firebase_service.get_face_embedding(request.plate_number)
 
-            if not stored_data:
+            if stored_embedding is None:
                 logger.warning(f"No face data found for plate: {request.plate_number}")
                 return {
                     "matched": False,
@@ -138,12 +262,13 @@ async def face_match(
 
             # Calculate similarity
             similarity_score = vggface_model.calculate_similarity(
-                embedding, stored_data["embedding"]
+                embedding, stored_embedding
             )
 
-            # Update last verification image
-            await firebase_service.update_last_image(
-                request.plate_number, evidence_url
+            # Update verification bookkeeping, then upload the image as evidence in the background
+            await firebase_service.update_last_image(request.plate_number, None)
+            evidence = await submit_evidence(
+                frame, request.plate_number, is_registration=False, source_url=str(request.image_url)
             )
 
             is_matched = similarity_score >= settings.SIMILARITY_THRESHOLD
@@ -155,7 +280,7 @@ async def face_match(
                 "matched": is_matched,
                 "score": similarity_score,
                 "threshold": settings.SIMILARITY_THRESHOLD,
-                "evidence_url": evidence_url
+                **evidence
             }
 
         else:
@@ -165,6 +290,47 @@ async def face_match(
         logger.error(f"Error processing face match request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/identify", response_model=IdentifyResponse)
+async def identify_face(
+    request: IdentifyRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    1:N identification: find the registered plates whose faces best match an image
+
+    Args:
+        request: IdentifyRequest containing image_url and optional top_k
+
+    Returns:
+        Candidate plates sorted by descending similarity score
+    """
+    if not settings.FACE_INDEX_ENABLED:
+        raise HTTPException(status_code=503, detail="Face identification index is disabled")
+
+    try:
+        frame = await cloudinary_service.download_frame(request.image_url, decode_width)
+        embedding = await vggface_model.process_image_with_face_detection(frame)
+
+        top_k = request.top_k or settings.IDENTIFY_TOP_K
+        candidates = await firebase_service.identify_face(embedding, top_k=top_k)
+        for candidate in candidates:
+            candidate["matched"] = candidate["score"] >= settings.SIMILARITY_THRESHOLD
+
+        best_match = candidates[0]["plate_number"] if candidates and candidates[0]["matched"] else None
+        logger.info(f"Face identification: best_match={best_match}, "
+                   f"candidates={len(candidates)}, indexed={len(firebase_service.face_index)}")
+
+        return {
+            "best_match": best_match,
+            "candidates": candidates,
+            "threshold": settings.SIMILARITY_THRESHOLD,
+            "indexed_faces": len(firebase_service.face_index)
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing face identification request: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
 @app.get("/face/{plate_number}")
 async def get_face_info(
     plate_number: str,
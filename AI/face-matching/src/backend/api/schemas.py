@@ -19,11 +19,52 @@ class FaceMatchRequest(BaseModel):
             }
         }
 
+class IdentifyRequest(BaseModel):
+    """Request model for 1:N face identification endpoint"""
+    image_url: HttpUrl = Field(..., description="Cloudinary URL of the image")
+    top_k: Optional[int] = Field(None, ge=1, le=50, description="Maximum number of candidate plates")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "image_url": "https://res.cloudinary.com/your-cloud/image/upload/v1/sample.jpg",
+                "top_k": 5
+            }
+        }
+
+class IdentifyCandidate(BaseModel):
+    """Candidate plate returned by identification"""
+    plate_number: str = Field(..., description="Vehicle plate number")
+    score: float = Field(..., ge=0.0, le=1.0, description="Similarity score")
+    matched: bool = Field(..., description="Whether the score reaches the threshold")
+
+class IdentifyResponse(BaseModel):
+    """Response model for 1:N face identification"""
+    best_match: Optional[str] = Field(None, description="Best candidate plate above the threshold")
+    candidates: List[IdentifyCandidate] = Field(default_factory=list, description="Candidates by descending score")
+    threshold: float = Field(..., description="Threshold used for matching")
+    indexed_faces: int = Field(..., description="Number of faces searched")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "best_match": "ABC123",
+                "candidates": [
+                    {"plate_number": "ABC123", "score": 0.91, "matched": True},
+                    {"plate_number": "ABD123", "score": 0.62, "matched": True}
+                ],
+                "threshold": 0.5,
+                "indexed_faces": 1200
+            }
+        }
+
 class RegisterResponse(BaseModel):
     """Response model for registration (gate=0)"""
     success: bool = Field(..., description="Registration success status")
     message: str = Field(..., description="Status message")
     evidence_url: Optional[str] = Field(None, description="URL of uploaded evidence image")
+    evidence_pending: bool = Field(False, description="Evidence upload queued, URL recorded in Firestore when done")
+    evidence_error: Optional[str] = Field(None, description="Why the inline evidence upload failed, if it did")
 
     class Config:
         schema_extra = {
@@ -40,6 +81,8 @@ class VerificationResponse(BaseModel):
     score: float = Field(..., ge=0.0, le=1.0, description="Similarity score")
     threshold: Optional[float] = Field(None, description="Threshold used for matching")
     evidence_url: Optional[str] = Field(None, description="URL of uploaded evidence image")
+    evidence_pending: bool = Field(False, description="Evidence upload queued, URL recorded in Firestore when done")
+    evidence_error: Optional[str] = Field(None, description="Why the inline evidence upload failed, if it did")
     message: Optional[str] = Field(None, description="Additional message if needed")
 
     class Config:
@@ -65,6 +108,8 @@ class FaceMatchResponse(BaseModel):
 
     # Common fields
     evidence_url: Optional[str] = None
+    evidence_pending: Optional[bool] = None
+    evidence_error: Optional[str] = None
 
 class FaceInfoResponse(BaseModel):
     """Response model for face information retrieval"""
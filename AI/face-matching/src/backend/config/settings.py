@@ -36,6 +36,27 @@ class Settings:
         self.GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
         self.FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
 
+        # Firestore Write Batching (verification bookkeeping and evidence URLs)
+        self.FIRESTORE_BATCH_WRITES = os.getenv("FIRESTORE_BATCH_WRITES", "True").lower() == "true"
+        self.FIRESTORE_BATCH_SIZE = int(os.getenv("FIRESTORE_BATCH_SIZE", "400"))  # max 500
+        self.FIRESTORE_BATCH_DELAY_MS = float(os.getenv("FIRESTORE_BATCH_DELAY_MS", "50"))
+
+        # Embedding Storage Configuration
+        self.EMBEDDING_CODEC = os.getenv("EMBEDDING_CODEC", "float32").lower()  # float32, float16, int8
+
+        # Embedding Cache Configuration
+        self.EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+        self.EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))  # seconds, 0 = no expiry
+        self.EMBEDDING_CACHE_WARM = os.getenv("EMBEDDING_CACHE_WARM", "False").lower() == "true"
+
+        # 1:N Identification Configuration
+        self.FACE_INDEX_ENABLED = os.getenv("FACE_INDEX_ENABLED", "True").lower() == "true"
+        self.IDENTIFY_TOP_K = int(os.getenv("IDENTIFY_TOP_K", "5"))
+        self.FACE_INDEX_TYPE = os.getenv("FACE_INDEX_TYPE", "flat").lower()  # flat, ivf
+        self.FACE_INDEX_NLIST = int(os.getenv("FACE_INDEX_NLIST", "0"))  # 0 = sqrt(gallery size)
+        self.FACE_INDEX_NPROBE = int(os.getenv("FACE_INDEX_NPROBE", "8"))
+        self.FACE_INDEX_PATH = os.getenv("FACE_INDEX_PATH", "")  # empty = rebuild from Firestore on startup
+
         # Cloudinary Configuration
         self.CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME", "")
         self.CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY", "")
@@ -54,12 +75,49 @@ class Settings:
         self.MODEL_DEVICE = os.getenv("MODEL_DEVICE", "auto")  # auto, cpu, cuda
         self.MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "./models")
 
+        # Face Detector Configuration
+        self.FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar").lower()  # haar, ssd, yunet
+        self.FACE_DETECTOR_MODEL_DIR = os.getenv("FACE_DETECTOR_MODEL_DIR", self.MODEL_CACHE_DIR)
+        self.FACE_DETECTOR_CONFIDENCE = float(os.getenv("FACE_DETECTOR_CONFIDENCE", "0.6"))
+        self.FACE_DETECTION_WIDTH = int(os.getenv("FACE_DETECTION_WIDTH", "640"))  # 0 = full resolution
+        self.DECODE_REDUCED = os.getenv("DECODE_REDUCED", "True").lower() == "true"  # JPEG DCT-scaled decode to FACE_DETECTION_WIDTH
+
+        # Embedding Batching Configuration
+        self.BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "True").lower() == "true"
+        self.BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+        self.BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+        # Inference Executor Configuration
+        self.INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()  # thread, process
+        self.INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+        # Evidence Upload Configuration
+        self.EVIDENCE_ASYNC = os.getenv("EVIDENCE_ASYNC", "True").lower() == "true"
+        self.EVIDENCE_SPOOL_DIR = os.getenv("EVIDENCE_SPOOL_DIR", "./evidence_spool")
+        self.EVIDENCE_QUEUE_SIZE = int(os.getenv("EVIDENCE_QUEUE_SIZE", "100"))
+        self.EVIDENCE_WORKERS = int(os.getenv("EVIDENCE_WORKERS", "2"))
+        self.EVIDENCE_MAX_RETRIES = int(os.getenv("EVIDENCE_MAX_RETRIES", "5"))
+        self.EVIDENCE_JPEG_QUALITY = int(os.getenv("EVIDENCE_JPEG_QUALITY", "90"))
+        self.EVIDENCE_MAX_WIDTH = int(os.getenv("EVIDENCE_MAX_WIDTH", "0"))  # 0 = keep full resolution
+        # Source images already on this Cloudinary account: upload (re-encode), copy (server-side), reference (reuse as-is)
+        self.EVIDENCE_MODE = os.getenv("EVIDENCE_MODE", "upload").lower()
+
         # Image Processing Configuration
         self.MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", "5242880"))  # 5MB
         self.ALLOWED_IMAGE_FORMATS = ["jpg", "jpeg", "png", "webp"]
 
+        # Decoded Image Cache Configuration
+        self.IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "256"))  # 0 = disabled
+        self.IMAGE_CACHE_URL_TTL = float(os.getenv("IMAGE_CACHE_URL_TTL", "300"))  # seconds, 0 = no expiry
+        self.IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "")  # empty = memory only; share it between services
+        self.IMAGE_CACHE_DISK_MAX_MB = int(os.getenv("IMAGE_CACHE_DISK_MAX_MB", "1024"))
+
         # Request Configuration
         self.REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
+        self.HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+        self.HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+        self.HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # seconds
+        self.HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
 
         # Security Configuration
         self.CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -77,6 +135,31 @@ class Settings:
         # if not self.GOOGLE_APPLICATION_CREDENTIALS and not self.FIREBASE_PROJECT_ID:
         #     required_env_vars.append("GOOGLE_APPLICATION_CREDENTIALS or FIREBASE_PROJECT_ID")
 
+        if self.EMBEDDING_CODEC not in ("float32", "float16", "int8"):
+            raise ValueError(
+                f"Invalid EMBEDDING_CODEC: {self.EMBEDDING_CODEC}. Must be 'float32', 'float16' or 'int8'"
+            )
+
+        if self.FACE_INDEX_TYPE not in ("flat", "ivf"):
+            raise ValueError(
+                f"Invalid FACE_INDEX_TYPE: {self.FACE_INDEX_TYPE}. Must be 'flat' or 'ivf'"
+            )
+
+        if self.EVIDENCE_MODE not in ("upload", "copy", "reference"):
+            raise ValueError(
+                f"Invalid EVIDENCE_MODE: {self.EVIDENCE_MODE}. Must be 'upload', 'copy' or 'reference'"
+            )
+
+        if not 1 <= self.EVIDENCE_JPEG_QUALITY <= 100:
+            raise ValueError(
+                f"Invalid EVIDENCE_JPEG_QUALITY: {self.EVIDENCE_JPEG_QUALITY}. Must be between 1 and 100"
+            )
+
+        if self.INFERENCE_EXECUTOR not in ("thread", "process"):
+            raise ValueError(
+                f"Invalid INFERENCE_EXECUTOR: {self.INFERENCE_EXECUTOR}. Must be 'thread' or 'process'"
+            )
+
         if required_env_vars:
             raise ValueError(
                 f"Missing required environment variables: {', '.join(required_env_vars)}"
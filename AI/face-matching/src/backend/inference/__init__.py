@@ -0,0 +1 @@
+# Inference engine utilities
@@ -0,0 +1,126 @@
+"""
+Micro-batching engine for face embedding extraction
+"""
+import asyncio
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    """Collects concurrent embedding requests and runs them as one batched forward pass"""
+
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        """
+        Initialize the batcher
+
+        Args:
+            model: Loaded VGGFace2Model exposing embed_batch()
+            max_batch_size: Maximum number of faces per forward pass
+            max_wait_ms: Maximum time to wait for more faces after the first one arrives
+        """
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches = 0
+        self._items = 0
+
+    async def start(self):
+        """Start the background batching worker"""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Embedding batcher started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.1f})")
+
+    async def stop(self):
+        """Stop the worker and fail any request still waiting in the queue"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher stopped"))
+        logger.info("Embedding batcher stopped")
+
+    def is_running(self) -> bool:
+        """Check if the batching worker is running"""
+        return self._worker is not None and not self._worker.done()
+
+    async def submit(self, processed_input: Any) -> List[float]:
+        """
+        Queue a preprocessed face and wait for its embedding
+
+        Args:
+            processed_input: Preprocessed face as returned by VGGFace2Model.preprocess_image
+
+        Returns:
+            Face embedding as list
+        """
+        if not self.is_running():
+            raise RuntimeError("Embedding batcher is not running. Call start() first.")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((processed_input, future))
+        return await future
+
+    async def _run(self):
+        """Worker loop: gather a batch, run it, fan results back out"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._process_batch(batch)
+
+    async def _process_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run one forward pass for the batch and resolve the waiting futures"""
+        inputs = [processed_input for processed_input, _ in batch]
+        try:
+            embeddings = await self.model.run_blocking(self.model.embed_batch, inputs)
+        except Exception as e:
+            logger.error(f"Error running embedding batch of {len(batch)}: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._items += len(batch)
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def get_stats(self) -> dict:
+        """Get batching statistics"""
+        return {
+            "running": self.is_running(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": (self._items / self._batches) if self._batches else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0
+        }
@@ -0,0 +1,131 @@
+"""
+Dedicated executor for blocking model inference work
+"""
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process")
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any]:
+    """Run func and return the wall-clock start time with its result"""
+    started = time.time()
+    return started, func(*args, **kwargs)
+
+class InferenceExecutor:
+    """Runs blocking OpenCV/PyTorch work off the asyncio event loop"""
+
+    def __init__(self, kind: str = "thread", max_workers: int = 2, metrics_window: int = 1000):
+        """
+        Initialize the executor
+
+        Args:
+            kind: "thread" for torch/OpenCV (they release the GIL),
+                  "process" for pure-Python backends
+            max_workers: Number of worker threads or processes
+            metrics_window: Number of recent jobs kept for percentile metrics
+        """
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Invalid executor kind: {kind}. Must be one of {EXECUTOR_KINDS}")
+
+        self.kind = kind
+        self.max_workers = max(1, int(max_workers))
+        self._executor: Optional[Executor] = None
+
+        # All counters are updated from the event loop thread only
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_times = deque(maxlen=metrics_window)
+        self._run_times = deque(maxlen=metrics_window)
+
+    def start(self):
+        """Create the worker pool"""
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+        logger.info(f"Inference executor started ({self.kind} pool, {self.max_workers} workers)")
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the worker pool"""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=wait)
+        self._executor = None
+        logger.info("Inference executor stopped")
+
+    def is_running(self) -> bool:
+        """Check if the worker pool is running"""
+        return self._executor is not None
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the pool and await its result
+
+        Args:
+            func: Callable to run (must be picklable for the process pool)
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Return value of func
+        """
+        if self._executor is None:
+            raise RuntimeError("Inference executor is not running. Call start() first.")
+
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self._submitted += 1
+        try:
+            started, result = await loop.run_in_executor(
+                self._executor, functools.partial(_timed_call, func, args, kwargs)
+            )
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._completed += 1
+
+        self._wait_times.append(max(0.0, started - submitted))
+        self._run_times.append(time.time() - started)
+        return result
+
+    def queue_depth(self) -> int:
+        """Number of jobs submitted but not yet picked up by a worker"""
+        return max(0, self.in_flight() - self.max_workers)
+
+    def in_flight(self) -> int:
+        """Number of jobs submitted but not yet completed"""
+        return self._submitted - self._completed
+
+    def get_metrics(self) -> dict:
+        """Get queue-depth and wait-time metrics"""
+        wait_ms = np.array(self._wait_times) * 1000
+        run_ms = np.array(self._run_times) * 1000
+        return {
+            "kind": self.kind,
+            "running": self.is_running(),
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth(),
+            "in_flight": self.in_flight(),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "wait_ms_avg": float(wait_ms.mean()) if wait_ms.size else 0.0,
+            "wait_ms_p95": float(np.percentile(wait_ms, 95)) if wait_ms.size else 0.0,
+            "wait_ms_max": float(wait_ms.max()) if wait_ms.size else 0.0,
+            "run_ms_avg": float(run_ms.mean()) if run_ms.size else 0.0
+        }
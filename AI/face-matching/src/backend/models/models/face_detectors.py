@@ -0,0 +1,277 @@
+"""
+Pluggable face detectors with per-thread instance pools
+Supports: Haar cascade, OpenCV DNN SSD (res10) and YuNet
+"""
+import cv2
+import numpy as np
+import threading
+import logging
+import os
+from typing import Callable, Dict, List, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# (x, y, w, h) in pixel coordinates of the input image
+FaceBox = Tuple[int, int, int, int]
+
+class ThreadLocalPool:
+    """Lazily creates one instance per thread from a factory"""
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def get(self):
+        """Get the calling thread's instance, creating it on first use"""
+        instance = getattr(self._local, "instance", None)
+        if instance is None:
+            instance = self._factory()
+            self._local.instance = instance
+            with self._lock:
+                self._created += 1
+        return instance
+
+    def size(self) -> int:
+        """Number of instances created so far"""
+        return self._created
+
+    def __getstate__(self):
+        """Thread-local instances are not picklable; workers rebuild their own"""
+        return {"_factory": self._factory}
+
+    def __setstate__(self, state):
+        self.__init__(state["_factory"])
+
+class FaceDetector:
+    """Base class for face detectors"""
+
+    name = "base"
+    accepts_grayscale = False
+
+    def __init__(self):
+        self._pool = ThreadLocalPool(self._create_instance)
+        self._loaded = False
+
+    def load(self):
+        """Load the detector once (fails fast if model files are missing)"""
+        self._pool.get()
+        self._loaded = True
+        logger.info(f"Face detector loaded: {self.name}")
+
+    def is_loaded(self) -> bool:
+        """Check if the detector has been loaded"""
+        return self._loaded
+
+    def detect(self, image: np.ndarray) -> List[FaceBox]:
+        """
+        Detect faces in an image
+
+        Args:
+            image: Input image as numpy array (BGR format from OpenCV)
+
+        Returns:
+            List of (x, y, w, h) face boxes
+        """
+        return self._detect(self._pool.get(), image)
+
+    def detect_downscaled(self, image: np.ndarray, target_width: int = 0) -> List[FaceBox]:
+        """
+        Detect faces on a downscaled pyramid level and map boxes back to the input frame
+
+        Args:
+            image: Input image as numpy array (BGR format from OpenCV)
+            target_width: Width to run detection at; 0 or >= image width detects at full resolution
+
+        Returns:
+            List of (x, y, w, h) face boxes in input image coordinates
+        """
+        h, w = image.shape[:2]
+        if not target_width or w <= target_width:
+            return self.detect(image)
+
+        level = image
+        if self.accepts_grayscale and image.ndim == 3:
+            level = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        # Halve with pyrDown while possible, then resize the remainder with INTER_AREA
+        while level.shape[1] // 2 >= target_width:
+            level = cv2.pyrDown(level)
+        if level.shape[1] > target_width:
+            target_height = max(1, round(level.shape[0] * target_width / level.shape[1]))
+            level = cv2.resize(level, (target_width, target_height), interpolation=cv2.INTER_AREA)
+
+        scale_x = w / level.shape[1]
+        scale_y = h / level.shape[0]
+        faces = []
+        for x, y, fw, fh in self.detect(level):
+            x0, y0 = max(0, round(x * scale_x)), max(0, round(y * scale_y))
+            x1, y1 = min(w, round((x + fw) * scale_x)), min(h, round((y + fh) * scale_y))
+            if x1 > x0 and y1 > y0:
+                faces.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+        return faces
+
+    def get_stats(self) -> dict:
+        """Get detector statistics"""
+        return {"name": self.name, "loaded": self._loaded, "instances": self._pool.size()}
+
+    def _create_instance(self):
+        raise NotImplementedError
+
+    def _detect(self, instance, image: np.ndarray) -> List[FaceBox]:
+        raise NotImplementedError
+
+class HaarFaceDetector(FaceDetector):
+    """OpenCV Haar cascade detector (CascadeClassifier is not thread-safe)"""
+
+    name = "haar"
+    accepts_grayscale = True
+
+    def __init__(
+        self,
+        cascade_path: str = cv2.data.haarcascades + "haarcascade_frontalface_default.xml",
+        scale_factor: float = 1.1,
+        min_neighbors: int = 5,
+        min_size: Tuple[int, int] = (30, 30)
+    ):
+        self.cascade_path = cascade_path
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        super().__init__()
+
+    def _create_instance(self):
+        cascade = cv2.CascadeClassifier(self.cascade_path)
+        if cascade.empty():
+            raise RuntimeError(f"Failed to load Haar cascade: {self.cascade_path}")
+        return cascade
+
+    def _detect(self, cascade, image: np.ndarray) -> List[FaceBox]:
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=self.min_size
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+class SsdFaceDetector(FaceDetector):
+    """OpenCV DNN ResNet-10 SSD detector (res10_300x300)"""
+
+    name = "ssd"
+
+    def __init__(
+        self,
+        model_dir: str = "models",
+        prototxt: str = "deploy.prototxt",
+        weights: str = "res10_300x300_ssd_iter_140000.caffemodel",
+        confidence: float = 0.6
+    ):
+        self.prototxt_path = os.path.join(model_dir, prototxt)
+        self.weights_path = os.path.join(model_dir, weights)
+        self.confidence = confidence
+        super().__init__()
+
+    def _create_instance(self):
+        for path in (self.prototxt_path, self.weights_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"SSD face detector file not found: {path}")
+        return cv2.dnn.readNetFromCaffe(self.prototxt_path, self.weights_path)
+
+    def _detect(self, net, image: np.ndarray) -> List[FaceBox]:
+        h, w = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0)
+        )
+        net.setInput(blob)
+        detections = net.forward()
+
+        faces = []
+        for detection in detections[0, 0]:
+            if detection[2] < self.confidence:
+                continue
+            x1, y1, x2, y2 = (detection[3:7] * np.array([w, h, w, h])).astype(int)
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(w, x2), min(h, y2)
+            if x2 > x1 and y2 > y1:
+                faces.append((int(x1), int(y1), int(x2 - x1), int(y2 - y1)))
+        return faces
+
+class YuNetFaceDetector(FaceDetector):
+    """OpenCV YuNet detector (cv2.FaceDetectorYN, OpenCV >= 4.5.4)"""
+
+    name = "yunet"
+
+    def __init__(
+        self,
+        model_dir: str = "models",
+        weights: str = "face_detection_yunet_2023mar.onnx",
+        confidence: float = 0.6,
+        nms_threshold: float = 0.3
+    ):
+        self.weights_path = os.path.join(model_dir, weights)
+        self.confidence = confidence
+        self.nms_threshold = nms_threshold
+        super().__init__()
+
+    def _create_instance(self):
+        if not os.path.exists(self.weights_path):
+            raise FileNotFoundError(f"YuNet face detector file not found: {self.weights_path}")
+        return cv2.FaceDetectorYN.create(
+            self.weights_path, "", (320, 320), self.confidence, self.nms_threshold
+        )
+
+    def _detect(self, detector, image: np.ndarray) -> List[FaceBox]:
+        h, w = image.shape[:2]
+        detector.setInputSize((w, h))
+        _, detections = detector.detect(image)
+        if detections is None:
+            return []
+
+        faces = []
+        for detection in detections:
+            x, y, fw, fh = detection[:4].astype(int)
+            x, y = max(0, x), max(0, y)
+            fw, fh = min(w - x, fw), min(h - y, fh)
+            if fw > 0 and fh > 0:
+                faces.append((int(x), int(y), int(fw), int(fh)))
+        return faces
+
+FACE_DETECTORS: Dict[str, Type[FaceDetector]] = {
+    HaarFaceDetector.name: HaarFaceDetector,
+    SsdFaceDetector.name: SsdFaceDetector,
+    YuNetFaceDetector.name: YuNetFaceDetector,
+}
+
+def create_face_detector(name: str, model_dir: str = "models", confidence: float = 0.6) -> FaceDetector:
+    """
+    Create and load a face detector by name, falling back to Haar
+
+    Args:
+        name: Detector name ("haar", "ssd" or "yunet")
+        model_dir: Directory containing DNN detector model files
+        confidence: Minimum score for DNN detectors
+
+    Returns:
+        Loaded FaceDetector
+    """
+    if name not in FACE_DETECTORS:
+        raise ValueError(f"Unknown face detector: {name}. Available: {', '.join(FACE_DETECTORS)}")
+
+    if name == HaarFaceDetector.name:
+        detector = HaarFaceDetector()
+    else:
+        detector = FACE_DETECTORS[name](model_dir=model_dir, confidence=confidence)
+
+    try:
+        detector.load()
+    except Exception as e:
+        if name == HaarFaceDetector.name:
+            raise
+        logger.warning(f"Failed to load {name} face detector: {e}. Falling back to haar")
+        detector = HaarFaceDetector()
+        detector.load()
+
+    return detector
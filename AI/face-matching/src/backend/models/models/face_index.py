@@ -0,0 +1,543 @@
+"""
+In-memory 1:N face identification indexes
+Supports: exact flat search and an inverted-file (IVF) approximate index,
+both persisted to a local .npz file
+"""
+import numpy as np
+import threading
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from backend.models.models.similarity import normalize_rows, to_match_score
+
+logger = logging.getLogger(__name__)
+
+# (plate_number, similarity) with similarity on the same 0-1 scale as
+# VGGFace2Model.calculate_similarity
+Candidate = Tuple[str, float]
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, sorted by descending score"""
+    count = scores.shape[0]
+    k = min(k, count)
+    if k < count:
+        top = np.argpartition(scores, count - k)[count - k:]
+    else:
+        top = np.arange(count)
+    return top[np.argsort(scores[top])[::-1]]
+
+class FaceIndex:
+    """Base class for face identification indexes"""
+
+    name = "base"
+
+    def __init__(self):
+        self.dim: Optional[int] = None
+        self.saved_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, plate_number: str) -> bool:
+        raise NotImplementedError
+
+    def plates(self) -> List[str]:
+        """Indexed plate numbers"""
+        raise NotImplementedError
+
+    def _prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        """Validate dimension and return normalized float32 rows"""
+        rows = np.array(embeddings, dtype=np.float32, ndmin=2)
+        if self.dim is None:
+            self.dim = rows.shape[1]
+        if rows.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {rows.shape[1]} does not match index dimension {self.dim}")
+        return normalize_rows(rows)
+
+    def add(self, plate_number: str, embedding: Union[List[float], np.ndarray]):
+        """
+        Insert or replace the embedding of a plate
+
+        Args:
+            plate_number: Vehicle plate number
+            embedding: Face embedding as list or array
+        """
+        self.add_many([plate_number], [embedding])
+
+    def add_many(self, plate_numbers: List[str], embeddings: Union[List, np.ndarray]):
+        """
+        Insert or replace several embeddings at once
+
+        Args:
+            plate_numbers: Vehicle plate numbers
+            embeddings: Face embeddings, one row per plate
+        """
+        raise NotImplementedError
+
+    def build(self, items: Iterable[Tuple[str, Union[List[float], np.ndarray]]], chunk_size: int = 4096) -> int:
+        """
+        Bulk-load (plate_number, embedding) pairs, e.g. from the faces collection
+
+        Args:
+            items: (plate_number, embedding) pairs
+            chunk_size: Rows inserted per batch
+
+        Returns:
+            Number of entries loaded
+        """
+        count = 0
+        plates, embeddings = [], []
+        for plate_number, embedding in items:
+            plates.append(plate_number)
+            embeddings.append(embedding)
+            if len(plates) >= chunk_size:
+                self.add_many(plates, embeddings)
+                count += len(plates)
+                plates, embeddings = [], []
+        if plates:
+            self.add_many(plates, embeddings)
+            count += len(plates)
+        return count
+
+    def remove(self, plate_number: str) -> bool:
+        """
+        Remove a plate
+
+        Args:
+            plate_number: Vehicle plate number
+
+        Returns:
+            True if the plate was indexed
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all entries"""
+        raise NotImplementedError
+
+    def search(self, embedding: Union[List[float], np.ndarray], top_k: int = 5,
+               min_score: float = 0.0) -> List[Candidate]:
+        """
+        Find the registered plates whose faces are most similar to a query
+
+        Args:
+            embedding: Query face embedding
+            top_k: Maximum number of candidates returned
+            min_score: Drop candidates below this similarity
+
+        Returns:
+            Candidates sorted by descending similarity
+        """
+        raise NotImplementedError
+
+    def get_stats(self) -> dict:
+        """Get size and memory figures"""
+        raise NotImplementedError
+
+    def save(self, path: str):
+        """
+        Write the index to a .npz file (atomically replaced)
+
+        Args:
+            path: Destination file path
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        saved_at = time.time()
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, type=np.array(self.name), saved_at=np.array(saved_at), **self._get_arrays())
+        os.replace(tmp_path, path)
+        self.saved_at = saved_at
+        logger.info(f"Saved {self.name} face index with {len(self)} faces to {path}")
+
+    def load(self, path: str):
+        """
+        Replace the index contents with a file written by save()
+
+        Args:
+            path: Source file path
+        """
+        with np.load(path, allow_pickle=False) as data:
+            stored_type = str(data["type"])
+            if stored_type != self.name:
+                raise ValueError(f"Index file {path} holds a {stored_type} index, expected {self.name}")
+            self._set_arrays(data)
+            self.saved_at = float(data["saved_at"])
+        logger.info(f"Loaded {self.name} face index with {len(self)} faces from {path}")
+
+    def _get_arrays(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _set_arrays(self, data):
+        raise NotImplementedError
+
+class FlatFaceIndex(FaceIndex):
+    """Exact (brute-force) cosine search over every registered embedding"""
+
+    name = "flat"
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Initialize the index
+
+        Args:
+            initial_capacity: Rows preallocated before the first resize
+        """
+        super().__init__()
+        self._initial_capacity = max(1, int(initial_capacity))
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._plates: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._searches = 0
+
+    def __len__(self) -> int:
+        return len(self._plates)
+
+    def __contains__(self, plate_number: str) -> bool:
+        return plate_number in self._rows
+
+    def _reserve(self, count: int):
+        """Grow the matrix (doubling) so it can hold `count` rows"""
+        capacity = self._matrix.shape[0]
+        if count <= capacity and self._matrix.shape[1] == self.dim:
+            return
+        new_capacity = max(self._initial_capacity, capacity)
+        while new_capacity < count:
+            new_capacity *= 2
+        matrix = np.empty((new_capacity, self.dim), dtype=np.float32)
+        if self._plates:
+            matrix[:len(self._plates)] = self._matrix[:len(self._plates)]
+        self._matrix = matrix
+
+    def add_many(self, plate_numbers: List[str], embeddings: Union[List, np.ndarray]):
+        if len(plate_numbers) == 0:
+            return
+        rows = self._prepare(embeddings)
+        if rows.shape[0] != len(plate_numbers):
+            raise ValueError("Number of plates and embeddings must match")
+
+        with self._lock:
+            self._reserve(len(self._plates) + len(plate_numbers))
+            for plate_number, row in zip(plate_numbers, rows):
+                index = self._rows.get(plate_number)
+                if index is None:
+                    index = len(self._plates)
+                    self._plates.append(plate_number)
+                    self._rows[plate_number] = index
+                self._matrix[index] = row
+
+    def remove(self, plate_number: str) -> bool:
+        # The last row is moved into the freed slot to keep the matrix dense
+        with self._lock:
+            index = self._rows.pop(plate_number, None)
+            if index is None:
+                return False
+            last = len(self._plates) - 1
+            if index != last:
+                moved = self._plates[last]
+                self._matrix[index] = self._matrix[last]
+                self._plates[index] = moved
+                self._rows[moved] = index
+            self._plates.pop()
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._plates.clear()
+            self._rows.clear()
+
+    def vectors(self) -> np.ndarray:
+        """View of the stored (normalized) embeddings, one row per plate"""
+        return self._matrix[:len(self._plates)]
+
+    def plates(self) -> List[str]:
+        """Plate numbers in row order"""
+        return list(self._plates)
+
+    def search(self, embedding: Union[List[float], np.ndarray], top_k: int = 5,
+               min_score: float = 0.0) -> List[Candidate]:
+        if self.dim is None or len(self._plates) == 0 or top_k <= 0:
+            return []
+        query = self._prepare(embedding)[0]
+
+        with self._lock:
+            scores = self._matrix[:len(self._plates)] @ query
+            top = top_k_indices(scores, top_k)
+            plates = [self._plates[i] for i in top]
+            self._searches += 1
+
+        similarities = to_match_score(scores[top])
+        return [
+            (plate, float(score))
+            for plate, score in zip(plates, similarities)
+            if score >= min_score
+        ]
+
+    def get_stats(self) -> dict:
+        return {
+            "type": self.name,
+            "size": len(self._plates),
+            "dim": self.dim,
+            "capacity": self._matrix.shape[0],
+            "memory_bytes": int(self._matrix.nbytes),
+            "searches": self._searches
+        }
+
+    def _get_arrays(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {
+                "vectors": self.vectors().copy(),
+                "plates": np.array(self._plates, dtype=str)
+            }
+
+    def _set_arrays(self, data):
+        vectors = data["vectors"]
+        with self._lock:
+            self._plates.clear()
+            self._rows.clear()
+            self.dim = vectors.shape[1] if vectors.ndim == 2 and vectors.shape[1] else self.dim
+        self.add_many([str(plate) for plate in data["plates"]], vectors)
+
+class IVFFaceIndex(FaceIndex):
+    """
+    Inverted-file index: embeddings are grouped under k-means centroids and a
+    query only scans the `nprobe` groups whose centroids are closest to it
+    """
+
+    name = "ivf"
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, min_train_size: int = 1000,
+                 kmeans_iterations: int = 10, seed: int = 0):
+        """
+        Initialize the index
+
+        Args:
+            nlist: Number of centroids (0 = sqrt of the gallery size at training time)
+            nprobe: Number of groups scanned per query
+            min_train_size: Gallery size at which centroids are trained; smaller
+                galleries are searched exactly
+            kmeans_iterations: Lloyd iterations used for training
+            seed: Random seed for centroid initialization
+        """
+        super().__init__()
+        self.nlist = int(nlist)
+        self.nprobe = max(1, int(nprobe))
+        self.min_train_size = max(1, int(min_train_size))
+        self.kmeans_iterations = int(kmeans_iterations)
+        self.seed = seed
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[FlatFaceIndex] = [FlatFaceIndex(initial_capacity=64)]
+        self._assignments: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._searches = 0
+        self._scanned = 0
+
+    def __len__(self) -> int:
+        return len(self._assignments)
+
+    def __contains__(self, plate_number: str) -> bool:
+        return plate_number in self._assignments
+
+    def plates(self) -> List[str]:
+        with self._lock:
+            return list(self._assignments)
+
+    def is_trained(self) -> bool:
+        """Check if centroids have been trained"""
+        return self._centroids is not None
+
+    def _assign(self, rows: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Nearest centroid for each row, computed in chunks to bound memory"""
+        assignments = np.empty(rows.shape[0], dtype=np.int64)
+        for start in range(0, rows.shape[0], chunk_size):
+            block = rows[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(block @ self._centroids.T, axis=1)
+        return assignments
+
+    def _insert(self, plate_numbers: List[str], rows: np.ndarray, assignments: np.ndarray):
+        """Place normalized rows into their inverted lists (caller holds the lock)"""
+        for plate_number, target in zip(plate_numbers, assignments):
+            current = self._assignments.get(plate_number)
+            if current is not None and current != target:
+                self._lists[current].remove(plate_number)
+            self._assignments[plate_number] = int(target)
+
+        order = np.argsort(assignments, kind="stable")
+        sorted_assignments = assignments[order]
+        boundaries = np.flatnonzero(np.diff(sorted_assignments)) + 1
+        for group in np.split(order, boundaries):
+            if group.size:
+                self._lists[int(assignments[group[0]])].add_many(
+                    [plate_numbers[i] for i in group], rows[group]
+                )
+
+    def add_many(self, plate_numbers: List[str], embeddings: Union[List, np.ndarray]):
+        if len(plate_numbers) == 0:
+            return
+        rows = self._prepare(embeddings)
+        if rows.shape[0] != len(plate_numbers):
+            raise ValueError("Number of plates and embeddings must match")
+
+        with self._lock:
+            if self.is_trained():
+                assignments = self._assign(rows)
+            else:
+                assignments = np.zeros(len(plate_numbers), dtype=np.int64)
+            self._insert(list(plate_numbers), rows, assignments)
+
+            if not self.is_trained() and len(self._assignments) >= self.min_train_size:
+                self.train()
+
+    def train(self, nlist: int = 0):
+        """
+        Train centroids with spherical k-means and redistribute all embeddings
+
+        Args:
+            nlist: Number of centroids (defaults to the configured or automatic value)
+        """
+        with self._lock:
+            plates, vectors = [], []
+            for inverted_list in self._lists:
+                plates.extend(inverted_list.plates())
+                vectors.append(inverted_list.vectors())
+            if not plates:
+                return
+            data = np.concatenate(vectors)
+
+            nlist = nlist or self.nlist or int(round(np.sqrt(len(plates))))
+            nlist = max(1, min(nlist, len(plates)))
+            start = time.perf_counter()
+            self._centroids = self._kmeans(data, nlist)
+            assignments = self._assign(data)
+
+            self._lists = [FlatFaceIndex(initial_capacity=64) for _ in range(nlist)]
+            self._assignments = {}
+            self._insert(plates, data, assignments)
+            logger.info(f"Trained IVF face index: {len(plates)} faces, nlist={nlist}, "
+                        f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def _kmeans(self, data: np.ndarray, nlist: int, max_samples_per_list: int = 64) -> np.ndarray:
+        """Spherical k-means on a sample of the data"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(data.shape[0], nlist * max_samples_per_list)
+        sample = data[rng.choice(data.shape[0], sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            present = np.flatnonzero(counts)
+            sums[present] = np.add.reduceat(sample[order], np.cumsum(counts)[present] - counts[present])
+            empty = np.flatnonzero(counts == 0)
+            if empty.size:
+                # Re-seed empty groups with random points
+                sums[empty] = sample[rng.choice(sample_size, empty.size, replace=False)]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def remove(self, plate_number: str) -> bool:
+        with self._lock:
+            target = self._assignments.pop(plate_number, None)
+            if target is None:
+                return False
+            return self._lists[target].remove(plate_number)
+
+    def clear(self):
+        with self._lock:
+            self._centroids = None
+            self._lists = [FlatFaceIndex(initial_capacity=64)]
+            self._assignments = {}
+
+    def search(self, embedding: Union[List[float], np.ndarray], top_k: int = 5,
+               min_score: float = 0.0) -> List[Candidate]:
+        if self.dim is None or len(self._assignments) == 0 or top_k <= 0:
+            return []
+        query = self._prepare(embedding)[0]
+
+        with self._lock:
+            if self.is_trained():
+                probes = top_k_indices(self._centroids @ query, self.nprobe)
+                lists = [self._lists[i] for i in probes]
+            else:
+                lists = self._lists
+
+            candidates: List[Candidate] = []
+            for inverted_list in lists:
+                candidates.extend(inverted_list.search(query, top_k, min_score))
+                self._scanned += len(inverted_list)
+            self._searches += 1
+
+        candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+        return candidates[:top_k]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            sizes = [len(inverted_list) for inverted_list in self._lists]
+            return {
+                "type": self.name,
+                "size": len(self._assignments),
+                "dim": self.dim,
+                "trained": self.is_trained(),
+                "nlist": len(self._lists) if self.is_trained() else 0,
+                "nprobe": self.nprobe,
+                "largest_list": max(sizes) if sizes else 0,
+                "memory_bytes": int(sum(inverted_list.get_stats()["memory_bytes"] for inverted_list in self._lists)),
+                "searches": self._searches,
+                "avg_scanned": (self._scanned / self._searches) if self._searches else 0.0
+            }
+
+    def _get_arrays(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            arrays = [inverted_list._get_arrays() for inverted_list in self._lists]
+            dim = self.dim or 0
+            return {
+                "centroids": self._centroids if self.is_trained() else np.empty((0, dim), dtype=np.float32),
+                "list_sizes": np.array([len(a["plates"]) for a in arrays], dtype=np.int64),
+                "vectors": np.concatenate([a["vectors"] for a in arrays]) if dim else np.empty((0, 0), np.float32),
+                "plates": np.concatenate([a["plates"] for a in arrays]) if arrays else np.array([], dtype=str)
+            }
+
+    def _set_arrays(self, data):
+        centroids = data["centroids"]
+        vectors = data["vectors"]
+        plates = [str(plate) for plate in data["plates"]]
+        sizes = data["list_sizes"]
+
+        with self._lock:
+            self.clear()
+            if vectors.ndim == 2 and vectors.shape[1]:
+                self.dim = vectors.shape[1]
+            if centroids.shape[0]:
+                self._centroids = centroids.astype(np.float32)
+                self._lists = [FlatFaceIndex(initial_capacity=64) for _ in range(centroids.shape[0])]
+            assignments = np.repeat(np.arange(len(sizes)), sizes)
+            self._insert(plates, vectors, assignments)
+
+FACE_INDEXES: Dict[str, Type[FaceIndex]] = {
+    FlatFaceIndex.name: FlatFaceIndex,
+    IVFFaceIndex.name: IVFFaceIndex,
+}
+
+def create_face_index(name: str = "flat", nlist: int = 0, nprobe: int = 8) -> FaceIndex:
+    """
+    Create an empty face index by name
+
+    Args:
+        name: Index type ("flat" or "ivf")
+        nlist: IVF centroid count (0 = automatic)
+        nprobe: IVF groups scanned per query
+
+    Returns:
+        FaceIndex instance
+    """
+    if name not in FACE_INDEXES:
+        raise ValueError(f"Unknown face index: {name}. Available: {', '.join(FACE_INDEXES)}")
+
+    if name == IVFFaceIndex.name:
+        return IVFFaceIndex(nlist=nlist, nprobe=nprobe)
+    return FACE_INDEXES[name]()
@@ -0,0 +1,88 @@
+"""
+NumPy/OpenCV-native face preprocessing
+Replaces torchvision ToPILImage -> Resize -> ToTensor -> Normalize
+"""
+import cv2
+import numpy as np
+import threading
+from typing import Sequence, Tuple
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+class FacePreprocessor:
+    """Resize, BGR->RGB, scale and mean/std normalization in preallocated buffers"""
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = (224, 224),
+        mean: Sequence[float] = IMAGENET_MEAN,
+        std: Sequence[float] = IMAGENET_STD
+    ):
+        """
+        Initialize the preprocessor
+
+        Args:
+            size: Output (width, height)
+            mean: Per-channel RGB mean in [0, 1] units
+            std: Per-channel RGB standard deviation in [0, 1] units
+        """
+        self.size = size
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+        # (pixel / 255 - mean) / std == pixel * scale + offset
+        self._scale = (1.0 / (255.0 * std)).astype(np.float32)
+        self._offset = (-mean / std).astype(np.float32)
+        self._local = threading.local()
+
+    def _resize_buffer(self) -> np.ndarray:
+        """Per-thread uint8 buffer reused by cv2.resize"""
+        buffer = getattr(self._local, "resized", None)
+        if buffer is None:
+            width, height = self.size
+            buffer = np.empty((height, width, 3), dtype=np.uint8)
+            self._local.resized = buffer
+        return buffer
+
+    def preprocess_into(self, image: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Preprocess one BGR image into a preallocated CHW float32 slot
+
+        Args:
+            image: Input image as numpy array (BGR format from OpenCV)
+            out: float32 array of shape (3, height, width) to write into
+
+        Returns:
+            out
+        """
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+        width, height = self.size
+        shrinking = image.shape[1] > width or image.shape[0] > height
+        resized = cv2.resize(
+            image, self.size, dst=self._resize_buffer(),
+            interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+        )
+
+        # RGB channel c is BGR channel 2 - c: channel swap, float conversion,
+        # scaling and normalization happen in one pass per channel
+        for channel in range(3):
+            np.multiply(resized[:, :, 2 - channel], self._scale[channel], out=out[channel], casting="unsafe")
+            out[channel] += self._offset[channel]
+        return out
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        """
+        Preprocess one image into a (1, 3, height, width) float32 batch
+
+        Args:
+            image: Input image as numpy array (BGR format from OpenCV)
+
+        Returns:
+            Contiguous float32 array ready for torch.from_numpy
+        """
+        width, height = self.size
+        batch = np.empty((1, 3, height, width), dtype=np.float32)
+        self.preprocess_into(image, batch[0])
+        return batch
@@ -0,0 +1,89 @@
+"""
+Cosine similarity on float32 face embeddings
+Scores are cosine similarity (-1..1) mapped to the 0..1 scale compared
+against SIMILARITY_THRESHOLD
+"""
+import numpy as np
+from typing import List, Union
+
+Embedding = Union[List[float], np.ndarray]
+
+def as_float32(embeddings: Embedding, ndim: int = 1) -> np.ndarray:
+    """View embeddings as a float32 array (no copy when already float32)"""
+    array = np.asarray(embeddings, dtype=np.float32)
+    if array.ndim < ndim:
+        array = array.reshape((1,) * (ndim - array.ndim) + array.shape)
+    return array
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (zero rows are left as zeros)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+def normalize(embeddings: Embedding) -> np.ndarray:
+    """Return L2-normalized float32 copies of one embedding or a batch of rows"""
+    return normalize_rows(np.array(embeddings, dtype=np.float32))
+
+def to_match_score(cosine: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Map cosine similarity (-1..1) to a match score (0..1)"""
+    # float32 rounding can put a unit vector's self-similarity just above 1
+    return np.clip((cosine + 1.0) / 2.0, 0.0, 1.0)
+
+def pair_similarity(embedding1: Embedding, embedding2: Embedding, normalized: bool = False) -> float:
+    """
+    Match score between two embeddings
+
+    Args:
+        embedding1: First face embedding
+        embedding2: Second face embedding
+        normalized: Both embeddings are already L2-normalized
+
+    Returns:
+        Similarity score (0-1, higher is more similar)
+    """
+    a = as_float32(embedding1)
+    b = as_float32(embedding2)
+    dot = float(np.dot(a, b))
+    if not normalized:
+        norms = float(np.linalg.norm(a)) * float(np.linalg.norm(b))
+        dot = dot / norms if norms > 0 else 0.0
+    return float(to_match_score(dot))
+
+def one_to_many(query: Embedding, gallery: Embedding, normalized: bool = False) -> np.ndarray:
+    """
+    Match scores of one embedding against every row of a gallery
+
+    Args:
+        query: Query face embedding
+        gallery: (N, dim) float32 gallery, one embedding per row
+        normalized: Query and gallery rows are already L2-normalized
+
+    Returns:
+        (N,) float32 similarity scores
+    """
+    q = as_float32(query)
+    rows = as_float32(gallery, ndim=2)
+    if not normalized:
+        q = normalize(q)
+        rows = normalize(rows)
+    return to_match_score(rows @ q)
+
+def many_to_many(queries: Embedding, gallery: Embedding, normalized: bool = False) -> np.ndarray:
+    """
+    Match scores of every query against every gallery row in one matmul
+
+    Args:
+        queries: (M, dim) query embeddings
+        gallery: (N, dim) gallery embeddings
+        normalized: Queries and gallery rows are already L2-normalized
+
+    Returns:
+        (M, N) float32 similarity scores
+    """
+    left = as_float32(queries, ndim=2)
+    right = as_float32(gallery, ndim=2)
+    if not normalized:
+        left = normalize(left)
+        right = normalize(right)
+    return to_match_score(left @ right.T)
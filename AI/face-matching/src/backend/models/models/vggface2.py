@@ -10,23 +10,21 @@ import logging
 import os
 from pathlib import Path
 
+from backend.models.models.face_detectors import FaceDetector, HaarFaceDetector, create_face_detector
+from backend.models.models.preprocessing import FacePreprocessor, IMAGENET_MEAN, IMAGENET_STD
+from backend.models.models.similarity import pair_similarity
+from backend.utils.image_decode import DecodedFrame
+
 # Try to import ML libraries, with fallbacks
 try:
     import torch
     import torch.nn as nn
-    import torchvision.transforms as transforms
     from torchvision.models import resnet50
     TORCH_AVAILABLE = True
 except ImportError:
     TORCH_AVAILABLE = False
     print("⚠️  PyTorch not available. Using fallback face recognition.")
 
-try:
-    from sklearn.metrics.pairwise import cosine_similarity
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-
 try:
     import face_recognition
     FACE_RECOGNITION_AVAILABLE = True
@@ -54,9 +52,13 @@ class VGGFace2Model:
         self.model_type = model_type
         self.model = None
         self.device = None
-        self.transform = None
+        self.preprocessor = None
         self._loaded = False
         self.embedding_size = 512
+        self.batcher = None
+        self.executor = None
+        self.face_detector = None
+        self.detection_width = 0
         
         # Determine which backend to use
         if model_type == "auto":
@@ -114,13 +116,11 @@ class VGGFace2Model:
         """Initialize VGGFace2 with PyTorch"""
         if TORCH_AVAILABLE:
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.transform = transforms.Compose([
-                transforms.ToPILImage(),
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                                   std=[0.229, 0.224, 0.225])
-            ])
+            self.preprocessor = FacePreprocessor(
+                size=(224, 224),
+                mean=IMAGENET_MEAN,
+                std=IMAGENET_STD
+            )
             logger.info(f"VGGFace2 PyTorch backend will use device: {self.device}")
     
     def _init_face_recognition(self):
@@ -231,14 +231,11 @@ class VGGFace2Model:
         """
         try:
             if self.model_type == "vggface2" and TORCH_AVAILABLE:
-                # Convert BGR to RGB
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                # BGR->RGB, resize and normalization in one pass, already batched (1, 3, 224, 224)
+                batch = self.preprocessor.preprocess(image)
                 
-                # Apply transformations
-                tensor = self.transform(image_rgb)
-                
-                # Add batch dimension
-                tensor = tensor.unsqueeze(0).to(self.device)
+                # Wrap without copying
+                tensor = torch.from_numpy(batch).to(self.device)
                 
                 return tensor
             
@@ -272,6 +269,75 @@ class VGGFace2Model:
         if not self._loaded:
             raise RuntimeError("Model not loaded. Call load_model() first.")
         
+        if self.batcher is not None and self.supports_batching():
+            return await self.batcher.submit(processed_input)
+        
+        return await self.run_blocking(self._extract_embedding, processed_input)
+    
+    def supports_batching(self) -> bool:
+        """Check if the active backend benefits from batched forward passes"""
+        return self.model_type == "vggface2" and TORCH_AVAILABLE
+    
+    def set_batcher(self, batcher):
+        """
+        Route get_embedding through a micro-batching engine
+        
+        Args:
+            batcher: EmbeddingBatcher instance, or None to disable batching
+        """
+        self.batcher = batcher
+    
+    def set_executor(self, executor):
+        """
+        Run blocking detection and inference work on a dedicated executor
+        
+        Args:
+            executor: InferenceExecutor instance, or None to run inline
+        """
+        self.executor = executor
+    
+    async def run_blocking(self, func, *args):
+        """Run blocking work on the inference executor, or inline if none is set"""
+        if self.executor is None:
+            return func(*args)
+        return await self.executor.run(func, *args)
+    
+    def __getstate__(self):
+        """Drop runtime-only attributes so the model can be shipped to a process pool"""
+        state = self.__dict__.copy()
+        state["batcher"] = None
+        state["executor"] = None
+        return state
+    
+    def embed_batch(self, processed_inputs: List[Union[torch.Tensor, np.ndarray]]) -> List[List[float]]:
+        """
+        Extract embeddings for several preprocessed inputs in one forward pass
+        
+        Args:
+            processed_inputs: Preprocessed images as returned by preprocess_image
+            
+        Returns:
+            Face embeddings in the same order as the inputs
+        """
+        if not self._loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        
+        if not self.supports_batching():
+            return [self._extract_embedding(processed_input) for processed_input in processed_inputs]
+        
+        try:
+            with torch.no_grad():
+                batch = torch.cat(processed_inputs, dim=0)
+                embeddings = self.model(batch)
+                embeddings = nn.functional.normalize(embeddings, p=2, dim=1)
+                return embeddings.cpu().numpy().tolist()
+                
+        except Exception as e:
+            logger.error(f"Error extracting batched embeddings: {str(e)}")
+            raise e
+    
+    def _extract_embedding(self, processed_input: Union[torch.Tensor, np.ndarray]) -> List[float]:
+        """Run the active backend on a single preprocessed input"""
         try:
             if self.model_type == "vggface2" and TORCH_AVAILABLE:
                 with torch.no_grad():
@@ -319,100 +385,100 @@ class VGGFace2Model:
             logger.error(f"Error extracting embedding: {str(e)}")
             raise e
     
-    def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
+    def calculate_similarity(self, embedding1: Union[List[float], np.ndarray],
+                             embedding2: Union[List[float], np.ndarray], normalized: bool = False) -> float:
         """
         Calculate similarity between two embeddings
         
         Args:
             embedding1: First face embedding
             embedding2: Second face embedding
+            normalized: Both embeddings are already L2-normalized (skips the norms)
             
         Returns:
             Similarity score (0-1, higher is more similar)
         """
         try:
-            # Convert to numpy arrays
-            emb1 = np.array(embedding1).reshape(1, -1)
-            emb2 = np.array(embedding2).reshape(1, -1)
-            
-            if SKLEARN_AVAILABLE:
-                # Use sklearn cosine similarity
-                similarity = cosine_similarity(emb1, emb2)[0][0]
-            else:
-                # Manual cosine similarity calculation
-                dot_product = np.dot(emb1[0], emb2[0])
-                norm1 = np.linalg.norm(emb1[0])
-                norm2 = np.linalg.norm(emb2[0])
-                
-                if norm1 > 0 and norm2 > 0:
-                    similarity = dot_product / (norm1 * norm2)
-                else:
-                    similarity = 0.0
-            
-            # Convert to 0-1 range (cosine similarity is -1 to 1)
-            similarity = (similarity + 1) / 2
-            
-            return float(similarity)
+            return pair_similarity(embedding1, embedding2, normalized=normalized)
             
         except Exception as e:
             logger.error(f"Error calculating similarity: {str(e)}")
             raise e
     
-    def detect_face(self, image: np.ndarray) -> Union[np.ndarray, None]:
+    def set_face_detector(self, face_detector: FaceDetector, detection_width: int = 0):
+        """
+        Use a preloaded face detector for detect_face
+        
+        Args:
+            face_detector: FaceDetector instance (see create_face_detector)
+            detection_width: Run detection on a frame downscaled to this width (0 = full resolution)
+        """
+        self.face_detector = face_detector
+        self.detection_width = detection_width
+    
+    def get_face_detector(self) -> FaceDetector:
+        """Get the active face detector, loading the Haar cascade on first use"""
+        if self.face_detector is None:
+            self.face_detector = create_face_detector(HaarFaceDetector.name)
+        return self.face_detector
+    
+    def detect_face(self, image: Union[np.ndarray, DecodedFrame]) -> Union[np.ndarray, None]:
         """
         Detect and extract face from image using OpenCV
         
         Args:
-            image: Input image as numpy array
+            image: Input image as numpy array, or a DecodedFrame decoded at reduced
+                resolution (detection runs on the reduced image, the face is cropped
+                from full resolution when the reduced crop is smaller than the model input)
             
         Returns:
             Cropped face image or None if no face detected
         """
+        frame = image if isinstance(image, DecodedFrame) else DecodedFrame(image)
         try:
-            # Load face cascade classifier
-            face_cascade = cv2.CascadeClassifier(
-                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            )
-            
-            # Convert to grayscale for face detection
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Detect faces
-            faces = face_cascade.detectMultiScale(
-                gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-            )
+            # Detect faces with the shared detector on a downscaled level;
+            # boxes come back in the coordinates of the frame's decoded image
+            faces = self.get_face_detector().detect_downscaled(frame.image, self.detection_width)
             
             if len(faces) == 0:
                 logger.warning("No face detected in image")
                 return None
             
-            # Use the largest face
+            # Use the largest face, in full-resolution coordinates
             largest_face = max(faces, key=lambda x: x[2] * x[3])
-            x, y, w, h = largest_face
+            x, y, w, h = frame.to_full(largest_face)
+            full_width, full_height = frame.full_size
             
             # Add some padding
             padding = int(min(w, h) * 0.2)
             x = max(0, x - padding)
             y = max(0, y - padding)
-            w = min(image.shape[1] - x, w + 2 * padding)
-            h = min(image.shape[0] - y, h + 2 * padding)
+            w = min(full_width - x, w + 2 * padding)
+            h = min(full_height - y, h + 2 * padding)
             
             # Extract face region
-            face_image = image[y:y+h, x:x+w]
+            face_image = frame.crop((x, y, w, h), min_size=self.face_input_size)
             
             return face_image
             
         except Exception as e:
             logger.error(f"Error detecting face: {str(e)}")
             # Return original image if face detection fails
-            return image
+            return frame.image
+    
+    @property
+    def face_input_size(self) -> int:
+        """Shorter side of the model input (face crops smaller than this are taken at full resolution)"""
+        if self.preprocessor is not None:
+            return min(self.preprocessor.size)
+        return 0
     
-    async def process_image_with_face_detection(self, image: np.ndarray) -> List[float]:
+    async def process_image_with_face_detection(self, image: Union[np.ndarray, DecodedFrame]) -> List[float]:
         """
         Complete pipeline: detect face, preprocess, and extract embedding
         
         Args:
-            image: Input image as numpy array
+            image: Input image as numpy array, or a DecodedFrame (see detect_face)
             
         Returns:
             Face embedding
@@ -420,19 +486,13 @@ class VGGFace2Model:
         try:
             if self.model_type == "face_recognition":
                 # face_recognition handles face detection internally
-                processed_image = self.preprocess_image(image)
+                if isinstance(image, DecodedFrame):
+                    image = image.image
+                processed_image = await self.run_blocking(self.preprocess_image, image)
                 embedding = await self.get_embedding(processed_image)
             else:
-                # Detect face first
-                face_image = self.detect_face(image)
-                
-                if face_image is None:
-                    # If no face detected, use original image
-                    face_image = image
-                    logger.warning("Using original image as no face was detected")
-                
-                # Preprocess
-                processed_input = self.preprocess_image(face_image)
+                # Detect face and preprocess off the event loop
+                processed_input = await self.run_blocking(self._detect_and_preprocess, image)
                 
                 # Extract embedding
                 embedding = await self.get_embedding(processed_input)
@@ -442,6 +502,19 @@ class VGGFace2Model:
         except Exception as e:
             logger.error(f"Error in complete face processing pipeline: {str(e)}")
             raise e
+    
+    def _detect_and_preprocess(self, image: Union[np.ndarray, DecodedFrame]) -> Union[torch.Tensor, np.ndarray]:
+        """Blocking part of the pipeline: face detection followed by preprocessing"""
+        # Detect face first
+        face_image = self.detect_face(image)
+        
+        if face_image is None:
+            # If no face detected, use original image
+            face_image = image.image if isinstance(image, DecodedFrame) else image
+            logger.warning("Using original image as no face was detected")
+        
+        # Preprocess
+        return self.preprocess_image(face_image)
 
 # Maintain backward compatibility
 VGGFaceModel = VGGFace2Model
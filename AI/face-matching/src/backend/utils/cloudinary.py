@@ -1,27 +1,49 @@
 """
 Cloudinary service for image upload and management
 """
+import asyncio
 import cloudinary
 import cloudinary.uploader
 import cloudinary.utils
 import cv2
 import numpy as np
-import requests
-from typing import Optional
+import re
+from typing import Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
 import logging
 from datetime import datetime
-import os
-import tempfile
 from backend.config.settings import Settings
+from backend.utils.http_client import PooledHttpClient
+from parking_shared.image_cache import ImageCache
+from backend.utils.image_decode import DecodedFrame, decode_frame
 
 logger = logging.getLogger(__name__)
 
+# Cloudinary delivery URL: /<cloud_name>/image/upload/[transformations/][v<version>/]<public_id>.<ext>
+CLOUDINARY_HOST = "res.cloudinary.com"
+_VERSION_SEGMENT = re.compile(r"^v\d+$")
+
 class CloudinaryService:
     """Cloudinary service for image operations"""
 
     def __init__(self):
         self._configured = False
         self.settings = Settings()
+        self.http_client = PooledHttpClient(
+            max_connections=self.settings.HTTP_MAX_CONNECTIONS,
+            max_connections_per_host=self.settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            keepalive_expiry=self.settings.HTTP_KEEPALIVE_EXPIRY,
+            timeout=self.settings.REQUEST_TIMEOUT,
+            http2=self.settings.HTTP2_ENABLED
+        )
+        self.image_cache: Optional[ImageCache] = None
+        if self.settings.IMAGE_CACHE_MAX_MB > 0:
+            self.image_cache = ImageCache(
+                max_bytes=self.settings.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+                url_ttl=self.settings.IMAGE_CACHE_URL_TTL,
+                disk_dir=self.settings.IMAGE_CACHE_DIR,
+                disk_max_bytes=self.settings.IMAGE_CACHE_DISK_MAX_MB * 1024 * 1024
+            )
         self._configure_cloudinary()
 
     def _configure_cloudinary(self):
@@ -46,26 +68,29 @@ class CloudinaryService:
         """Check if Cloudinary is configured"""
         return self._configured
 
+    async def close(self):
+        """Close pooled HTTP connections"""
+        await self.http_client.close()
+
     async def download_image(self, image_url: str) -> np.ndarray:
         """
         Download image from URL and convert to OpenCV format
 
+        Frames already downloaded by this or another service sharing the image
+        cache are returned from the cache.
+
         Args:
             image_url: URL of the image to download
 
         Returns:
-            Image as numpy array in BGR format (OpenCV format)
+            Image as numpy array in BGR format (OpenCV format); read-only when cached
         """
         try:
-            # Download image
-            response = requests.get(str(image_url), timeout=30)
-            response.raise_for_status()
-
-            # Convert to numpy array
-            image_array = np.frombuffer(response.content, np.uint8)
-
-            # Decode with OpenCV
-            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+            image_url = str(image_url)
+            if self.image_cache is not None:
+                image = await self.image_cache.fetch_decoded(image_url, self._fetch_image, self._decode_image)
+            else:
+                image = await self._decode_image(await self._fetch_image(image_url))
 
             if image is None:
                 raise ValueError("Failed to decode image")
@@ -77,6 +102,121 @@ class CloudinaryService:
             logger.error(f"Error downloading image: {str(e)}")
             raise e
 
+    async def download_frame(self, image_url: str, target_width: int = 0) -> DecodedFrame:
+        """
+        Download an image and decode it at reduced resolution for detection
+
+        JPEGs are decoded with DCT scaling to the smallest size that is still
+        target_width wide; the full-resolution frame is decoded from the kept
+        bytes only if a caller needs it (see DecodedFrame).
+
+        Args:
+            image_url: URL of the image to download
+            target_width: Working width of the detector (0 = full resolution)
+
+        Returns:
+            DecodedFrame
+        """
+        if not target_width:
+            return DecodedFrame(await self.download_image(image_url))
+
+        try:
+            image_url = str(image_url)
+            if self.image_cache is not None:
+                content = await self.image_cache.fetch_encoded(image_url, self._fetch_image)
+            else:
+                content = await self._fetch_image(image_url)
+
+            frame = await asyncio.to_thread(decode_frame, content, target_width)
+
+            logger.info(f"Successfully downloaded image from: {image_url} "
+                        f"(decoded at 1/{frame.reduction})")
+            return frame
+
+        except Exception as e:
+            logger.error(f"Error downloading image: {str(e)}")
+            raise e
+
+    async def _fetch_image(self, image_url: str) -> bytearray:
+        """Download image bytes over the shared connection pool (size cap enforced while streaming)"""
+        return await self.http_client.fetch(image_url, max_bytes=self.settings.MAX_IMAGE_SIZE)
+
+    async def _decode_image(self, content: bytes) -> Optional[np.ndarray]:
+        """Decode with OpenCV off the event loop (cv2 releases the GIL)"""
+        image_array = np.frombuffer(content, np.uint8)
+        return await asyncio.to_thread(cv2.imdecode, image_array, cv2.IMREAD_COLOR)
+
+    def encode_evidence(self, image: np.ndarray) -> memoryview:
+        """
+        Encode an evidence image as JPEG, downscaling it first if configured
+
+        Args:
+            image: Image as numpy array (BGR format)
+
+        Returns:
+            memoryview over the encoder's output buffer (no copy)
+        """
+        max_width = self.settings.EVIDENCE_MAX_WIDTH
+        if max_width and image.shape[1] > max_width:
+            # Halve with pyrDown while possible, then a bilinear resize for the
+            # remaining < 2x step (INTER_AREA is slow for non-integer ratios)
+            while image.shape[1] // 2 >= max_width:
+                image = cv2.pyrDown(image)
+            if image.shape[1] > max_width:
+                height = max(1, round(image.shape[0] * max_width / image.shape[1]))
+                image = cv2.resize(image, (max_width, height), interpolation=cv2.INTER_LINEAR)
+
+        success, buffer = cv2.imencode(
+            '.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.settings.EVIDENCE_JPEG_QUALITY]
+        )
+        if not success:
+            raise ValueError("Failed to encode evidence image")
+        return memoryview(buffer.reshape(-1))
+
+    def parse_source_url(self, image_url: str) -> Optional[str]:
+        """
+        Get the public_id of an image already stored in this Cloudinary account
+
+        Args:
+            image_url: Source image URL
+
+        Returns:
+            Public ID, or None for foreign URLs (other hosts, other clouds, non-image assets)
+        """
+        parts = urlsplit(str(image_url))
+        if parts.scheme not in ("http", "https") or parts.netloc != CLOUDINARY_HOST:
+            return None
+
+        segments = [unquote(segment) for segment in parts.path.split("/") if segment]
+        if len(segments) < 4 or segments[0] != self.settings.CLOUDINARY_CLOUD_NAME:
+            return None
+        if segments[1] != "image" or segments[2] != "upload":
+            return None
+
+        # Everything after the version is the public_id (transformations come
+        # before it); without a version the whole path is taken as the public_id
+        path = segments[3:]
+        versions = [i for i, segment in enumerate(path) if _VERSION_SEGMENT.match(segment)]
+        if versions:
+            path = path[versions[0] + 1:]
+        if not path:
+            return None
+
+        public_id = "/".join(path)
+        return public_id.rsplit(".", 1)[0] if "." in path[-1] else public_id
+
+    def _evidence_name(self, plate_number: str, is_registration: bool,
+                       captured_at: Optional[float] = None) -> Tuple[str, str]:
+        """Folder and file name of an evidence asset"""
+        # Generate timestamp
+        captured = datetime.utcfromtimestamp(captured_at) if captured_at else datetime.utcnow()
+        timestamp = captured.strftime("%Y%m%d_%H%M%S")
+
+        # Determine file prefix
+        prefix = "register" if is_registration else "verify"
+
+        return f"parking/{plate_number}", f"{prefix}_{timestamp}"
+
     async def upload_evidence(
         self,
         image: np.ndarray,
@@ -98,51 +238,85 @@ class CloudinaryService:
             raise RuntimeError("Cloudinary not configured")
 
         try:
-            # Generate timestamp
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-
-            # Determine file prefix
-            prefix = "register" if is_registration else "verify"
+            # Encode and upload straight from memory (no temporary file)
+            return await self.upload_encoded_evidence(
+                self.encode_evidence(image), plate_number, is_registration
+            )
 
-            # Create filename
-            filename = f"{prefix}_{timestamp}"
+        except Exception as e:
+            logger.error(f"Error uploading evidence image: {str(e)}")
+            raise e
 
-            # Create folder path
-            folder_path = f"parking/{plate_number}"
+    async def upload_encoded_evidence(
+        self,
+        source: Union[str, bytes, memoryview],
+        plate_number: str,
+        is_registration: bool = True,
+        captured_at: Optional[float] = None
+    ) -> str:
+        """
+        Upload an encoded evidence JPEG to Cloudinary
 
-            # Encode image to bytes
-            _, buffer = cv2.imencode('.jpg', image)
-            image_bytes = buffer.tobytes()
+        Args:
+            source: JPEG buffer, path of a spooled JPEG file, or URL of an image in
+                this Cloudinary account (copied server-side, nothing is downloaded)
+            plate_number: Vehicle plate number
+            is_registration: True for registration, False for verification
+            captured_at: Capture time (epoch seconds) used in the file name, defaults to now
 
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                temp_file.write(image_bytes)
-                temp_file_path = temp_file.name
+        Returns:
+            Secure URL of uploaded image
+        """
+        if not self._configured:
+            raise RuntimeError("Cloudinary not configured")
 
-            try:
-                # Upload to Cloudinary
-                upload_result = cloudinary.uploader.upload(
-                    temp_file_path,
-                    folder=folder_path,
-                    public_id=filename,
-                    overwrite=True,
-                    resource_type="image",
-                    format="jpg",
-                    quality="auto:good"
-                )
+        folder_path, filename = self._evidence_name(plate_number, is_registration, captured_at)
+
+        # Upload to Cloudinary (blocking SDK call, run off the event loop).
+        # Buffers are passed through as-is and only copied into the multipart body;
+        # URLs are fetched by Cloudinary itself.
+        upload_result = await asyncio.to_thread(
+            cloudinary.uploader.upload,
+            source,
+            filename=f"{filename}.jpg",
+            folder=folder_path,
+            public_id=filename,
+            overwrite=True,
+            resource_type="image",
+            format="jpg",
+            quality="auto:good"
+        )
+
+        secure_url = upload_result["secure_url"]
+        logger.info(f"Successfully uploaded evidence image: {secure_url}")
+
+        return secure_url
+
+    async def copy_evidence(
+        self,
+        source_url: str,
+        plate_number: str,
+        is_registration: bool = True
+    ) -> str:
+        """
+        Create the evidence asset from an image already stored on Cloudinary
 
-                secure_url = upload_result["secure_url"]
-                logger.info(f"Successfully uploaded evidence image: {secure_url}")
+        The upload API is given the source URL, so the copy happens on
+        Cloudinary's side without the image passing through this server.
 
-                return secure_url
+        Args:
+            source_url: Delivery URL of the source image (see parse_source_url)
+            plate_number: Vehicle plate number
+            is_registration: True for registration, False for verification
 
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+        Returns:
+            Secure URL of the evidence copy
+        """
+        try:
+            return await self.upload_encoded_evidence(source_url, plate_number, is_registration)
 
         except Exception as e:
-            logger.error(f"Error uploading evidence image: {str(e)}")
+            logger.error(f"Error copying evidence image: {str(e)}")
             raise e
 
     async def upload_from_url(
@@ -0,0 +1,123 @@
+"""
+Process-local cache of face embeddings keyed by plate number
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+class EmbeddingCache:
+    """LRU cache with TTL storing embeddings as float32 NumPy arrays"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of plates kept (least recently used are evicted)
+            ttl_seconds: Time an entry stays valid after it was stored (0 = no expiry)
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, plate_number: str) -> Optional[np.ndarray]:
+        """
+        Get a cached embedding
+
+        Args:
+            plate_number: Vehicle plate number
+
+        Returns:
+            float32 embedding or None on miss/expiry
+        """
+        with self._lock:
+            entry = self._entries.get(plate_number)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, embedding = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[plate_number]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(plate_number)
+            self._hits += 1
+            return embedding
+
+    def put(self, plate_number: str, embedding: Union[List[float], np.ndarray]) -> np.ndarray:
+        """
+        Store an embedding
+
+        Args:
+            plate_number: Vehicle plate number
+            embedding: Face embedding as list or array
+
+        Returns:
+            The stored float32 array
+        """
+        array = np.ascontiguousarray(embedding, dtype=np.float32)
+        array.setflags(write=False)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+        with self._lock:
+            self._entries[plate_number] = (expires_at, array)
+            self._entries.move_to_end(plate_number)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return array
+
+    def warm(self, items: Iterable[Tuple[str, Union[List[float], np.ndarray]]]) -> int:
+        """
+        Bulk-load embeddings, e.g. from the faces collection at startup
+
+        Args:
+            items: (plate_number, embedding) pairs
+
+        Returns:
+            Number of entries loaded
+        """
+        count = 0
+        for plate_number, embedding in items:
+            self.put(plate_number, embedding)
+            count += 1
+        return count
+
+    def invalidate(self, plate_number: str) -> bool:
+        """Remove one plate from the cache"""
+        with self._lock:
+            return self._entries.pop(plate_number, None) is not None
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
@@ -0,0 +1,82 @@
+"""
+Compact binary encoding for face embeddings stored in Firestore
+
+Documents written by the codec carry:
+    embedding        bytes (little-endian float32 / float16 / int8)
+    embedding_codec  "float32" | "float16" | "int8"
+    embedding_scale  float, int8 only (value = q * scale)
+
+Legacy documents store `embedding` as a list of floats and no codec field.
+"""
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+EMBEDDING_CODECS = ("float32", "float16", "int8")
+
+# Fields needed to decode an embedding (for Firestore field masks)
+EMBEDDING_FIELDS = ["embedding", "embedding_codec", "embedding_scale"]
+
+_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+    "int8": np.dtype("i1"),
+}
+
+def encode_embedding(embedding: Union[List[float], np.ndarray], codec: str = "float32") -> Dict[str, Any]:
+    """
+    Encode an embedding into Firestore document fields
+
+    Args:
+        embedding: Face embedding as list or array
+        codec: One of EMBEDDING_CODECS
+
+    Returns:
+        Fields to merge into the document
+    """
+    if codec not in EMBEDDING_CODECS:
+        raise ValueError(f"Invalid embedding codec: {codec}. Must be one of {EMBEDDING_CODECS}")
+
+    values = np.asarray(embedding, dtype=np.float32).ravel()
+    fields: Dict[str, Any] = {"embedding_codec": codec}
+
+    if codec == "int8":
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(values / scale), -127, 127).astype(_DTYPES["int8"])
+        fields["embedding"] = quantized.tobytes()
+        fields["embedding_scale"] = scale
+    else:
+        fields["embedding"] = values.astype(_DTYPES[codec]).tobytes()
+
+    return fields
+
+def decode_embedding(doc_data: Dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    Decode the embedding of a Firestore document (binary or legacy list format)
+
+    Args:
+        doc_data: Document dictionary
+
+    Returns:
+        float32 embedding, or None if the document has no embedding
+    """
+    stored = doc_data.get("embedding")
+    if stored is None or len(stored) == 0:
+        return None
+
+    codec = doc_data.get("embedding_codec")
+    if codec is None or isinstance(stored, (list, tuple)):
+        return np.asarray(stored, dtype=np.float32)
+
+    if codec not in _DTYPES:
+        raise ValueError(f"Unknown embedding codec in document: {codec}")
+
+    values = np.frombuffer(stored, dtype=_DTYPES[codec])
+    if codec == "int8":
+        return values.astype(np.float32) * np.float32(doc_data.get("embedding_scale", 1.0))
+    return values.astype(np.float32, copy=False)
+
+def is_legacy_embedding(doc_data: Dict[str, Any]) -> bool:
+    """Check if a document still stores its embedding as a float list"""
+    return isinstance(doc_data.get("embedding"), (list, tuple))
@@ -0,0 +1,355 @@
+"""
+Background evidence upload pipeline
+Gate responses no longer wait for Cloudinary: evidence images are spooled to
+disk, uploaded by worker tasks with retry/backoff, and the resulting URL is
+patched into Firestore by a callback. A job leaves the spool only once its URL
+is recorded; until then the URL is kept in the job metadata so only the
+Firestore patch is retried
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# upload(jpeg buffer, spooled file path or source URL, plate_number, is_registration, captured_at) -> secure URL
+Uploader = Callable[[Union[str, memoryview], str, bool, float], Awaitable[str]]
+# on_uploaded(plate_number, url, is_registration) -> False when the URL was not recorded
+UploadCallback = Callable[[str, str, bool], Awaitable[object]]
+
+class EvidenceUploadQueue:
+    """Bounded async queue of spooled evidence images with worker tasks"""
+
+    def __init__(
+        self,
+        uploader: Uploader,
+        on_uploaded: Optional[UploadCallback] = None,
+        spool_dir: str = "./evidence_spool",
+        max_size: int = 100,
+        workers: int = 2,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            uploader: Coroutine uploading a spooled JPEG and returning its URL
+            on_uploaded: Coroutine called with (plate_number, url, is_registration) after upload;
+                raising or returning False retries it (the upload itself is not repeated)
+            spool_dir: Directory holding pending images (survives restarts)
+            max_size: Maximum number of queued jobs; enqueue fails when full
+            workers: Number of concurrent upload tasks
+            max_retries: Attempts per upload (and per URL patch) before the job is moved to spool_dir/failed
+            backoff_base: First retry delay in seconds (doubled per attempt, with jitter)
+            backoff_max: Upper bound of the retry delay in seconds
+        """
+        self.uploader = uploader
+        self.on_uploaded = on_uploaded
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.max_size = max(1, max_size)
+        self.workers = max(1, workers)
+        self.max_retries = max(1, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._queue: Optional[asyncio.Queue] = None
+        # Encoded images of jobs queued by this process, uploaded from memory;
+        # jobs recovered from the spool are uploaded from their file
+        self._buffers: Dict[str, memoryview] = {}
+        self._tasks = []
+        # Jobs being written to the spool and recovered jobs not queued yet, counted against max_size
+        self._spooling = 0
+        self._requeue_pending = 0
+        self._enqueued = 0
+        self._uploaded = 0
+        self._recorded = 0
+        self._retries = 0
+        self._failed = 0
+        self._rejected = 0
+        self._recovered = 0
+        self._upload_seconds = 0.0
+
+    async def start(self):
+        """Start worker tasks and re-queue jobs left in the spool directory"""
+        if self.is_running():
+            return
+        os.makedirs(self.failed_dir, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        # Scan before accepting new jobs so they are not picked up twice
+        spooled = self._scan_spool()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._requeue_pending = len(spooled)
+        self._tasks.append(asyncio.create_task(self._requeue(spooled)))
+        logger.info(f"Evidence upload queue started: workers={self.workers}, spool={self.spool_dir}")
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """
+        Stop workers; jobs still pending stay in the spool directory for the next start
+
+        Args:
+            drain_timeout: Seconds to wait for queued uploads to finish
+        """
+        if not self.is_running():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Evidence queue stopped with {self._queue.qsize()} uploads pending in spool")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._buffers.clear()
+
+    def is_running(self) -> bool:
+        """Check if worker tasks are running"""
+        return bool(self._tasks)
+
+    def _has_room(self) -> bool:
+        if not self.is_running():
+            return False
+        return self._queue.qsize() + self._spooling + self._requeue_pending < self.max_size
+
+    async def _spool_and_queue(self, job: Dict, jpeg: Optional[Union[bytes, memoryview]] = None) -> Optional[str]:
+        """Write the job to the spool off the event loop, then queue it (None if it no longer fits)"""
+        self._spooling += 1
+        try:
+            await asyncio.to_thread(self._write_job, job, jpeg)
+        finally:
+            self._spooling -= 1
+        if not self.is_running():
+            # Stopped meanwhile: the spooled job is picked up by the next start
+            return job["job_id"]
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up during the spool write: the caller uploads inline instead
+            self._rejected += 1
+            await asyncio.to_thread(self._remove_job, job["job_id"])
+            return None
+        if jpeg is not None:
+            self._buffers[job["job_id"]] = memoryview(jpeg)
+        self._enqueued += 1
+        return job["job_id"]
+
+    async def enqueue(self, jpeg: Union[bytes, memoryview], plate_number: str, is_registration: bool) -> Optional[str]:
+        """
+        Spool an encoded evidence image and queue it for upload
+
+        Args:
+            jpeg: Encoded JPEG buffer
+            plate_number: Vehicle plate number
+            is_registration: True for registration, False for verification
+
+        Returns:
+            Job ID, or None if the queue is not running or full (caller uploads inline)
+        """
+        if not self._has_room():
+            self._rejected += 1
+            return None
+
+        job = self._new_job(plate_number, is_registration)
+        return await self._spool_and_queue(job, jpeg)
+
+    async def enqueue_copy(self, source_url: str, plate_number: str, is_registration: bool) -> Optional[str]:
+        """
+        Queue a server-side copy of an image that is already on Cloudinary
+
+        Only the job metadata is spooled; the uploader receives the source URL.
+
+        Args:
+            source_url: URL of the source image
+            plate_number: Vehicle plate number
+            is_registration: True for registration, False for verification
+
+        Returns:
+            Job ID, or None if the queue is not running or full (caller copies inline)
+        """
+        if not self._has_room():
+            self._rejected += 1
+            return None
+
+        job = self._new_job(plate_number, is_registration)
+        job["source_url"] = source_url
+        return await self._spool_and_queue(job)
+
+    def _new_job(self, plate_number: str, is_registration: bool) -> Dict:
+        return {
+            "job_id": uuid.uuid4().hex,
+            "plate_number": plate_number,
+            "is_registration": is_registration,
+            "captured_at": time.time(),
+            "attempts": 0
+        }
+
+    def _image_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.jpg")
+
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.json")
+
+    def _write_job(self, job: Dict, jpeg: Optional[Union[bytes, memoryview]]):
+        """Spool the image (if any), then its metadata; both written atomically"""
+        if jpeg is not None:
+            tmp_path = self._image_path(job["job_id"]) + ".tmp"
+            with open(tmp_path, "wb") as image_file:
+                image_file.write(jpeg)
+            os.replace(tmp_path, self._image_path(job["job_id"]))
+        self._write_meta(job)
+
+    def _write_meta(self, job: Dict):
+        """Write job metadata atomically next to the spooled image"""
+        tmp_path = self._meta_path(job["job_id"]) + ".tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump(job, meta_file)
+        os.replace(tmp_path, self._meta_path(job["job_id"]))
+
+    def _remove_job(self, job_id: str):
+        for path in (self._image_path(job_id), self._meta_path(job_id)):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _mark_uploaded(self, job: Dict):
+        """Keep only the metadata (now holding the URL) of an uploaded job"""
+        self._write_meta(job)
+        if os.path.exists(self._image_path(job["job_id"])):
+            os.unlink(self._image_path(job["job_id"]))
+
+    def _move_to_failed(self, job_id: str):
+        for path in (self._image_path(job_id), self._meta_path(job_id)):
+            if os.path.exists(path):
+                os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+
+    def _scan_spool(self) -> list:
+        """Jobs spooled by a previous run, oldest first"""
+        jobs = []
+        names = set(os.listdir(self.spool_dir))
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            # Partial writes, and images whose metadata was never written (crash in between)
+            if ext == ".tmp" or (ext == ".jpg" and f"{stem}.json" not in names):
+                os.unlink(os.path.join(self.spool_dir, name))
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name)) as meta_file:
+                    job = json.load(meta_file)
+                if job.get("url") or job.get("source_url") or os.path.exists(self._image_path(job["job_id"])):
+                    jobs.append(job)
+                else:
+                    os.unlink(os.path.join(self.spool_dir, name))
+            except Exception as e:
+                logger.warning(f"Skipping unreadable spool entry {name}: {str(e)}")
+        return sorted(jobs, key=lambda job: job["captured_at"])
+
+    async def _requeue(self, jobs: list):
+        """Queue recovered jobs, waiting for room when the queue is full"""
+        try:
+            for job in jobs:
+                await self._queue.put(job)
+                self._requeue_pending -= 1
+                self._recovered += 1
+        finally:
+            self._requeue_pending = 0
+        if jobs:
+            logger.info(f"Recovered {len(jobs)} pending evidence uploads from spool")
+
+    async def _worker(self):
+        """Upload queued jobs until cancelled"""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error in evidence worker: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: Dict):
+        """Upload one job, then record its URL, each with retry and exponential backoff"""
+        if not job.get("url"):
+            async def upload():
+                start = time.perf_counter()
+                source = self._buffers.get(job["job_id"])
+                if source is None:
+                    source = job.get("source_url") or self._image_path(job["job_id"])
+                url = await self.uploader(
+                    source, job["plate_number"], job["is_registration"], job["captured_at"]
+                )
+                self._upload_seconds += time.perf_counter() - start
+                return url
+
+            uploaded, url = await self._attempt(job, "upload", upload)
+            self._buffers.pop(job["job_id"], None)
+            if not uploaded:
+                return
+            self._uploaded += 1
+            job["url"] = url
+            job["attempts"] = 0
+            await asyncio.to_thread(self._mark_uploaded, job)
+
+        if self.on_uploaded is not None:
+            async def record():
+                if await self.on_uploaded(job["plate_number"], job["url"], job["is_registration"]) is False:
+                    raise RuntimeError("evidence URL not recorded")
+
+            recorded, _ = await self._attempt(job, "URL record", record)
+            if not recorded:
+                return
+        self._recorded += 1
+        await asyncio.to_thread(self._remove_job, job["job_id"])
+
+    async def _attempt(self, job: Dict, action: str, call: Callable[[], Awaitable]) -> Tuple[bool, object]:
+        """
+        Run call() until it succeeds or the job runs out of attempts
+
+        Returns:
+            (True, result), or (False, None) once the job was moved to spool_dir/failed
+        """
+        while True:
+            job["attempts"] += 1
+            try:
+                return True, await call()
+            except Exception as e:
+                if job["attempts"] >= self.max_retries:
+                    self._failed += 1
+                    logger.error(f"Evidence {action} for plate {job['plate_number']} failed after "
+                                 f"{job['attempts']} attempts: {str(e)}")
+                    await asyncio.to_thread(self._move_to_failed, job["job_id"])
+                    return False, None
+
+                self._retries += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (job["attempts"] - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Evidence {action} for plate {job['plate_number']} failed "
+                               f"(attempt {job['attempts']}): {str(e)}. Retrying in {delay:.1f}s")
+                await asyncio.to_thread(self._write_meta, job)
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> dict:
+        """Get queue counters"""
+        return {
+            "running": self.is_running(),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "enqueued": self._enqueued,
+            "recovered": self._recovered,
+            "uploaded": self._uploaded,
+            "recorded": self._recorded,
+            "retries": self._retries,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_upload_ms": (self._upload_seconds / self._uploaded * 1000) if self._uploaded else 0.0
+        }
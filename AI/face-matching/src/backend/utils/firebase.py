@@ -6,10 +6,16 @@ from firebase_admin import credentials, firestore
 from google.cloud.firestore import Client
 from typing import Dict, List, Optional, Any
 import logging
+import asyncio
 from datetime import datetime
 import json
 import os
+import numpy as np
 from backend.config.settings import Settings
+from backend.models.models.face_index import create_face_index
+from backend.utils.embedding_cache import EmbeddingCache
+from backend.utils.embedding_codec import EMBEDDING_FIELDS, decode_embedding, encode_embedding
+from backend.utils.firestore_batch import FirestoreWriteBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +27,16 @@ class FirebaseService:
         self.collection_name = "faces"
         self._connected = False
         self.settings = Settings()
+        self.embedding_cache = EmbeddingCache(
+            max_size=self.settings.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=self.settings.EMBEDDING_CACHE_TTL
+        )
+        self.write_buffer: Optional[FirestoreWriteBuffer] = None
+        self.face_index = create_face_index(
+            self.settings.FACE_INDEX_TYPE,
+            nlist=self.settings.FACE_INDEX_NLIST,
+            nprobe=self.settings.FACE_INDEX_NPROBE
+        )
         self._initialize_firebase()
 
     def _initialize_firebase(self):
@@ -53,6 +69,12 @@ class FirebaseService:
 
             # Get Firestore client
             self.db = firestore.client()
+            if self.settings.FIRESTORE_BATCH_WRITES:
+                self.write_buffer = FirestoreWriteBuffer(
+                    self.db,
+                    max_batch_size=self.settings.FIRESTORE_BATCH_SIZE,
+                    max_delay_ms=self.settings.FIRESTORE_BATCH_DELAY_MS
+                )
             self._connected = True
             logger.info("Firebase Firestore initialized successfully")
 
@@ -64,11 +86,16 @@ class FirebaseService:
         """Check if Firebase is connected"""
         return self._connected and self.db is not None
 
+    async def flush_writes(self):
+        """Commit bookkeeping writes still waiting in the write buffer"""
+        if self.write_buffer is not None:
+            await self.write_buffer.close()
+
     async def save_face_data(
         self,
         plate_number: str,
         embedding: List[float],
-        image_url: str
+        image_url: Optional[str]
     ) -> bool:
         """
         Save face embedding and metadata to Firestore
@@ -76,7 +103,7 @@ class FirebaseService:
         Args:
             plate_number: Vehicle plate number (used as document ID)
             embedding: 512-dimensional face embedding
-            image_url: URL of the uploaded image
+            image_url: URL of the uploaded image (None while the upload is pending)
 
         Returns:
             True if successful, False otherwise
@@ -87,7 +114,7 @@ class FirebaseService:
         try:
             doc_data = {
                 "plate_number": plate_number,
-                "embedding": embedding,
+                **encode_embedding(embedding, self.settings.EMBEDDING_CODEC),
                 "registration_image_url": image_url,
                 "registration_date": datetime.utcnow().isoformat(),
                 "last_image_url": image_url,
@@ -100,6 +127,8 @@ class FirebaseService:
             # Save to Firestore using plate_number as document ID
             doc_ref = self.db.collection(self.collection_name).document(plate_number)
             doc_ref.set(doc_data)
+            self.embedding_cache.put(plate_number, embedding)
+            self.face_index.add(plate_number, embedding)
 
             logger.info(f"Successfully saved face data for plate: {plate_number}")
             return True
@@ -127,6 +156,9 @@ class FirebaseService:
 
             if doc.exists:
                 data = doc.to_dict()
+                data["embedding"] = decode_embedding(data)
+                data.pop("embedding_codec", None)
+                data.pop("embedding_scale", None)
                 logger.info(f"Retrieved face data for plate: {plate_number}")
                 return data
             else:
@@ -137,13 +169,179 @@ class FirebaseService:
             logger.error(f"Error retrieving face data: {str(e)}")
             return None
 
-    async def update_last_image(self, plate_number: str, image_url: str) -> bool:
+    async def get_face_embedding(self, plate_number: str) -> Optional[np.ndarray]:
+        """
+        Retrieve only the face embedding, served from the local cache when possible
+
+        Args:
+            plate_number: Vehicle plate number
+
+        Returns:
+            float32 embedding or None if not found
+        """
+        embedding = self.embedding_cache.get(plate_number)
+        if embedding is not None:
+            return embedding
+
+        if not self.is_connected():
+            raise RuntimeError("Firebase not connected")
+
+        try:
+            doc_ref = self.db.collection(self.collection_name).document(plate_number)
+            doc = doc_ref.get(field_paths=EMBEDDING_FIELDS)
+
+            if not doc.exists:
+                logger.info(f"No face data found for plate: {plate_number}")
+                return None
+
+            embedding = decode_embedding(doc.to_dict() or {})
+            if embedding is None:
+                return None
+
+            return self.embedding_cache.put(plate_number, embedding)
+
+        except Exception as e:
+            logger.error(f"Error retrieving face embedding: {str(e)}")
+            return None
+
+    async def warm_embedding_cache(self) -> int:
+        """
+        Load embeddings from the faces collection into the local cache
+
+        Returns:
+            Number of embeddings loaded
+        """
+        if not self.is_connected():
+            raise RuntimeError("Firebase not connected")
+
+        try:
+            docs = self.db.collection(self.collection_name).select(EMBEDDING_FIELDS).stream()
+            decoded = ((doc.id, decode_embedding(doc.to_dict() or {})) for doc in docs)
+            loaded = self.embedding_cache.warm(
+                (plate_number, embedding)
+                for plate_number, embedding in decoded
+                if embedding is not None
+            )
+
+            logger.info(f"Warmed embedding cache with {loaded} faces")
+            return loaded
+
+        except Exception as e:
+            logger.error(f"Error warming embedding cache: {str(e)}")
+            return 0
+
+    async def load_face_index(self) -> int:
+        """
+        Load all registered embeddings into the 1:N identification index
+
+        When FACE_INDEX_PATH points to a saved index it is loaded from disk and
+        only faces registered since it was saved are read from Firestore, while
+        plates deleted since then are found with an id-only scan and dropped;
+        otherwise the index is rebuilt from the whole collection and saved.
+
+        Returns:
+            Number of embeddings indexed
+        """
+        if not self.is_connected():
+            raise RuntimeError("Firebase not connected")
+
+        index_path = self.settings.FACE_INDEX_PATH
+        query = self.db.collection(self.collection_name)
+        from_file = False
+
+        if index_path and os.path.exists(index_path):
+            try:
+                self.face_index.load(index_path)
+                query = query.where(
+                    "created_at", ">", datetime.utcfromtimestamp(self.face_index.saved_at)
+                )
+                from_file = True
+            except Exception as e:
+                logger.warning(f"Failed to load face index file {index_path}: {str(e)}. Rebuilding")
+                self.face_index.clear()
+
+        try:
+            docs = query.select(EMBEDDING_FIELDS).stream()
+            decoded = ((doc.id, decode_embedding(doc.to_dict() or {})) for doc in docs)
+            if not from_file:
+                self.face_index.clear()
+            loaded = self.face_index.build(
+                (plate_number, embedding)
+                for plate_number, embedding in decoded
+                if embedding is not None
+            )
+
+            removed = 0
+            if from_file:
+                removed = self._drop_deleted_plates()
+                logger.info(
+                    f"Face index loaded from file, {loaded} faces registered and "
+                    f"{removed} deleted since it was saved"
+                )
+            else:
+                logger.info(f"Loaded {loaded} faces into identification index")
+            if index_path and (loaded or removed or not from_file):
+                self.save_face_index()
+            return len(self.face_index)
+
+        except Exception as e:
+            logger.error(f"Error loading face index: {str(e)}")
+            return len(self.face_index)
+
+    def _drop_deleted_plates(self) -> int:
+        """Remove indexed plates whose documents no longer exist (ids only, no embeddings read)"""
+        docs = self.db.collection(self.collection_name).select([]).stream()
+        existing = {doc.id for doc in docs}
+        removed = 0
+        for plate_number in self.face_index.plates():
+            if plate_number not in existing and self.face_index.remove(plate_number):
+                removed += 1
+        return removed
+
+    def save_face_index(self) -> bool:
+        """
+        Persist the identification index to FACE_INDEX_PATH
+
+        Returns:
+            True if saved, False if persistence is disabled or failed
+        """
+        if not self.settings.FACE_INDEX_PATH:
+            return False
+
+        try:
+            self.face_index.save(self.settings.FACE_INDEX_PATH)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving face index: {str(e)}")
+            return False
+
+    async def identify_face(self, embedding: List[float], top_k: int = 5,
+                            min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Find the registered plates whose faces best match an embedding
+
+        Args:
+            embedding: Query face embedding
+            top_k: Maximum number of candidates
+            min_score: Minimum similarity of returned candidates
+
+        Returns:
+            Candidates as {"plate_number", "score"} sorted by descending score
+        """
+        # Large galleries take tens of milliseconds to scan; keep the event loop free
+        candidates = await asyncio.to_thread(self.face_index.search, embedding, top_k, min_score)
+        return [
+            {"plate_number": plate_number, "score": score}
+            for plate_number, score in candidates
+        ]
+
+    async def update_last_image(self, plate_number: str, image_url: Optional[str]) -> bool:
         """
         Update last verification image and timestamp
 
         Args:
             plate_number: Vehicle plate number
-            image_url: URL of the new verification image
+            image_url: URL of the new verification image (None leaves it to update_evidence_url)
 
         Returns:
             True if successful, False otherwise
@@ -155,12 +353,20 @@ class FirebaseService:
             doc_ref = self.db.collection(self.collection_name).document(plate_number)
 
             # Increment verification count and update last image
-            doc_ref.update({
-                "last_image_url": image_url,
+            fields = {
                 "last_verification_date": datetime.utcnow().isoformat(),
                 "verification_count": firestore.Increment(1),
                 "updated_at": firestore.SERVER_TIMESTAMP
-            })
+            }
+            if image_url is not None:
+                fields["last_image_url"] = image_url
+
+            if self.write_buffer is not None:
+                # Committed with other bookkeeping writes without holding up the
+                # response; failures are logged by the buffer
+                self.write_buffer.update(doc_ref, fields)
+            else:
+                doc_ref.update(fields)
 
             logger.info(f"Updated last image for plate: {plate_number}")
             return True
@@ -169,6 +375,96 @@ class FirebaseService:
             logger.error(f"Error updating last image: {str(e)}")
             return False
 
+    async def update_evidence_url(self, plate_number: str, image_url: str, is_registration: bool) -> bool:
+        """
+        Record the URL of an evidence image once its upload has completed
+
+        Args:
+            plate_number: Vehicle plate number
+            image_url: Secure URL of the uploaded evidence image
+            is_registration: Also set registration_image_url
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.is_connected():
+            raise RuntimeError("Firebase not connected")
+
+        try:
+            fields = {
+                "last_image_url": image_url,
+                "updated_at": firestore.SERVER_TIMESTAMP
+            }
+            if is_registration:
+                fields["registration_image_url"] = image_url
+
+            doc_ref = self.db.collection(self.collection_name).document(plate_number)
+            if self.write_buffer is not None:
+                if not await self.write_buffer.update(doc_ref, fields):
+                    return False
+            else:
+                doc_ref.update(fields)
+
+            logger.info(f"Recorded evidence image for plate: {plate_number}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error recording evidence image: {str(e)}")
+            return False
+
+    async def migrate_embeddings(self, codec: str, recode: bool = False,
+                                 batch_size: int = 400, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Rewrite stored embeddings in bulk with the given codec
+
+        Args:
+            codec: Target codec (float32, float16 or int8)
+            recode: Also rewrite binary documents stored with a different codec
+            batch_size: Documents per Firestore batch (Firestore allows 500 writes)
+            dry_run: Count documents without writing
+
+        Returns:
+            Counters: scanned, migrated, skipped
+        """
+        if not self.is_connected():
+            raise RuntimeError("Firebase not connected")
+
+        counts = {"scanned": 0, "migrated": 0, "skipped": 0}
+        batch = self.db.batch()
+        pending = 0
+
+        docs = self.db.collection(self.collection_name).select(EMBEDDING_FIELDS).stream()
+        for doc in docs:
+            counts["scanned"] += 1
+            data = doc.to_dict() or {}
+            current_codec = data.get("embedding_codec")
+            needs_rewrite = current_codec is None or (recode and current_codec != codec)
+            embedding = decode_embedding(data) if needs_rewrite else None
+            if embedding is None:
+                counts["skipped"] += 1
+                continue
+
+            counts["migrated"] += 1
+            if dry_run:
+                continue
+
+            fields = encode_embedding(embedding, codec)
+            if codec != "int8":
+                fields["embedding_scale"] = firestore.DELETE_FIELD
+            batch.update(doc.reference, fields)
+            pending += 1
+            if pending >= batch_size:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+
+        if pending:
+            batch.commit()
+
+        self.embedding_cache.clear()
+        logger.info(f"Embedding migration to {codec}: {counts}")
+        return counts
+
     async def delete_face_data(self, plate_number: str) -> bool:
         """
         Delete face data from Firestore
@@ -187,10 +483,21 @@ class FirebaseService:
             doc = doc_ref.get()
 
             if doc.exists:
-                doc_ref.delete()
+                if self.write_buffer is not None:
+                    # Through the buffer so it lands after any queued update of this plate
+                    if not await self.write_buffer.delete(doc_ref):
+                        logger.error(f"Failed to delete face data for plate: {plate_number}")
+                        return False
+                else:
+                    doc_ref.delete()
+                # Only once the delete is committed, so a failed one keeps the plate identifiable
+                self.embedding_cache.invalidate(plate_number)
+                self.face_index.remove(plate_number)
                 logger.info(f"Deleted face data for plate: {plate_number}")
                 return True
             else:
+                self.embedding_cache.invalidate(plate_number)
+                self.face_index.remove(plate_number)
                 logger.info(f"No face data found to delete for plate: {plate_number}")
                 return False
 
@@ -0,0 +1,224 @@
+"""
+Write-coalescing buffer for Firestore
+Writes are queued per document, merged while they wait (later fields win,
+Increments add up) and committed as one WriteBatch when the buffer reaches
+max_batch_size or max_delay_ms after the first queued write, whichever comes
+first. Commits run off the event loop.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from google.cloud import firestore
+
+logger = logging.getLogger(__name__)
+
+# Firestore allows 500 writes per batch
+MAX_WRITES_PER_BATCH = 500
+
+class _PendingWrite:
+    """One queued write (set, update or delete) and the futures waiting for it"""
+
+    __slots__ = ("kind", "ref", "data", "merge", "futures")
+
+    def __init__(self, kind: str, ref, data: Optional[Dict[str, Any]], merge: bool):
+        self.kind = kind
+        self.ref = ref
+        self.data = dict(data) if data is not None else None
+        self.merge = merge
+        self.futures: List[asyncio.Future] = []
+
+    def absorb(self, kind: str, data: Optional[Dict[str, Any]], merge: bool) -> bool:
+        """
+        Merge a later write to the same document into this one
+
+        Returns:
+            False if the two writes cannot be expressed as a single write
+        """
+        if kind == "delete" or (kind == "set" and not merge):
+            self.kind, self.data, self.merge = kind, (dict(data) if data is not None else None), merge
+            return True
+        if self.kind == "delete":
+            if kind == "update":
+                return False  # update of a deleted document must fail as it would have
+            self.kind, self.data, self.merge = "set", dict(data), False
+            return True
+
+        for key, value in data.items():
+            self.data[key] = _combine(self.data.get(key), value)
+        if self.kind == "update" and kind == "set":
+            # set(merge=True) also creates the document, update would not
+            self.kind, self.merge = "set", True
+        return True
+
+    def apply(self, batch):
+        if self.kind == "set":
+            batch.set(self.ref, self.data, merge=self.merge)
+        elif self.kind == "update":
+            batch.update(self.ref, self.data)
+        else:
+            batch.delete(self.ref)
+
+def _combine(old: Any, new: Any) -> Any:
+    """Value of a field written twice; Increments add up"""
+    if isinstance(new, firestore.Increment):
+        if isinstance(old, firestore.Increment):
+            return firestore.Increment(old.value + new.value)
+        if isinstance(old, (int, float)) and not isinstance(old, bool):
+            return old + new.value
+    return new
+
+class FirestoreWriteBuffer:
+    """Coalesces Firestore writes into batched commits flushed on size or time"""
+
+    def __init__(self, db, max_batch_size: int = 400, max_delay_ms: float = 50):
+        """
+        Initialize the buffer
+
+        Args:
+            db: Firestore client
+            max_batch_size: Documents per commit (capped at Firestore's 500)
+            max_delay_ms: Longest time a write waits for others before it is committed
+        """
+        self.db = db
+        self.max_batch_size = max(1, min(MAX_WRITES_PER_BATCH, max_batch_size))
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._overflow: List[_PendingWrite] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._commit_lock: Optional[asyncio.Lock] = None
+        self._flushes = set()
+
+        self._requested = 0
+        self._flushed = 0
+        self._coalesced = 0
+        self._committed = 0
+        self._round_trips = 0
+        self._failed = 0
+        self._commit_seconds = 0.0
+
+    def set(self, ref, data: Dict[str, Any], merge: bool = False) -> asyncio.Future:
+        """Queue DocumentReference.set; the future resolves to True/False once committed"""
+        return self._queue("set", ref, data, merge)
+
+    def update(self, ref, fields: Dict[str, Any]) -> asyncio.Future:
+        """Queue DocumentReference.update; the future resolves to True/False once committed"""
+        return self._queue("update", ref, fields, False)
+
+    def delete(self, ref) -> asyncio.Future:
+        """Queue DocumentReference.delete; the future resolves to True/False once committed"""
+        return self._queue("delete", ref, None, False)
+
+    def _queue(self, kind: str, ref, data: Optional[Dict[str, Any]], merge: bool) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._requested += 1
+
+        pending = self._pending.get(ref.path)
+        if pending is not None and pending.absorb(kind, data, merge):
+            self._coalesced += 1
+        else:
+            if pending is not None:
+                # Not mergeable: commit the earlier write first, in its own batch
+                self._overflow.append(self._pending.pop(ref.path))
+            pending = _PendingWrite(kind, ref, data, merge)
+            self._pending[ref.path] = pending
+        pending.futures.append(future)
+
+        if len(self._pending) + len(self._overflow) >= self.max_batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._schedule_flush)
+        return future
+
+    def _schedule_flush(self):
+        task = asyncio.ensure_future(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> int:
+        """
+        Commit everything queued so far
+
+        Returns:
+            Number of documents written
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._commit_lock is None:
+            self._commit_lock = asyncio.Lock()
+
+        written = 0
+        async with self._commit_lock:
+            while self._overflow or self._pending:
+                if self._overflow:
+                    writes, self._overflow = self._overflow, []
+                else:
+                    writes, self._pending = list(self._pending.values()), {}
+                for start in range(0, len(writes), self.max_batch_size):
+                    written += await self._commit(writes[start:start + self.max_batch_size])
+        return written
+
+    async def _commit(self, writes: List[_PendingWrite]) -> int:
+        start = time.perf_counter()
+        try:
+            self._round_trips += 1
+            await asyncio.to_thread(self._commit_batch, writes)
+            self._committed += len(writes)
+            results = [True] * len(writes)
+        except Exception as e:
+            # A batch is atomic: one bad write (e.g. update of a missing document)
+            # must not drop the others, so fall back to one commit per document
+            logger.warning(f"Batched Firestore commit of {len(writes)} writes failed: {str(e)}. "
+                           f"Retrying individually")
+            results = []
+            for write in writes:
+                self._round_trips += 1
+                try:
+                    await asyncio.to_thread(self._commit_batch, [write])
+                    self._committed += 1
+                    results.append(True)
+                except Exception as write_error:
+                    self._failed += 1
+                    logger.error(f"Firestore write to {write.ref.path} failed: {str(write_error)}")
+                    results.append(False)
+        finally:
+            self._commit_seconds += time.perf_counter() - start
+
+        for write, ok in zip(writes, results):
+            self._flushed += len(write.futures)
+            for future in write.futures:
+                if not future.done():
+                    future.set_result(ok)
+        return sum(results)
+
+    def _commit_batch(self, writes: List[_PendingWrite]):
+        batch = self.db.batch()
+        for write in writes:
+            write.apply(batch)
+        batch.commit()
+
+    async def close(self):
+        """Commit pending writes (call on shutdown)"""
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """Get write counters"""
+        round_trips = self._round_trips
+        return {
+            "pending": len(self._pending) + len(self._overflow),
+            "writes_requested": self._requested,
+            "writes_coalesced": self._coalesced,
+            "documents_committed": self._committed,
+            "failed": self._failed,
+            "commits": round_trips,
+            # Without the buffer every flushed write would have been its own round trip
+            "round_trips_saved": max(0, self._flushed - round_trips),
+            "avg_writes_per_commit": (self._flushed / round_trips) if round_trips else 0.0,
+            "avg_commit_ms": (self._commit_seconds / round_trips * 1000) if round_trips else 0.0
+        }
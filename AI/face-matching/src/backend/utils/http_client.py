@@ -0,0 +1,149 @@
+"""
+Shared pooled async HTTP client for image downloads
+Keep-alive connections, HTTP/2 when the h2 package is installed, a per-host
+concurrency limit and a streaming size cap
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class ImageTooLargeError(ValueError):
+    """Raised when a download exceeds the configured size cap"""
+
+class PooledHttpClient:
+    """Lazily created httpx.AsyncClient shared by all downloads of a service"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 30.0,
+        http2: bool = True
+    ):
+        """
+        Initialize the client settings (no connection is opened yet)
+
+        Args:
+            max_connections: Total connections kept by the pool
+            max_connections_per_host: Concurrent requests allowed per host
+            keepalive_expiry: Seconds an idle connection stays open
+            timeout: Request timeout in seconds
+            http2: Negotiate HTTP/2 when the h2 package is installed
+        """
+        self.max_connections = max_connections
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 package not installed. HTTP/2 disabled for image downloads")
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._requests = 0
+        self._errors = 0
+        self._oversize = 0
+        self._bytes = 0
+        self._in_flight = 0
+        self._total_seconds = 0.0
+        self._http_versions: Dict[str, int] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the underlying client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                follow_redirects=True
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        """Per-host semaphore (httpx only limits connections pool-wide)"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_limits[host] = semaphore
+        return semaphore
+
+    async def fetch(self, url: str, max_bytes: int = 0) -> bytearray:
+        """
+        Download a URL into memory, aborting as soon as it exceeds max_bytes
+
+        Args:
+            url: URL to download
+            max_bytes: Size cap in bytes (0 = unlimited)
+
+        Returns:
+            Response body
+        """
+        url = str(url)
+        start = time.perf_counter()
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            async with self._host_limit(url):
+                async with self._get_client().stream("GET", url) as response:
+                    response.raise_for_status()
+                    self._http_versions[response.http_version] = self._http_versions.get(response.http_version, 0) + 1
+
+                    declared = int(response.headers.get("content-length") or 0)
+                    if max_bytes and declared > max_bytes:
+                        raise ImageTooLargeError(f"Image is {declared} bytes, limit is {max_bytes}")
+
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if max_bytes and len(body) > max_bytes:
+                            raise ImageTooLargeError(f"Image exceeds limit of {max_bytes} bytes")
+
+            self._bytes += len(body)
+            return body
+
+        except ImageTooLargeError:
+            self._oversize += 1
+            raise
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._total_seconds += time.perf_counter() - start
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> dict:
+        """Get request counters"""
+        return {
+            "http2": self.http2,
+            "requests": self._requests,
+            "in_flight": self._in_flight,
+            "errors": self._errors,
+            "rejected_oversize": self._oversize,
+            "bytes": self._bytes,
+            "avg_ms": (self._total_seconds / self._requests * 1000) if self._requests else 0.0,
+            "http_versions": dict(self._http_versions)
+        }
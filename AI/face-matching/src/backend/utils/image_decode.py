@@ -0,0 +1,193 @@
+"""
+Reduced-resolution JPEG decoding
+The frame size is read from the JPEG header and the frame is decoded with
+libjpeg's DCT scaling (IMREAD_REDUCED_COLOR_2/4/8) when the working width
+allows it. The encoded bytes are kept so a region can still be cropped from
+the full-resolution frame, which is decoded only when that is needed.
+"""
+import math
+import struct
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+# (x, y, w, h) in pixel coordinates
+Box = Tuple[int, int, int, int]
+
+REDUCED_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+# Start-of-frame markers carrying the image size (all except DHT/JPG/DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def read_jpeg_size(data: Union[bytes, bytearray, memoryview]) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from a JPEG header without decoding it
+
+    Args:
+        data: Encoded image
+
+    Returns:
+        (width, height), or None if the data is not a readable JPEG
+    """
+    data = memoryview(data)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:  # markers without a length
+            offset += 2
+            continue
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if marker in _SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return (width, height) if width and height else None
+        if marker == 0xDA:  # start of scan: no SOF before the image data
+            return None
+        offset += 2 + length
+    return None
+
+def choose_reduction(width: int, target_width: int) -> int:
+    """
+    Largest DCT scale factor that keeps the decoded width at or above target_width
+
+    Args:
+        width: Full-resolution width
+        target_width: Working width (0 = full resolution)
+
+    Returns:
+        1, 2, 4 or 8
+    """
+    if not target_width:
+        return 1
+    for factor in (8, 4, 2):
+        if math.ceil(width / factor) >= target_width:
+            return factor
+    return 1
+
+class DecodedFrame:
+    """A decoded (possibly reduced) frame plus what is needed to get the full one"""
+
+    def __init__(
+        self,
+        image: np.ndarray,
+        encoded: Optional[bytes] = None,
+        reduction: int = 1,
+        full_size: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Initialize the frame
+
+        Args:
+            image: Decoded image (BGR), reduced by `reduction`
+            encoded: Encoded bytes, required when reduction > 1
+            reduction: DCT scale factor the image was decoded with
+            full_size: (width, height) of the full-resolution frame
+        """
+        self.image = image
+        self.encoded = encoded
+        self.reduction = reduction
+        self.full_size = full_size or (image.shape[1], image.shape[0])
+        self._full: Optional[np.ndarray] = image if reduction == 1 else None
+
+    @property
+    def scale(self) -> Tuple[float, float]:
+        """(x, y) factors mapping reduced coordinates to full resolution"""
+        return self.full_size[0] / self.image.shape[1], self.full_size[1] / self.image.shape[0]
+
+    def full_resolution(self) -> np.ndarray:
+        """Full-resolution image, decoded on first use"""
+        if self._full is None:
+            full = cv2.imdecode(np.frombuffer(self.encoded, np.uint8), cv2.IMREAD_COLOR)
+            if full is None:
+                raise ValueError("Failed to decode image")
+            self._full = full
+        return self._full
+
+    def for_width(self, width: int) -> np.ndarray:
+        """
+        Smallest decoded version at least `width` pixels wide
+
+        Args:
+            width: Required width (0 = full resolution)
+
+        Returns:
+            The reduced image if wide enough, otherwise the full-resolution one
+        """
+        if width and self.image.shape[1] >= width:
+            return self.image
+        return self.full_resolution()
+
+    def to_full(self, box: Box) -> Box:
+        """Map a box from reduced to full-resolution coordinates"""
+        scale_x, scale_y = self.scale
+        x, y, w, h = box
+        x0, y0 = max(0, round(x * scale_x)), max(0, round(y * scale_y))
+        x1 = min(self.full_size[0], round((x + w) * scale_x))
+        y1 = min(self.full_size[1], round((y + h) * scale_y))
+        return int(x0), int(y0), int(x1 - x0), int(y1 - y0)
+
+    def crop(self, box: Box, min_size: int = 0) -> np.ndarray:
+        """
+        Crop a full-resolution region
+
+        The crop is taken from the reduced image when it still has at least
+        min_size pixels on its shorter side; otherwise the full-resolution
+        frame is decoded and cropped.
+
+        Args:
+            box: (x, y, w, h) in full-resolution coordinates
+            min_size: Pixels needed on the shorter side of the crop (e.g. model input size)
+
+        Returns:
+            Cropped image
+        """
+        x, y, w, h = box
+        if self.reduction > 1:
+            scale_x, scale_y = self.scale
+            if min(w / scale_x, h / scale_y) >= min_size:
+                x0, y0 = int(x / scale_x), int(y / scale_y)
+                x1, y1 = math.ceil((x + w) / scale_x), math.ceil((y + h) / scale_y)
+                return self.image[y0:y1, x0:x1]
+        return self.full_resolution()[y:y + h, x:x + w]
+
+def decode_frame(data: Union[bytes, bytearray], target_width: int = 0) -> DecodedFrame:
+    """
+    Decode an image at the smallest DCT scale that is still target_width wide
+
+    Args:
+        data: Encoded image
+        target_width: Working width (0 = full resolution)
+
+    Returns:
+        DecodedFrame (full resolution for non-JPEG input or small frames)
+    """
+    data = bytes(data)
+    size = read_jpeg_size(data)
+    reduction = choose_reduction(size[0], target_width) if size else 1
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_COLOR_FLAGS[reduction])
+    if image is None:
+        raise ValueError("Failed to decode image")
+    if reduction == 1:
+        return DecodedFrame(image, data)
+
+    width, height = size
+    # EXIF orientation is applied while decoding: the header size may be transposed
+    if image.shape[1] != math.ceil(width / reduction) and image.shape[1] == math.ceil(height / reduction):
+        width, height = height, width
+    return DecodedFrame(image, data, reduction, (width, height))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Rewrite embeddings in the faces collection with a binary codec
+
+Legacy documents (embedding stored as a list of floats) are always rewritten;
+--recode also converts binary documents stored with a different codec.
+
+Usage (from src/):
+    python -m backend.utils.migrate_embeddings --codec float16 --dry-run
+    python -m backend.utils.migrate_embeddings --codec float16
+"""
+import argparse
+import asyncio
+
+from backend.config.settings import settings
+from backend.utils.embedding_codec import EMBEDDING_CODECS
+from backend.utils.firebase import FirebaseService
+
+async def main(args):
+    firebase_service = FirebaseService()
+    if not firebase_service.is_connected():
+        raise SystemExit("Firebase not connected")
+
+    print(f"Migrating '{firebase_service.collection_name}' embeddings to {args.codec}"
+          f"{' (dry run)' if args.dry_run else ''}...")
+    counts = await firebase_service.migrate_embeddings(
+        codec=args.codec,
+        recode=args.recode,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run
+    )
+    print(f"Scanned: {counts['scanned']}, "
+          f"{'would migrate' if args.dry_run else 'migrated'}: {counts['migrated']}, "
+          f"skipped: {counts['skipped']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate stored face embeddings to a binary codec")
+    parser.add_argument("--codec", default=settings.EMBEDDING_CODEC, choices=EMBEDDING_CODECS)
+    parser.add_argument("--recode", action="store_true", help="Also rewrite binary documents with another codec")
+    parser.add_argument("--batch-size", type=int, default=400)
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recall vs latency of the IVF face index against exact search
+
+The gallery is synthetic: embeddings are drawn around a set of latent
+centres (face embeddings cluster by pose, age, lighting...), and each query
+is a noisy copy of a registered embedding, i.e. a new photo of a known face.
+Recall@k is the fraction of the exact top-k found by the IVF index.
+
+Usage (from src/):
+    python -m benchmarks.bench_ann_index --size 100000 --nprobe 1,2,4,8,16,32
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.models.models.face_index import FlatFaceIndex, IVFFaceIndex
+from backend.models.models.similarity import normalize_rows
+
+def make_gallery(size: int, dim: int, centres: int, spread: float, rng) -> np.ndarray:
+    """Clustered unit embeddings"""
+    centre_vectors = normalize_rows(rng.standard_normal((centres, dim), dtype=np.float32))
+    gallery = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 65536):
+        count = min(65536, size - start)
+        block = centre_vectors[rng.integers(0, centres, count)]
+        block += spread * rng.standard_normal((count, dim), dtype=np.float32) / np.sqrt(dim)
+        gallery[start:start + count] = normalize_rows(block)
+    return gallery
+
+def timed_search(index, queries, top_k: int):
+    """Results and per-query latencies"""
+    results, samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([plate for plate, _ in index.search(query, top_k)])
+        samples.append(time.perf_counter() - start)
+    return results, np.array(samples) * 1000
+
+def recall(exact, approximate, k: int) -> float:
+    hits = sum(len(set(e[:k]) & set(a[:k])) for e, a in zip(exact, approximate))
+    return hits / (len(exact) * k)
+
+def main(args):
+    rng = np.random.default_rng(0)
+    gallery = make_gallery(args.size, args.dim, args.centres, args.spread, rng)
+    plates = [f"PLATE-{i}" for i in range(args.size)]
+
+    picked = rng.integers(0, args.size, args.queries)
+    queries = gallery[picked] + args.query_noise * rng.standard_normal((args.queries, args.dim), dtype=np.float32) / np.sqrt(args.dim)
+    queries = normalize_rows(queries)
+
+    flat = FlatFaceIndex()
+    flat.add_many(plates, gallery)
+    exact, exact_ms = timed_search(flat, queries, args.top_k)
+    self_hit = np.mean([e[0] == plates[i] for e, i in zip(exact, picked)])
+
+    start = time.perf_counter()
+    ivf = IVFFaceIndex(nlist=args.nlist, min_train_size=1)
+    ivf.build(zip(plates, gallery), chunk_size=args.size)
+    build_s = time.perf_counter() - start
+    stats = ivf.get_stats()
+
+    print(f"n={args.size}, dim={args.dim}, top_k={args.top_k}, {args.queries} queries, "
+          f"exact top-1 is the source face for {self_hit:.1%} of queries")
+    print(f"ivf nlist={stats['nlist']}, largest list={stats['largest_list']}, build={build_s:.1f} s")
+    print("-" * 96)
+    print(f"{'exact':<12} recall@1=1.000  recall@{args.top_k}=1.000  "
+          f"p50={np.percentile(exact_ms, 50):>7.2f} ms  p95={np.percentile(exact_ms, 95):>7.2f} ms")
+
+    for nprobe in [int(value) for value in args.nprobe.split(",")]:
+        ivf.nprobe = nprobe
+        approximate, ivf_ms = timed_search(ivf, queries, args.top_k)
+        print(f"{'nprobe=' + str(nprobe):<12} recall@1={recall(exact, approximate, 1):.3f}  "
+              f"recall@{args.top_k}={recall(exact, approximate, args.top_k):.3f}  "
+              f"p50={np.percentile(ivf_ms, 50):>7.2f} ms  p95={np.percentile(ivf_ms, 95):>7.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IVF face index recall/latency benchmark")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = sqrt(size)")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32")
+    parser.add_argument("--centres", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=1.0)
+    parser.add_argument("--query-noise", type=float, default=0.5)
+    main(parser.parse_args())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: downscale-before-detect, detection time vs accuracy
+
+Runs the configured face detector at several detection widths on the
+face-detection test set (images/ + YOLO labels/) and reports per-image time,
+image-level precision/recall (same rule as AI/face-detection/evaluate.py) and
+the share of ground-truth faces matched with IoU >= 0.5 after mapping boxes
+back to full resolution. Without labels, full-resolution detections are used
+as the reference.
+
+Usage (from src/):
+    python -m benchmarks.bench_detection_width --dataset ../../face-detection/dataset/test
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backend.models.models.face_detectors import FACE_DETECTORS, HaarFaceDetector
+
+DEFAULT_DATASET_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "face-detection", "dataset", "test")
+
+Box = Tuple[int, int, int, int]
+
+def load_dataset(dataset_dir: str, limit: int) -> List[Tuple[np.ndarray, Optional[List[Box]]]]:
+    """Load images with ground-truth boxes (None when no label directory exists)"""
+    image_dir = os.path.join(dataset_dir, "images")
+    label_dir = os.path.join(dataset_dir, "labels")
+    has_labels = os.path.isdir(label_dir)
+
+    samples = []
+    names = sorted(f for f in os.listdir(image_dir) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    for name in names[:limit]:
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is None:
+            continue
+        boxes = None
+        if has_labels:
+            boxes = []
+            label_path = os.path.join(label_dir, os.path.splitext(name)[0] + ".txt")
+            if os.path.exists(label_path):
+                h, w = image.shape[:2]
+                with open(label_path) as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) < 5:
+                            continue
+                        cx, cy, bw, bh = (float(v) for v in parts[1:5])
+                        boxes.append((int((cx - bw / 2) * w), int((cy - bh / 2) * h), int(bw * w), int(bh * h)))
+        samples.append((image, boxes))
+    return samples
+
+def iou(a: Box, b: Box) -> float:
+    """Intersection over union of two (x, y, w, h) boxes"""
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+def evaluate(detector, samples, width: int, references: List[List[Box]]) -> Dict[str, float]:
+    """Time detection at one width and score it against the references"""
+    tp = fp = fn = 0
+    matched = total_faces = 0
+    latencies = []
+    for (image, _), reference in zip(samples, references):
+        start = time.perf_counter()
+        faces = detector.detect_downscaled(image, width)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if faces and reference:
+            tp += 1
+        elif faces:
+            fp += 1
+        elif reference:
+            fn += 1
+        total_faces += len(reference)
+        matched += sum(1 for ref in reference if any(iou(ref, face) >= 0.5 for face in faces))
+
+    latencies = np.array(latencies)
+    return {
+        "mean_ms": latencies.mean(),
+        "p95_ms": np.percentile(latencies, 95),
+        "precision": tp / (tp + fp) if (tp + fp) else 0.0,
+        "recall": tp / (tp + fn) if (tp + fn) else 0.0,
+        "box_recall": matched / total_faces if total_faces else 0.0
+    }
+
+def main(args):
+    samples = load_dataset(args.dataset, args.limit)
+    if not samples:
+        raise SystemExit(f"No images found in {args.dataset}/images")
+
+    if args.detector == HaarFaceDetector.name:
+        detector = HaarFaceDetector()
+    else:
+        detector = FACE_DETECTORS[args.detector](model_dir=args.model_dir)
+    detector.load()
+
+    if all(boxes is not None for _, boxes in samples):
+        references = [boxes for _, boxes in samples]
+        print(f"{len(samples)} images, scored against YOLO labels")
+    else:
+        references = [detector.detect(image) for image, _ in samples]
+        print(f"{len(samples)} images, no labels found: scored against full-resolution detections")
+
+    print(f"detector={detector.name}")
+    print("-" * 84)
+    for width in args.widths:
+        result = evaluate(detector, samples, width, references)
+        label = "full" if width == 0 else str(width)
+        print(f"width={label:<6} mean={result['mean_ms']:>7.1f} ms  p95={result['p95_ms']:>7.1f} ms  "
+              f"precision={result['precision']:.3f}  recall={result['recall']:.3f}  "
+              f"box_recall@0.5={result['box_recall']:.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detection width benchmark")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_DIR)
+    parser.add_argument("--detector", default="haar", choices=list(FACE_DETECTORS))
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--widths", type=int, nargs="+", default=[0, 960, 640, 480, 320])
+    parser.add_argument("--limit", type=int, default=300)
+    main(parser.parse_args())
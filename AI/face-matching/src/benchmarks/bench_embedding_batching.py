@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: micro-batched vs one-at-a-time embedding extraction on CPU
+
+Usage (from src/):
+    python -m benchmarks.bench_embedding_batching --requests 256 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision.models import resnet50
+
+from backend.models.models.vggface2 import VGGFace2Model
+from backend.inference.batcher import EmbeddingBatcher
+
+def build_model() -> VGGFace2Model:
+    """Build a CPU VGGFace2Model with random ResNet50 weights (timing only)"""
+    model = VGGFace2Model(model_type="vggface2")
+    model.device = torch.device("cpu")
+    model.model = resnet50()
+    model.model.fc = nn.Linear(model.model.fc.in_features, model.embedding_size)
+    model.model.eval()
+    model._loaded = True
+    return model
+
+def make_inputs(model: VGGFace2Model, count: int) -> List[torch.Tensor]:
+    """Create preprocessed face tensors from random 160x160 BGR crops"""
+    rng = np.random.default_rng(0)
+    faces = rng.integers(0, 255, size=(count, 160, 160, 3), dtype=np.uint8)
+    return [model.preprocess_image(face) for face in faces]
+
+async def run_load(model: VGGFace2Model, inputs: List[torch.Tensor], concurrency: int) -> Tuple[float, List[float]]:
+    """Fire all inputs with bounded concurrency and collect per-request latency"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request(processed_input):
+        async with semaphore:
+            start = time.perf_counter()
+            await model.get_embedding(processed_input)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(x) for x in inputs))
+    return time.perf_counter() - start, latencies
+
+def report(label: str, elapsed: float, latencies: List[float], extra: str = ""):
+    """Print one result row"""
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{label:<22} {len(latencies) / elapsed:>8.1f} req/s   "
+          f"p50={np.percentile(latencies_ms, 50):>7.1f} ms   "
+          f"p99={np.percentile(latencies_ms, 99):>7.1f} ms   {extra}")
+
+async def main(args):
+    torch.set_num_threads(args.threads)
+    model = build_model()
+    inputs = make_inputs(model, args.requests)
+
+    # Warm up kernels so the first mode is not penalised
+    model.embed_batch(inputs[:2])
+
+    print(f"ResNet50 on CPU, {args.requests} requests, concurrency={args.concurrency}, "
+          f"threads={args.threads}")
+    print("-" * 80)
+
+    elapsed, latencies = await run_load(model, inputs, args.concurrency)
+    report("one-at-a-time", elapsed, latencies)
+
+    for max_batch_size in args.batch_sizes:
+        batcher = EmbeddingBatcher(model, max_batch_size=max_batch_size, max_wait_ms=args.max_wait_ms)
+        await batcher.start()
+        model.set_batcher(batcher)
+        elapsed, latencies = await run_load(model, inputs, args.concurrency)
+        stats = batcher.get_stats()
+        model.set_batcher(None)
+        await batcher.stop()
+        report(f"batched (max={max_batch_size})", elapsed, latencies,
+               f"avg batch={stats['avg_batch_size']:.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding batching benchmark")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    asyncio.run(main(parser.parse_args()))
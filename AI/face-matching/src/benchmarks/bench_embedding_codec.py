@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serialized size and decode time per embedding codec
+
+Sizes are the Firestore wire size of the embedding value: an array of
+doubles costs ~9 bytes per element (1 tag byte + 8 bytes), a bytes value
+costs its length plus a small header. JSON size is shown for reference.
+
+Usage (from src/):
+    python -m benchmarks.bench_embedding_codec --count 2000 --dim 512
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from backend.utils.embedding_codec import EMBEDDING_CODECS, decode_embedding, encode_embedding
+
+def varint_size(value: int) -> int:
+    """Bytes needed to encode a protobuf varint"""
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
+
+def firestore_array_size(dim: int) -> int:
+    """Approximate protobuf size of an array of doubles"""
+    value = 1 + 8  # double_value: tag + 8 bytes
+    payload = dim * (1 + varint_size(value) + value)  # repeated Value inside ArrayValue
+    return 1 + varint_size(payload) + payload
+
+def firestore_bytes_size(length: int) -> int:
+    """Approximate protobuf size of a bytes value"""
+    return 1 + varint_size(length) + length
+
+def time_decode(docs, repeat: int = 3) -> float:
+    """Best-of-N microseconds per decoded embedding"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            decode_embedding(doc)
+        best = min(best, time.perf_counter() - start)
+    return best / len(docs) * 1e6
+
+def main(args):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.count, args.dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    print(f"{args.count} embeddings, dim={args.dim}")
+    print("-" * 96)
+
+    legacy_docs = [{"embedding": embedding.astype(np.float64).tolist()} for embedding in embeddings]
+    json_size = len(json.dumps(legacy_docs[0]["embedding"]))
+    print(f"{'legacy list':<12} wire={firestore_array_size(args.dim):>6} B   json={json_size:>6} B   "
+          f"decode={time_decode(legacy_docs):>7.2f} us   max cos err=0")
+
+    for codec in EMBEDDING_CODECS:
+        docs = [encode_embedding(embedding, codec) for embedding in embeddings]
+        decoded = np.stack([decode_embedding(doc) for doc in docs])
+        cosine = np.sum(decoded * embeddings, axis=1) / np.linalg.norm(decoded, axis=1)
+        print(f"{codec:<12} wire={firestore_bytes_size(len(docs[0]['embedding'])):>6} B   "
+              f"{'':>13}   decode={time_decode(docs):>7.2f} us   "
+              f"max cos err={float(np.max(1 - cosine)):.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding codec benchmark")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=512)
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes uploaded and CPU time per evidence image
+
+Compares the previous temp-file path (imencode at OpenCV's default quality,
+tobytes, NamedTemporaryFile, SDK reads the file back, unlink) with the
+in-memory path (imencode at EVIDENCE_JPEG_QUALITY with optional downscale,
+memoryview over the encoder output). Both end by writing the payload into a
+multipart body the way the HTTP client does; the network is not involved.
+
+Usage (from src/):
+    python -m benchmarks.bench_evidence_upload --frames 50 --width 1600
+"""
+import argparse
+import glob
+import io
+import os
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "smart-parking", "dataset", "test", "images")
+
+def load_frames(image_dir: str, count: int, width: int) -> List[np.ndarray]:
+    """Gate-camera-sized frames from the dataset (synthetic if it is missing)"""
+    height = width * 3 // 4
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))[:count]
+    frames = [cv2.imread(path) for path in paths]
+    frames = [cv2.resize(frame, (width, height), interpolation=cv2.INTER_CUBIC) for frame in frames if frame is not None]
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+                  for _ in range(count)]
+    return frames
+
+def multipart(payload) -> int:
+    """Copy the payload into a request body (what urllib3 does with file data)"""
+    body = io.BytesIO()
+    body.write(b"--boundary\r\nContent-Disposition: form-data; name=\"file\"\r\n\r\n")
+    body.write(payload)
+    body.write(b"\r\n--boundary--\r\n")
+    return len(payload)
+
+def legacy_upload(image: np.ndarray) -> int:
+    """Previous upload_evidence: encode, copy, temp file, read back, unlink"""
+    _, buffer = cv2.imencode('.jpg', image)
+    image_bytes = buffer.tobytes()
+    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
+        temp_file.write(image_bytes)
+        temp_file_path = temp_file.name
+    try:
+        with open(temp_file_path, "rb") as opened:
+            return multipart(opened.read())
+    finally:
+        os.unlink(temp_file_path)
+
+def in_memory_upload(quality: int, max_width: Optional[int]) -> Callable:
+    """Current encode_evidence + upload_encoded_evidence"""
+    def run(image: np.ndarray) -> int:
+        if max_width and image.shape[1] > max_width:
+            while image.shape[1] // 2 >= max_width:
+                image = cv2.pyrDown(image)
+            if image.shape[1] > max_width:
+                height = max(1, round(image.shape[0] * max_width / image.shape[1]))
+                image = cv2.resize(image, (max_width, height), interpolation=cv2.INTER_LINEAR)
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return multipart(memoryview(buffer.reshape(-1)))
+    return run
+
+def measure(label: str, func: Callable, frames: List[np.ndarray]):
+    for frame in frames[:3]:
+        func(frame)  # warm-up
+    total_bytes = 0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for frame in frames:
+        total_bytes += func(frame)
+    cpu_ms = (time.process_time() - cpu_start) / len(frames) * 1000
+    wall_ms = (time.perf_counter() - wall_start) / len(frames) * 1000
+    print(f"{label:<28} {total_bytes / len(frames) / 1024:>8.1f} KiB/image   "
+          f"cpu={cpu_ms:>6.2f} ms   wall={wall_ms:>6.2f} ms")
+
+def main(args):
+    frames = load_frames(args.images, args.frames, args.width)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print("-" * 80)
+    measure("temp file (q95)", legacy_upload, frames)
+    for quality in (95, 90, 80):
+        measure(f"in memory q{quality}", in_memory_upload(quality, None), frames)
+    for max_width in (1280, 800, 640):
+        measure(f"in memory q90 max {max_width}px", in_memory_upload(90, max_width), frames)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evidence upload payload benchmark")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_DIR)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1600, help="Frame width (ESP32-CAM UXGA is 1600)")
+    main(parser.parse_args())
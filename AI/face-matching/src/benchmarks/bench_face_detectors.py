@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: face detection latency per detector
+
+Compares the old per-call Haar cascade load against the pooled Haar, SSD and
+YuNet detectors. DNN detectors are skipped if their model files are missing.
+
+Usage (from src/):
+    python -m benchmarks.bench_face_detectors --images ../../face-detection/dataset/test/images
+"""
+import argparse
+import os
+import time
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+from backend.models.models.face_detectors import FACE_DETECTORS, HaarFaceDetector
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "face-detection", "dataset", "test", "images")
+
+def load_images(image_dir: str, limit: int) -> List[np.ndarray]:
+    """Load test images, or synthesize 1600x1200 frames if the directory is missing"""
+    if image_dir and os.path.isdir(image_dir):
+        names = sorted(f for f in os.listdir(image_dir) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+        images = [cv2.imread(os.path.join(image_dir, name)) for name in names[:limit]]
+        images = [image for image in images if image is not None]
+        if images:
+            return images
+
+    print(f"Image directory not found ({image_dir}), using synthetic 1600x1200 frames")
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, size=(1200, 1600, 3), dtype=np.uint8) for _ in range(min(limit, 20))]
+
+def haar_reload_per_call(image: np.ndarray):
+    """Previous detect_face behaviour: parse the cascade XML on every call"""
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+
+def time_detector(detect: Callable, images: List[np.ndarray]):
+    """Return per-image latencies (ms) and number of images with a face"""
+    latencies = []
+    detected = 0
+    for image in images:
+        start = time.perf_counter()
+        faces = detect(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+        detected += int(len(faces) > 0)
+    return np.array(latencies), detected
+
+def main(args):
+    images = load_images(args.images, args.limit)
+    print(f"{len(images)} images, mean size {np.mean([i.shape[1] for i in images]):.0f}x"
+          f"{np.mean([i.shape[0] for i in images]):.0f}")
+    print("-" * 72)
+
+    candidates = [("haar (reload/call)", haar_reload_per_call)]
+    for name, detector_cls in FACE_DETECTORS.items():
+        detector = HaarFaceDetector() if detector_cls is HaarFaceDetector else detector_cls(model_dir=args.model_dir)
+        try:
+            detector.load()
+        except Exception as e:
+            print(f"{name:<20} skipped: {e}")
+            continue
+        candidates.append((name, detector.detect))
+
+    for label, detect in candidates:
+        detect(images[0])  # warm-up
+        latencies, detected = time_detector(detect, images)
+        print(f"{label:<20} mean={latencies.mean():>7.1f} ms   p95={np.percentile(latencies, 95):>7.1f} ms   "
+              f"faces found in {detected}/{len(images)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face detector latency benchmark")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_DIR)
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--limit", type=int, default=100)
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 1:N identification latency of the flat face index
+
+Fills the index with random unit embeddings and times top-k searches. For
+small galleries the previous approach (a Python loop scoring one stored
+embedding at a time) is timed as a reference.
+
+Usage (from src/):
+    python -m benchmarks.bench_face_index --sizes 10000,100000,1000000 --queries 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.models.models.face_index import FlatFaceIndex
+from backend.models.models.similarity import normalize_rows
+
+def fill_index(index: FlatFaceIndex, size: int, dim: int, rng, chunk_size: int = 65536):
+    """Insert `size` random embeddings in chunks to bound temporary memory"""
+    for start in range(0, size, chunk_size):
+        count = min(chunk_size, size - start)
+        embeddings = rng.standard_normal((count, dim), dtype=np.float32)
+        index.add_many([f"PLATE-{start + i}" for i in range(count)], embeddings)
+
+def loop_search(gallery: np.ndarray, query: np.ndarray, top_k: int):
+    """One-pair-at-a-time scoring, as a per-plate verification loop would do"""
+    scores = []
+    for row in range(gallery.shape[0]):
+        stored = gallery[row]
+        score = float(np.dot(query, stored) / (np.linalg.norm(query) * np.linalg.norm(stored)))
+        scores.append((score, row))
+    return sorted(scores, reverse=True)[:top_k]
+
+def percentile_ms(samples, q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000
+
+def main(args):
+    rng = np.random.default_rng(0)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"dim={args.dim}, top_k={args.top_k}, {args.queries} queries per size")
+    print("-" * 96)
+
+    for size in sizes:
+        index = FlatFaceIndex()
+        start = time.perf_counter()
+        fill_index(index, size, args.dim, rng)
+        build_s = time.perf_counter() - start
+
+        queries = normalize_rows(rng.standard_normal((args.queries, args.dim), dtype=np.float32))
+        index.search(queries[0], args.top_k)  # warm-up
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, args.top_k)
+            samples.append(time.perf_counter() - start)
+
+        stats = index.get_stats()
+        print(f"flat   n={size:>8}  build={build_s:>6.2f} s  memory={stats['memory_bytes'] / 2**20:>7.1f} MiB  "
+              f"p50={percentile_ms(samples, 50):>8.2f} ms  p95={percentile_ms(samples, 95):>8.2f} ms")
+
+        if size <= args.loop_max:
+            gallery = index.vectors()
+            loop_samples = []
+            for query in queries[:5]:
+                start = time.perf_counter()
+                loop_search(gallery, query, args.top_k)
+                loop_samples.append(time.perf_counter() - start)
+            print(f"loop   n={size:>8}  {'':>40}  "
+                  f"p50={percentile_ms(loop_samples, 50):>8.2f} ms")
+
+        del index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face identification index benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--loop-max", type=int, default=10000,
+                        help="Largest gallery also timed with the per-pair loop")
+    main(parser.parse_args())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pooled async image downloads vs blocking requests.get
+
+Starts a local stand-in image server (HTTP/1.1 keep-alive, optional
+per-request delay to mimic CDN latency) and fires N concurrent downloads
+from one event loop, the way concurrent /facematch requests would. The
+server counts TCP connections so connection reuse is visible, and a watcher
+task measures how long the event loop is blocked. TLS is not simulated; with
+a real CDN every new connection also pays a TLS handshake.
+
+Usage (from src/):
+    python -m benchmarks.bench_image_download --requests 200 --concurrency 50 --latency-ms 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import requests
+
+from backend.utils.http_client import ImageTooLargeError, PooledHttpClient
+
+class ImageServer(ThreadingHTTPServer):
+    """Serves one JPEG on every path and counts accepted connections"""
+
+    daemon_threads = True
+
+    def __init__(self, payload: bytes, latency_s: float, connections):
+        self.payload = payload
+        self.latency_s = latency_s
+        self.connections = connections
+        super().__init__(("127.0.0.1", 0), ImageHandler)
+
+    def process_request(self, request, client_address):
+        with self.connections.get_lock():
+            self.connections.value += 1
+        super().process_request(request, client_address)
+
+def serve(payload: bytes, latency_s: float, connections, port_queue):
+    """Run the server in its own process so it does not share the client's GIL"""
+    server = ImageServer(payload, latency_s, connections)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+class ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.server.payload)))
+        self.end_headers()
+        self.wfile.write(self.server.payload)
+
+    def log_message(self, format, *args):
+        pass
+
+async def legacy_download(url: str) -> np.ndarray:
+    """Previous CloudinaryService.download_image body"""
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_COLOR)
+
+def pooled_download(client: PooledHttpClient, max_bytes: int):
+    async def run(url: str) -> np.ndarray:
+        content = await client.fetch(url, max_bytes=max_bytes)
+        return await asyncio.to_thread(cv2.imdecode, np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+    return run
+
+async def watch_loop(stalls: list, interval: float = 0.005):
+    """Record how late the event loop wakes a sleeping task (time it was blocked)"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+async def run_load(download, base_url: str, total: int, concurrency: int):
+    """Submit `total` downloads at once with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    stalls = []
+    watcher = asyncio.create_task(watch_loop(stalls))
+    await asyncio.sleep(0)
+
+    async def one(index: int):
+        async with semaphore:
+            image = await download(f"{base_url}/frame_{index}.jpg")
+            # Measured from the burst start: includes waiting, as a queued gate request would
+            latencies.append(time.perf_counter() - start)
+            assert image is not None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.05)  # let the watcher record the last stall
+    watcher.cancel()
+    return elapsed, np.array(latencies) * 1000, max(stalls, default=0.0) * 1000
+
+def report(label: str, elapsed: float, latencies: np.ndarray, stall_ms: float, connections: int, total: int):
+    print(f"{label:<10} {total / elapsed:>7.1f} img/s   p50={np.percentile(latencies, 50):>7.1f} ms   "
+          f"p95={np.percentile(latencies, 95):>7.1f} ms   max loop stall={stall_ms:>7.1f} ms   "
+          f"connections={connections}")
+
+async def main(args):
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8), (0, 0), 3)
+    payload = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+    connections = multiprocessing.Value("i", 0)
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve, args=(payload, args.latency_ms / 1000, connections, port_queue), daemon=True
+    )
+    server.start()
+    base_url = f"http://127.0.0.1:{port_queue.get()}"
+    print(f"{args.requests} downloads of a {len(payload) / 1024:.0f} KiB JPEG, concurrency={args.concurrency}, "
+          f"server latency={args.latency_ms} ms")
+    print("-" * 96)
+
+    elapsed, latencies, stall_ms = await run_load(legacy_download, base_url, args.requests, args.concurrency)
+    report("requests", elapsed, latencies, stall_ms, connections.value, args.requests)
+
+    connections.value = 0
+    client = PooledHttpClient(max_connections_per_host=args.concurrency, http2=False)
+    elapsed, latencies, stall_ms = await run_load(
+        pooled_download(client, args.max_bytes), base_url, args.requests, args.concurrency
+    )
+    report("pooled", elapsed, latencies, stall_ms, connections.value, args.requests)
+
+    # Size cap: a download larger than the cap is aborted without buffering it all
+    capped = PooledHttpClient(http2=False)
+    try:
+        await capped.fetch(f"{base_url}/too_big.jpg", max_bytes=len(payload) // 2)
+    except ImageTooLargeError as e:
+        print(f"size cap  {e} (bytes kept: {capped.get_stats()['bytes']})")
+
+    await client.close()
+    await capped.close()
+    server.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Image download benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--max-bytes", type=int, default=5242880)
+    asyncio.run(main(parser.parse_args()))
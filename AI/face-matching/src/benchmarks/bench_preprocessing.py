@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NumPy/OpenCV preprocessing vs the torchvision PIL transform
+
+Reports time per face and bytes allocated per face. Allocations are counted
+with tracemalloc (NumPy buffers) plus the torch profiler (tensor storage);
+PIL's internal image buffers are not visible to either, so the legacy
+figure is a lower bound.
+
+Usage (from src/):
+    python -m benchmarks.bench_preprocessing --faces 500
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, List
+
+import cv2
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from torch.profiler import ProfilerActivity, profile
+
+from backend.models.models.preprocessing import FacePreprocessor, IMAGENET_MEAN, IMAGENET_STD
+
+def legacy_preprocess(transform) -> Callable:
+    """Previous VGGFace2Model.preprocess_image path"""
+    def run(image: np.ndarray) -> torch.Tensor:
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return transform(image_rgb).unsqueeze(0)
+    return run
+
+def vectorized_preprocess(preprocessor: FacePreprocessor) -> Callable:
+    """Current VGGFace2Model.preprocess_image path"""
+    def run(image: np.ndarray) -> torch.Tensor:
+        return torch.from_numpy(preprocessor.preprocess(image))
+    return run
+
+def measure(label: str, func: Callable, faces: List[np.ndarray]):
+    """Print time and allocation figures for one preprocessing path"""
+    for face in faces[:5]:
+        func(face)  # warm-up
+
+    start = time.perf_counter()
+    for face in faces:
+        func(face)
+    per_face_us = (time.perf_counter() - start) / len(faces) * 1e6
+
+    sample = faces[:50]
+    tracemalloc.start()
+    for face in sample:
+        func(face)
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    traced = sum(stat.size for stat in snapshot.statistics("filename"))
+
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        for face in sample:
+            func(face)
+    torch_bytes = sum(max(0, event.self_cpu_memory_usage) for event in prof.key_averages())
+
+    print(f"{label:<12} {per_face_us:>8.1f} us/face   "
+          f"torch alloc={torch_bytes / len(sample) / 1024:>8.1f} KiB/face   "
+          f"tracemalloc peak={peak / 1024:>8.1f} KiB   retained={traced / 1024:>6.1f} KiB")
+
+def main(args):
+    torch.set_num_threads(1)
+    rng = np.random.default_rng(0)
+    faces = [
+        rng.integers(0, 255, size=(int(rng.integers(120, 400)), int(rng.integers(120, 400)), 3), dtype=np.uint8)
+        for _ in range(args.faces)
+    ]
+
+    transform = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=list(IMAGENET_MEAN), std=list(IMAGENET_STD))
+    ])
+    legacy = legacy_preprocess(transform)
+    vectorized = vectorized_preprocess(FacePreprocessor(size=(224, 224)))
+
+    diff = max(float((legacy(face) - vectorized(face)).abs().max()) for face in faces[:20])
+    print(f"{len(faces)} random faces (120-400 px), max |legacy - vectorized| = {diff:.4f}")
+    print("-" * 100)
+    measure("torchvision", legacy, faces)
+    measure("vectorized", vectorized, faces)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face preprocessing micro-benchmark")
+    parser.add_argument("--faces", type=int, default=500)
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-resolution vs reduced-resolution (DCT-scaled) JPEG decode
+
+Encodes gate-camera-sized frames once, then measures per frame:
+- decode time and decoded-pixel memory for IMREAD_COLOR and
+  IMREAD_REDUCED_COLOR_2/4/8
+- the detection stage as the API runs it: decode, detect_downscaled at
+  --detection-width, crop the largest face (decode_frame picks the scale
+  from the JPEG header and decodes full resolution only for small faces)
+
+Peak memory is the tracemalloc peak of the stage (NumPy buffers, which is
+where OpenCV puts decoded images).
+
+Usage (from src/):
+    python -m benchmarks.bench_reduced_decode --frames 50 --width 1600 --detection-width 640
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+from backend.models.models.face_detectors import HaarFaceDetector
+from backend.utils.image_decode import REDUCED_COLOR_FLAGS, DecodedFrame, decode_frame
+
+DEFAULT_IMAGE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "smart-parking", "dataset", "test", "images")
+
+def load_frames(image_dir: str, count: int, width: int) -> List[bytes]:
+    """JPEG-encoded frames from the dataset resized to `width` (synthetic if it is missing)"""
+    height = width * 3 // 4
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.jpg")))[:count]
+    images = [cv2.imread(path) for path in paths]
+    images = [cv2.resize(image, (width, height), interpolation=cv2.INTER_CUBIC) for image in images if image is not None]
+    if not images:
+        rng = np.random.default_rng(0)
+        images = [cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+                  for _ in range(count)]
+    return [cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes() for image in images]
+
+def measure(label: str, func: Callable, frames: List[bytes]):
+    for frame in frames[:3]:
+        func(frame)  # warm-up
+    start = time.perf_counter()
+    for frame in frames:
+        func(frame)
+    mean_ms = (time.perf_counter() - start) / len(frames) * 1000
+
+    tracemalloc.start()
+    func(frames[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {mean_ms:>8.2f} ms/frame   peak={peak / 1024 / 1024:>6.2f} MiB")
+
+def decode_with(flag: int) -> Callable:
+    return lambda data: cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+
+def detection_stage(detector, detection_width: int, reduced: bool, min_size: int) -> Callable:
+    """Decode + detect + crop the largest face, as VGGFace2Model.detect_face does"""
+    def run(data: bytes):
+        if reduced:
+            frame = decode_frame(data, detection_width)
+        else:
+            frame = DecodedFrame(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+        faces = detector.detect_downscaled(frame.image, detection_width)
+        if faces:
+            box = frame.to_full(max(faces, key=lambda face: face[2] * face[3]))
+            return frame.crop(box, min_size=min_size)
+        return frame.image
+    return run
+
+def main(args):
+    frames = load_frames(args.images, args.frames, args.width)
+    full = cv2.imdecode(np.frombuffer(frames[0], np.uint8), cv2.IMREAD_COLOR)
+    print(f"{len(frames)} frames at {full.shape[1]}x{full.shape[0]}, "
+          f"{sum(map(len, frames)) / len(frames) / 1024:.0f} KiB JPEG, detection width {args.detection_width}")
+    print("-" * 72)
+    for factor, flag in REDUCED_COLOR_FLAGS.items():
+        decoded = decode_with(flag)(frames[0])
+        measure(f"decode 1/{factor} ({decoded.shape[1]}x{decoded.shape[0]})", decode_with(flag), frames)
+
+    detector = HaarFaceDetector()
+    detector.load()
+    print("-" * 72)
+    measure("detect stage, full decode", detection_stage(detector, args.detection_width, False, args.min_size), frames)
+    reduction = decode_frame(frames[0], args.detection_width).reduction
+    measure(f"detect stage, reduced decode (1/{reduction})",
+            detection_stage(detector, args.detection_width, True, args.min_size), frames)
+
+    # Boxes found on the reduced decode, mapped to full resolution, vs the full decode
+    agree = total = 0
+    for data in frames:
+        reference = detector.detect_downscaled(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR),
+                                               args.detection_width)
+        frame = decode_frame(data, args.detection_width)
+        mapped = [frame.to_full(face) for face in detector.detect_downscaled(frame.image, args.detection_width)]
+        total += len(reference)
+        agree += sum(1 for ref in reference if any(iou(ref, face) >= 0.5 for face in mapped))
+    print(f"faces found at full decode: {total}, matched after reduced decode (IoU >= 0.5): {agree}")
+
+def iou(a, b) -> float:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reduced-resolution decode benchmark")
+    parser.add_argument("--images", default=DEFAULT_IMAGE_DIR)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1600, help="Frame width (ESP32-CAM UXGA is 1600)")
+    parser.add_argument("--detection-width", type=int, default=640)
+    parser.add_argument("--min-size", type=int, default=224, help="Model input size")
+    main(parser.parse_args())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: similarity module vs the previous calculate_similarity
+
+The previous implementation built two float64 arrays from the inputs,
+reshaped them and called sklearn's cosine_similarity (or a manual fallback
+when sklearn is missing) for every pair.
+
+Usage (from src/):
+    python -m benchmarks.bench_similarity --pairs 2000 --gallery 10000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.models.models.similarity import many_to_many, normalize, one_to_many, pair_similarity
+
+try:
+    from sklearn.metrics.pairwise import cosine_similarity
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+def legacy_similarity(embedding1, embedding2) -> float:
+    """Previous VGGFace2Model.calculate_similarity"""
+    emb1 = np.array(embedding1).reshape(1, -1)
+    emb2 = np.array(embedding2).reshape(1, -1)
+    if SKLEARN_AVAILABLE:
+        similarity = cosine_similarity(emb1, emb2)[0][0]
+    else:
+        dot_product = np.dot(emb1[0], emb2[0])
+        norm1 = np.linalg.norm(emb1[0])
+        norm2 = np.linalg.norm(emb2[0])
+        similarity = dot_product / (norm1 * norm2) if norm1 > 0 and norm2 > 0 else 0.0
+    return float((similarity + 1) / 2)
+
+def per_call_us(func, pairs) -> float:
+    """Best-of-3 microseconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for a, b in pairs:
+            func(a, b)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pairs) * 1e6
+
+def best_ms(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main(args):
+    rng = np.random.default_rng(0)
+    queries = normalize(rng.standard_normal((args.pairs, args.dim), dtype=np.float32))
+    stored = normalize(rng.standard_normal((args.pairs, args.dim), dtype=np.float32))
+    gallery = normalize(rng.standard_normal((args.gallery, args.dim), dtype=np.float32))
+
+    # Verification: query comes from the model as a list, stored one from the cache as float32
+    list_pairs = [(query.tolist(), reference) for query, reference in zip(queries, stored)]
+    array_pairs = list(zip(queries, stored))
+
+    print(f"dim={args.dim}, sklearn={'yes' if SKLEARN_AVAILABLE else 'no (manual fallback)'}")
+    print("-" * 80)
+    print("one pair (list query, float32 stored)")
+    print(f"  legacy                 {per_call_us(legacy_similarity, list_pairs):>9.2f} us/pair")
+    print(f"  pair_similarity        {per_call_us(pair_similarity, list_pairs):>9.2f} us/pair")
+    print("one pair (float32 arrays)")
+    print(f"  legacy                 {per_call_us(legacy_similarity, array_pairs):>9.2f} us/pair")
+    print(f"  pair_similarity        {per_call_us(pair_similarity, array_pairs):>9.2f} us/pair")
+    print(f"  normalized=True        "
+          f"{per_call_us(lambda a, b: pair_similarity(a, b, normalized=True), array_pairs):>9.2f} us/pair")
+
+    query = queries[0]
+    loop_sample = gallery[:min(2000, args.gallery)]
+    loop_ms = best_ms(lambda: [legacy_similarity(query, row) for row in loop_sample], repeat=1)
+    print(f"one vs {args.gallery} gallery")
+    print(f"  legacy loop            {loop_ms * args.gallery / len(loop_sample):>9.2f} ms (extrapolated)")
+    print(f"  one_to_many            {best_ms(lambda: one_to_many(query, gallery, normalized=True)):>9.2f} ms")
+
+    batch = queries[:args.batch]
+    print(f"{len(batch)} vs {args.gallery} gallery")
+    print(f"  one_to_many per query  "
+          f"{best_ms(lambda: [one_to_many(q, gallery, normalized=True) for q in batch], repeat=2):>9.2f} ms")
+    print(f"  many_to_many           {best_ms(lambda: many_to_many(batch, gallery, normalized=True), repeat=2):>9.2f} ms")
+
+    expected = np.array([legacy_similarity(a, b) for a, b in array_pairs[:100]])
+    actual = np.array([pair_similarity(a, b) for a, b in array_pairs[:100]])
+    print(f"max |legacy - new| = {np.max(np.abs(expected - actual)):.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Similarity micro-benchmark")
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--gallery", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--dim", type=int, default=512)
+    main(parser.parse_args())
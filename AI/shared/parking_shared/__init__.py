@@ -0,0 +1,3 @@
+"""
+Code shared by the face-matching and smart-parking services
+"""
@@ -0,0 +1,450 @@
+"""
+Content-addressed cache of downloaded and decoded images
+Entries are keyed by a hash of the encoded bytes, with a URL -> hash map in
+front, so a gate frame requested by several pipelines is downloaded and
+decoded once. The memory tier is an LRU bounded in bytes; the optional disk
+tier keeps the encoded bytes and the decoded pixels (.npy, read back with
+memory mapping) and can be shared by services mounting the same directory.
+
+Shared by face-matching and smart-parking (AI/shared is put on PYTHONPATH by
+both images), so the two services agree on the disk layout.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Disk layout: urls/<url hash>.txt holds "<content hash>\n<url>",
+# blobs/<content hash>.jpg the encoded image, pixels/<content hash>.npy the decoded one
+_URLS, _BLOBS, _PIXELS = "urls", "blobs", "pixels"
+# Disk usage is re-checked (and trimmed) every this many writes
+_DISK_CHECK_INTERVAL = 64
+
+Downloader = Callable[[str], Awaitable[Union[bytes, bytearray]]]
+Decoder = Callable[[bytes], Awaitable[Optional[np.ndarray]]]
+
+class _Entry:
+    """Encoded bytes and (lazily) decoded pixels of one image"""
+
+    __slots__ = ("encoded", "decoded")
+
+    def __init__(self, encoded: Optional[bytes] = None, decoded: Optional[np.ndarray] = None):
+        self.encoded = encoded
+        self.decoded = decoded
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.encoded) if self.encoded is not None else 0) + \
+            (self.decoded.nbytes if self.decoded is not None else 0)
+
+class ImageCache:
+    """Two-tier (memory LRU + optional memory-mapped disk) image cache"""
+
+    def __init__(
+        self,
+        max_bytes: int = 268435456,
+        url_ttl: float = 300,
+        disk_dir: str = "",
+        disk_max_bytes: int = 1073741824
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_bytes: Memory budget for encoded + decoded images (least recently used are evicted)
+            url_ttl: Seconds a URL -> content mapping is trusted before the URL is fetched again
+                (0 = forever; content entries themselves never go stale)
+            disk_dir: Directory of the disk tier, empty to disable it
+            disk_max_bytes: Size cap of the disk tier (oldest files are removed)
+        """
+        self.max_bytes = max(1, int(max_bytes))
+        self.url_ttl = float(url_ttl)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = int(disk_max_bytes)
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._urls: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._shared_loads = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+        if self.disk_dir:
+            for name in (_URLS, _BLOBS, _PIXELS):
+                os.makedirs(os.path.join(self.disk_dir, name), exist_ok=True)
+
+    @staticmethod
+    def content_hash(data: Union[bytes, bytearray, memoryview]) -> str:
+        """Hash identifying an encoded image"""
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def lookup(self, url: str, disk: bool = True) -> Optional[str]:
+        """
+        Get the content hash last seen for a URL
+
+        Args:
+            url: Image URL
+            disk: Also consult the disk tier when memory has no mapping
+
+        Returns:
+            Content hash, or None if the URL is unknown or its mapping expired
+        """
+        now = time.time()
+        with self._lock:
+            mapping = self._urls.get(url)
+            if mapping is not None:
+                expires_at, content_hash = mapping
+                if not expires_at or expires_at > now:
+                    self._urls.move_to_end(url)
+                    return content_hash
+                del self._urls[url]
+
+        if not disk or not self.disk_dir:
+            return None
+        path = self._url_path(url)
+        try:
+            if self.url_ttl > 0 and os.path.getmtime(path) + self.url_ttl < now:
+                return None
+            with open(path) as url_file:
+                content_hash, stored_url = url_file.read().split("\n", 1)
+        except (OSError, ValueError):
+            return None
+        if stored_url != url:
+            return None
+        self._remember_url(url, content_hash)
+        return content_hash
+
+    def get_encoded(self, url: str) -> Optional[bytes]:
+        """
+        Get the encoded bytes of a URL
+
+        Args:
+            url: Image URL
+
+        Returns:
+            Encoded image, or None on miss
+        """
+        return self._count(self._find(url, decoded=False))
+
+    def get_decoded(self, url: str) -> Optional[np.ndarray]:
+        """
+        Get the decoded pixels of a URL
+
+        Args:
+            url: Image URL
+
+        Returns:
+            Read-only BGR image, or None on miss
+        """
+        return self._count(self._find(url, decoded=True))
+
+    def _find(self, url: str, decoded: bool, disk: bool = True) -> Tuple[Optional[Union[bytes, np.ndarray]], str]:
+        """Look a URL up in memory, then on disk; returns (value, "memory" | "disk" | "miss")"""
+        content_hash = self.lookup(url, disk)
+        if content_hash is None:
+            return None, "miss"
+
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            value = None if entry is None else (entry.decoded if decoded else entry.encoded)
+            if value is not None:
+                self._entries.move_to_end(content_hash)
+                return value, "memory"
+
+        if not disk:
+            return None, "miss"
+        if decoded:
+            value = self._read_pixels(content_hash)
+            if value is not None:
+                self._store(content_hash, decoded=value)
+        else:
+            value = self._read_blob(content_hash)
+            if value is not None:
+                self._store(content_hash, encoded=value)
+        return value, "disk" if value is not None else "miss"
+
+    async def _find_async(self, url: str, decoded: bool) -> Tuple[Optional[Union[bytes, np.ndarray]], str]:
+        """_find(), off the event loop when it has to read the disk tier"""
+        found = self._find(url, decoded, disk=False)
+        if found[1] == "miss" and self.disk_dir:
+            found = await asyncio.to_thread(self._find, url, decoded)
+        return found
+
+    def _count(self, found: Tuple[Optional[Union[bytes, np.ndarray]], str]):
+        value, tier = found
+        with self._lock:
+            if tier == "memory":
+                self._hits += 1
+            elif tier == "disk":
+                self._disk_hits += 1
+            else:
+                self._misses += 1
+        return value
+
+    def put(self, url: str, encoded: Union[bytes, bytearray], decoded: Optional[np.ndarray] = None) -> str:
+        """
+        Store a downloaded image
+
+        Args:
+            url: Image URL
+            encoded: Encoded image bytes
+            decoded: Decoded image (stored read-only), if available
+
+        Returns:
+            Content hash of the image
+        """
+        encoded = bytes(encoded)
+        content_hash = self.content_hash(encoded)
+        if decoded is not None:
+            decoded.setflags(write=False)
+
+        self._store(content_hash, encoded=encoded, decoded=decoded)
+        self._remember_url(url, content_hash)
+        if self.disk_dir:
+            self._write_disk(url, content_hash, encoded, decoded)
+        return content_hash
+
+    async def fetch_encoded(self, url: str, download: Downloader) -> bytes:
+        """
+        Get the encoded bytes of a URL, downloading them on a miss
+
+        Concurrent calls for the same URL share one download.
+
+        Args:
+            url: Image URL
+            download: Coroutine returning the body of a URL
+
+        Returns:
+            Encoded image
+        """
+        encoded = self._count(await self._find_async(url, decoded=False))
+        if encoded is not None:
+            return encoded
+        return await self._load_once(("encoded", url), lambda: self._download(url, download))
+
+    async def fetch_decoded(self, url: str, download: Downloader, decode: Decoder) -> np.ndarray:
+        """
+        Get the decoded pixels of a URL, downloading and decoding on a miss
+
+        Concurrent calls for the same URL share one download and one decode.
+
+        Args:
+            url: Image URL
+            download: Coroutine returning the body of a URL
+            decode: Coroutine decoding encoded bytes (None when undecodable)
+
+        Returns:
+            Read-only BGR image
+        """
+        decoded = self._count(await self._find_async(url, decoded=True))
+        if decoded is not None:
+            return decoded
+        return await self._load_once(("decoded", url), lambda: self._decode(url, download, decode))
+
+    async def _load_once(self, key: Tuple[str, str], load: Callable[[], Awaitable]):
+        """Run `load` unless the same key is already loading, then share its result"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(load())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            with self._lock:
+                self._shared_loads += 1
+        return await asyncio.shield(future)
+
+    async def _download(self, url: str, download: Downloader) -> bytes:
+        encoded = bytes(await download(url))
+        await self._put_async(url, encoded, None)
+        return encoded
+
+    async def _decode(self, url: str, download: Downloader, decode: Decoder) -> np.ndarray:
+        # Reuse bytes another pipeline already downloaded (or is downloading)
+        encoded = (await self._find_async(url, decoded=False))[0]
+        if encoded is None:
+            encoded = await self._load_once(("encoded", url), lambda: self._download(url, download))
+
+        decoded = await decode(encoded)
+        if decoded is None:
+            raise ValueError("Failed to decode image")
+        await self._put_async(url, encoded, decoded)
+        return decoded
+
+    async def _put_async(self, url: str, encoded: bytes, decoded: Optional[np.ndarray]):
+        """put(), off the event loop when it writes to disk"""
+        if self.disk_dir:
+            await asyncio.to_thread(self.put, url, encoded, decoded)
+        else:
+            self.put(url, encoded, decoded)
+
+    def _remember_url(self, url: str, content_hash: str):
+        expires_at = time.time() + self.url_ttl if self.url_ttl > 0 else 0.0
+        with self._lock:
+            self._urls[url] = (expires_at, content_hash)
+            self._urls.move_to_end(url)
+            # URL entries are tiny; bound them loosely so they cannot grow forever
+            while len(self._urls) > max(1024, len(self._entries) * 4):
+                self._urls.popitem(last=False)
+
+    def _store(self, content_hash: str, encoded: Optional[bytes] = None, decoded: Optional[np.ndarray] = None):
+        """Add to the memory tier and evict least recently used entries over budget"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                entry = _Entry()
+                self._entries[content_hash] = entry
+            self._bytes -= entry.nbytes
+            if encoded is not None:
+                entry.encoded = encoded
+            if decoded is not None:
+                entry.decoded = decoded
+            self._bytes += entry.nbytes
+            self._entries.move_to_end(content_hash)
+
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._evictions += 1
+
+    def _url_path(self, url: str) -> str:
+        name = hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.disk_dir, _URLS, f"{name}.txt")
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.disk_dir, _BLOBS, f"{content_hash}.jpg")
+
+    def _pixels_path(self, content_hash: str) -> str:
+        return os.path.join(self.disk_dir, _PIXELS, f"{content_hash}.npy")
+
+    def _read_blob(self, content_hash: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        path = self._blob_path(content_hash)
+        try:
+            with open(path, "rb") as blob_file:
+                encoded = blob_file.read()
+            os.utime(path)
+            return encoded
+        except OSError:
+            return None
+
+    def _read_pixels(self, content_hash: str) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        path = self._pixels_path(content_hash)
+        try:
+            # Memory-mapped: pages are read on demand and shared with other processes
+            decoded = np.load(path, mmap_mode="r")
+            os.utime(path)
+            return decoded
+        except (OSError, ValueError):
+            return None
+
+    def _write_atomic(self, path: str, write: Callable):
+        """Write through a temporary file so readers never see partial files"""
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                write(tmp_file)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _write_disk(self, url: str, content_hash: str, encoded: bytes, decoded: Optional[np.ndarray]):
+        """Persist an entry to the disk tier (errors are logged, never raised)"""
+        try:
+            if not os.path.exists(self._blob_path(content_hash)):
+                self._write_atomic(self._blob_path(content_hash), lambda f: f.write(encoded))
+            if decoded is not None and not os.path.exists(self._pixels_path(content_hash)):
+                self._write_atomic(self._pixels_path(content_hash), lambda f: np.save(f, decoded))
+            self._write_atomic(self._url_path(url), lambda f: f.write(f"{content_hash}\n{url}".encode("utf-8")))
+        except Exception as e:
+            logger.warning(f"Failed to write image cache entry to disk: {str(e)}")
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            check = self._disk_writes % _DISK_CHECK_INTERVAL == 0
+        if check:
+            self.trim_disk()
+
+    def trim_disk(self) -> int:
+        """
+        Remove the least recently used disk files until the tier is under its cap
+
+        Returns:
+            Number of files removed
+        """
+        if not self.disk_dir:
+            return 0
+
+        files = []
+        for name in (_URLS, _BLOBS, _PIXELS):
+            directory = os.path.join(self.disk_dir, name)
+            for entry in os.scandir(directory):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._disk_evictions += removed
+        return removed
+
+    def clear(self):
+        """Remove all memory entries (the disk tier is left alone)"""
+        with self._lock:
+            self._entries.clear()
+            self._urls.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": ((self._hits + self._disk_hits) / lookups) if lookups else 0.0,
+                "shared_loads": self._shared_loads,
+                "evictions": self._evictions,
+                "disk_enabled": bool(self.disk_dir),
+                "disk_evictions": self._disk_evictions
+            }
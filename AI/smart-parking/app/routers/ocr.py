@@ -2,25 +2,43 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from app.schemas.ocr_schemas import OCRResponse
 from app.services.ocr_services import recognize_license_plate
+from app.utils.config import IMAGE_CACHE_MAX_MB, IMAGE_CACHE_URL_TTL, IMAGE_CACHE_DIR, IMAGE_CACHE_DISK_MAX_MB
+from parking_shared.image_cache import ImageCache
+import asyncio
 import requests
 
 router = APIRouter()
 
+# Cùng một khung hình được OCR và face-matching dùng chung qua cache (IMAGE_CACHE_DIR)
+image_cache = ImageCache(
+    max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    url_ttl=IMAGE_CACHE_URL_TTL,
+    disk_dir=IMAGE_CACHE_DIR,
+    disk_max_bytes=IMAGE_CACHE_DISK_MAX_MB * 1024 * 1024
+) if IMAGE_CACHE_MAX_MB > 0 else None
+
+async def download_image(url: str) -> bytes:
+    # requests là blocking: chạy ngoài event loop
+    response = await asyncio.to_thread(requests.get, url, timeout=10)
+    response.raise_for_status()
+    return response.content
+
 class OCRUrlRequest(BaseModel):
     url: str
 
 @router.get("/health")
 def ocr_health():
-    return {"status": "ok"}
+    return {"status": "ok", "image_cache": image_cache.get_stats() if image_cache else None}
 
 @router.post("/")
 async def ocr_infer(request: OCRUrlRequest):
     url = request.url
     print(f"[OCR] Nhận url: {url}")
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        contents = response.content
+        if image_cache is not None:
+            contents = await image_cache.fetch_encoded(url, download_image)
+        else:
+            contents = await download_image(url)
         filename = url.split("/")[-1]
         print(f"[OCR] Tải ảnh thành công: {filename}, size: {len(contents)} bytes")
     except Exception as e:
@@ -6,3 +6,9 @@ load_dotenv()
 # FastAPI application configuration
 PLATE_RECOGNIZER_API_URL = "https://api.platerecognizer.com/v1/plate-reader/"
 API_KEY = os.getenv("PLATE_RECOGNIZER_API_KEY")
+
+# Downloaded image cache (set IMAGE_CACHE_DIR to the directory shared with face-matching)
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "64"))  # 0 = disabled
+IMAGE_CACHE_URL_TTL = float(os.getenv("IMAGE_CACHE_URL_TTL", "300"))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "")
+IMAGE_CACHE_DISK_MAX_MB = int(os.getenv("IMAGE_CACHE_DISK_MAX_MB", "1024"))
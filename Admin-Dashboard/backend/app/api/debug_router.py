@@ -95,6 +95,11 @@ async def debug_session_pairing():
         matched_pairs = []
         used_in_session_ids = set()
 
+        # IN sessions indexed by plate number, so each OUT only looks at its own plate
+        in_sessions_by_plate = {}
+        for in_session in valid_in_sessions:
+            in_sessions_by_plate.setdefault(in_session["plateNumber"], []).append(in_session)
+
         # Sort OUT sessions by timestamp (newest first)
         valid_out_sessions.sort(key=lambda x: x["timestamp"], reverse=True)
 
@@ -105,9 +110,8 @@ async def debug_session_pairing():
 
             # Find candidate IN sessions with exact same plate number
             candidate_in_sessions = [
-                s for s in valid_in_sessions
-                if s["plateNumber"] == out_plate  # Exact match
-                and s["session_id"] not in used_in_session_ids  # Not already used
+                s for s in in_sessions_by_plate.get(out_plate, [])  # Exact match
+                if s["session_id"] not in used_in_session_ids  # Not already used
                 and s["timestamp"] <= out_time  # IN must be before OUT
             ]
 
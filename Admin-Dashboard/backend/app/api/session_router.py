@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
 from app.models.session_model import (
     SessionResponse, SessionCreateRequest, SessionUpdateRequest
@@ -7,12 +7,17 @@ from app.services.session_service import (
     SessionService, PlateMapService
 )
 from app.services.session_pairing_service import SessionPairingService
+from app.services.visit_service import VisitService
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
+# Listings are paginated newest first; the token for the next page is sent in this header
+NEXT_PAGE_HEADER = "X-Next-Page-Token"
+
 # Initialize services
 session_service = SessionService()
 plate_map_service = PlateMapService()
+visit_service = VisitService()
 
 @router.post("/", response_model=dict)
 async def create_session(session_data: SessionCreateRequest):
@@ -55,20 +60,19 @@ async def get_session(session_id: str):
 
 @router.get("/", response_model=List[SessionResponse])
 async def get_sessions(
+    response: Response,
     gate: Optional[str] = Query(None, description="Filter by gate type (In or Out)"),
-    limit: int = Query(100, description="Limit number of results")
+    limit: int = Query(100, description="Limit number of results"),
+    page_token: Optional[str] = Query(None, description="X-Next-Page-Token of the previous page")
 ):
-    """Get list of sessions"""
+    """Get list of sessions, newest first"""
     try:
-        if gate:
-            sessions = session_service.get_sessions_by_gate(gate, limit)
-        else:
-            # Get all sessions
-            in_sessions = session_service.get_sessions_by_gate("In", limit//2)
-            out_sessions = session_service.get_sessions_by_gate("Out", limit//2)
-            sessions = in_sessions + out_sessions
-
+        sessions, next_token = session_service.get_sessions_page(gate, limit, page_token)
+        if next_token:
+            response.headers[NEXT_PAGE_HEADER] = next_token
         return sessions
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -123,91 +127,60 @@ async def auto_checkout_session(face_index: str, plate_number: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/grouped", response_model=List[dict])
-async def get_grouped_sessions():
-    """Get sessions grouped by faceIndex and plateNumber for dashboard display"""
+async def get_grouped_sessions(
+    response: Response,
+    limit: int = Query(100, description="Limit number of results"),
+    page_token: Optional[str] = Query(None, description="X-Next-Page-Token of the previous page")
+):
+    """Get sessions grouped by their entry/exit session map for dashboard display"""
     try:
-        # Get all sessions
-        in_sessions = session_service.get_sessions_by_gate("In", 1000)
-        out_sessions = session_service.get_sessions_by_gate("Out", 1000)
-        all_sessions = in_sessions + out_sessions
-
-        # Group by faceIndex + plateNumber
-        grouped = {}
-        for session_response in all_sessions:
-            session = session_response.session
-            key = f"{session.faceIndex}_{session.plateNumber}"
-
-            if key not in grouped:
-                grouped[key] = {
-                    "faceId": session.faceIndex,
-                    "licensePlate": session.plateNumber,
-                    "entryTime": None,
-                    "exitTime": None,
-                    "status": "active",
-                    "entrySessionId": None,
-                    "exitSessionId": None,
-                    "faceUrl": session.faceUrl,
-                    "plateUrl": session.plateUrl,
-                    "exitFaceUrl": None,
-                    "exitPlateUrl": None
-                }
-
-            group = grouped[key]
-            if session.gate == "In":
-                group["entryTime"] = session.timestamp
-                group["entrySessionId"] = session_response.session_id
-                group["faceUrl"] = session.faceUrl
-                group["plateUrl"] = session.plateUrl
-            elif session.gate == "Out":
-                group["exitTime"] = session.timestamp
-                group["exitSessionId"] = session_response.session_id
-                group["exitFaceUrl"] = session.faceUrl
-                group["exitPlateUrl"] = session.plateUrl
-                group["status"] = "completed"
-
-        # Convert to list and sort by entry time (newest first)
-        result = list(grouped.values())
-        result.sort(key=lambda x: x["entryTime"] or "0000", reverse=True)
-
-        return result
+        pairing_service = SessionPairingService()
+        grouped, next_token = pairing_service.get_grouped_page(limit, page_token, verified=False)
+        if next_token:
+            response.headers[NEXT_PAGE_HEADER] = next_token
+
+        return [{
+            "faceId": session["face_id"],
+            "licensePlate": session["license_plate"],
+            "entryTime": session["entry_time"].isoformat() if session["entry_time"] else None,
+            "exitTime": session["exit_time"].isoformat() if session["exit_time"] else None,
+            "status": session["status"],
+            "entrySessionId": session["entry_session_id"],
+            "exitSessionId": session["exit_session_id"],
+            "faceUrl": session["face_url"],
+            "plateUrl": session["plate_url"],
+            "exitFaceUrl": session["exit_face_url"],
+            "exitPlateUrl": session["exit_plate_url"]
+        } for session in grouped]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/enhanced", response_model=List[dict])
-async def get_enhanced_grouped_sessions():
-    """Get enhanced grouped sessions using face matching verification"""
+async def get_enhanced_grouped_sessions(
+    response: Response,
+    limit: int = Query(100, description="Limit number of results"),
+    page_token: Optional[str] = Query(None, description="X-Next-Page-Token of the previous page")
+):
+    """Get enhanced grouped sessions using face matching verification (materialized visits)"""
     try:
-        pairing_service = SessionPairingService()
-        enhanced_sessions = pairing_service.get_enhanced_grouped_sessions()
+        visits, next_token = visit_service.get_page(limit, page_token)
+        if next_token:
+            response.headers[NEXT_PAGE_HEADER] = next_token
 
-        # Convert to frontend format
+        # Visits are stored in the frontend format
         formatted_sessions = []
-        for session in enhanced_sessions:
-            formatted_session = {
-                "faceId": session["face_id"],
-                "licensePlate": session["license_plate"],
-                "entryTime": session["entry_time"].isoformat() if session["entry_time"] else None,
-                "exitTime": session["exit_time"].isoformat() if session["exit_time"] else None,
-                "status": session["status"],
-                "duration": session["duration"],
-
-                # Entry data
-                "entrySessionId": session["entry_session_id"],
-                "faceUrl": session["face_url"],
-                "plateUrl": session["plate_url"],
-
-                # Exit data
-                "exitSessionId": session["exit_session_id"],
-                "exitFaceUrl": session["exit_face_url"],
-                "exitPlateUrl": session["exit_plate_url"],
-
-                # Verification data
-                "faceMatchVerified": session["face_match_verified"],
-                "faceMatchResult": session["face_match_result"]
-            }
-            formatted_sessions.append(formatted_session)
+        for visit in visits:
+            visit.pop("lastActivity", None)
+            for field in ("entryTime", "exitTime"):
+                if visit.get(field):
+                    visit[field] = visit[field].isoformat()
+            formatted_sessions.append(visit)
 
         return formatted_sessions
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # Firebase settings
@@ -23,11 +23,39 @@ class Settings(BaseSettings):
     # Environment
     environment: str = "development"
 
+    # Occupancy counters: seconds between reconciliation runs (0 = disabled)
+    occupancy_reconcile_interval: int = 3600
+
+    # ParkingMeta/slotCounter.available is maintained by the gate devices; set to write
+    # total - occupied over it instead (corrections are coalesced for the delay in seconds)
+    write_available_slots: bool = False
+    available_slots_write_delay: float = 2.0
+
+    # Visits: seconds between syncs of sessions written by the gate devices (0 = disabled)
+    visit_sync_interval: int = 30
+
+    # Read cache: seconds per collection, comma-separated (missing or 0 = not cached).
+    # The cache is per process: a write invalidates only the worker that made it, so
+    # other workers see it after the TTL. Keep users short (deactivation, password
+    # change); logins and account changes read users from Firestore regardless.
+    cache_ttls: str = "ParkingMeta=5,users=5,Session=10"
+    cache_max_entries: int = 1000
+
     @property
     def cors_origins(self) -> List[str]:
         """Parse allowed_origins string to list"""
         return [origin.strip() for origin in self.allowed_origins.split(",")]
 
+    @property
+    def cache_ttl_map(self) -> Dict[str, float]:
+        """Parse cache_ttls string to {collection: seconds}"""
+        ttls = {}
+        for item in self.cache_ttls.split(","):
+            if "=" in item:
+                collection, seconds = item.split("=", 1)
+                ttls[collection.strip()] = float(seconds)
+        return ttls
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,93 @@
+"""
+Cursor pagination for Firestore queries.
+
+Pages are ordered by (createdAt, document id), newest first, and continue
+with start_after from the last document of the previous page, so a page
+costs the same however long the history is and does not shift when new
+sessions arrive. The cursor travels as an opaque page token that is tied
+to the listing it came from.
+
+Sessions are not ordered by their timestamp field: the API writes local ISO
+strings there and the gate devices Firestore Timestamps, and Firestore
+orders values by type first. createdAt is always a UTC Timestamp (written
+by create_session, stamped on device sessions by VisitService). Documents
+without the order field are not listed, so existing sessions need the
+visit backfill once (backfill_visits.py).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Tuple
+
+from google.cloud import firestore
+
+MAX_PAGE_SIZE = 500
+
+# Values per 'in' filter accepted by Firestore
+IN_QUERY_LIMIT = 30
+
+# Session field the listings are ordered by
+ORDER_FIELD = "createdAt"
+
+def encode_page_token(scope: str, timestamp: Any, doc_id: str) -> str:
+    """Opaque token for the position after (timestamp, doc_id)"""
+    if isinstance(timestamp, datetime):
+        value = {"dt": timestamp.isoformat()}
+    else:
+        value = {"v": timestamp}
+    payload = json.dumps({"s": scope, "t": value, "id": doc_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_page_token(scope: str, token: str) -> Tuple[Any, str]:
+    """(timestamp, doc_id) from a page token; ValueError if it is malformed or from another listing"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        value = payload["t"]
+        timestamp = datetime.fromisoformat(value["dt"]) if "dt" in value else value["v"]
+        doc_id = payload["id"]
+    except Exception:
+        raise ValueError("Invalid page token")
+    if payload.get("s") != scope or not isinstance(doc_id, str):
+        raise ValueError("Page token does not belong to this listing")
+    return timestamp, doc_id
+
+def paginate(query, scope: str, page_size: int, page_token: Optional[str] = None,
+             order_field: Optional[str] = ORDER_FIELD) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page of a query, newest first
+
+    Args:
+        query: Collection or filtered query
+        scope: Listing the tokens belong to (e.g. "sessions:In")
+        page_size: Documents per page (capped at MAX_PAGE_SIZE)
+        page_token: Token returned with the previous page
+        order_field: Time field the pages are ordered by; None pages by document id
+            only, which also lists documents that lack the time field
+
+    Returns:
+        (documents, next page token or None on the last page)
+    """
+    page_size = max(1, min(MAX_PAGE_SIZE, page_size))
+    ordered = query
+    if order_field:
+        ordered = ordered.order_by(order_field, direction=firestore.Query.DESCENDING)
+    ordered = ordered.order_by("__name__", direction=firestore.Query.DESCENDING)
+    if page_token:
+        timestamp, doc_id = decode_page_token(scope, page_token)
+        cursor = {"__name__": doc_id}
+        if order_field:
+            cursor[order_field] = timestamp
+        ordered = ordered.start_after(cursor)
+
+    # One extra document tells whether there is a next page
+    docs = list(ordered.limit(page_size + 1).stream())
+    if len(docs) <= page_size:
+        return docs, None
+    docs = docs[:page_size]
+    last = docs[-1]
+    return docs, encode_page_token(scope, last.get(order_field) if order_field else None, last.id)
+
+def stream_in(query, field: str, values: List[Any]) -> Iterator[Any]:
+    """Documents whose field is one of values, in as few 'in' queries as Firestore allows"""
+    for start in range(0, len(values), IN_QUERY_LIMIT):
+        yield from query.where(field, "in", values[start:start + IN_QUERY_LIMIT]).stream()
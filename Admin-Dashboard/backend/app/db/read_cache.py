@@ -0,0 +1,121 @@
+"""
+Process-local read-through cache for Firestore lookups.
+
+read_cache.get(collection, key, load) returns the cached value while it is
+younger than the collection's TTL (settings.cache_ttls) and calls load()
+otherwise. Collections without a TTL are not cached. Writes invalidate the
+documents they touch: WriteBatcher does so for everything it commits, and
+services writing outside a batch call invalidate() themselves. Each process
+(every uvicorn/gunicorn worker) has its own cache and invalidation does not
+reach the others, so writes by other processes (gate devices, other workers)
+show up only once the TTL expires. Callers that cannot tolerate that bypass
+the cache (user_service re-reads users for logins and account changes).
+
+    data = read_cache.get("Session", session_id, lambda: load_session(session_id))
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+class _CollectionStats:
+    __slots__ = ("hits", "misses", "expired", "invalidations", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+class ReadCache:
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 1000):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, "OrderedDict[str, Tuple[float, Any]]"] = {}
+        self._stats: Dict[str, _CollectionStats] = {}
+
+    def get(self, collection: str, key: str, load: Callable[[], Any]) -> Any:
+        """Cached value, or load() (None results are not cached)"""
+        ttl = self.ttls.get(collection, 0)
+        if ttl <= 0:
+            return load()
+
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.setdefault(collection, _CollectionStats())
+            entries = self._entries.setdefault(collection, OrderedDict())
+            cached = entries.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    entries.move_to_end(key)
+                    stats.hits += 1
+                    return cached[1]
+                del entries[key]
+                stats.expired += 1
+            stats.misses += 1
+
+        value = load()
+        if value is not None:
+            self.put(collection, key, value)
+        return value
+
+    def put(self, collection: str, key: str, value: Any):
+        """Store a value just written (write-through)"""
+        ttl = self.ttls.get(collection, 0)
+        if ttl <= 0:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(collection, _CollectionStats())
+            entries = self._entries.setdefault(collection, OrderedDict())
+            entries[key] = (time.monotonic() + ttl, value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                stats.evictions += 1
+
+    def invalidate(self, collection: str, key: Optional[str] = None):
+        """Forget one key, or the whole collection"""
+        with self._lock:
+            entries = self._entries.get(collection)
+            if not entries:
+                return
+            stats = self._stats.setdefault(collection, _CollectionStats())
+            if key is None:
+                stats.invalidations += len(entries)
+                entries.clear()
+            elif entries.pop(key, None) is not None:
+                stats.invalidations += 1
+
+    def invalidate_path(self, path: str):
+        """Forget a document by its path ("Collection/documentId")"""
+        collection, _, key = path.rpartition("/")
+        if collection in self.ttls:
+            self.invalidate(collection, key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per collection"""
+        with self._lock:
+            collections = {}
+            for collection, stats in self._stats.items():
+                lookups = stats.hits + stats.misses
+                collections[collection] = {
+                    "ttl_seconds": self.ttls.get(collection, 0),
+                    "entries": len(self._entries.get(collection, ())),
+                    "hits": stats.hits,
+                    "misses": stats.misses,
+                    "expired": stats.expired,
+                    "invalidations": stats.invalidations,
+                    "evictions": stats.evictions,
+                    "hit_rate": round(stats.hits / lookups, 3) if lookups else None
+                }
+            return {"max_entries_per_collection": self.max_entries, "collections": collections}
+
+read_cache = ReadCache(settings.cache_ttl_map, settings.cache_max_entries)
@@ -0,0 +1,38 @@
+"""
+Request-scoped memo for Firestore reads.
+
+Inside a request_memo() scope (opened per HTTP request by a middleware in
+main.py) memoized(key, compute) runs compute once and hands the result to
+every later caller in the same request, so nested services share one read
+of a collection instead of each scanning it again. Outside a scope nothing
+is cached. Committed writes clear the memo (see WriteBatcher).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+_memo: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_memo", default=None)
+
+@contextmanager
+def request_memo():
+    """Open a memo scope; values are dropped when it ends"""
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+def memoized(key: str, compute: Callable[[], Any], fresh: bool = False) -> Any:
+    """Value of compute() for this request; fresh=True recomputes and replaces it"""
+    memo = _memo.get()
+    if memo is None:
+        return compute()
+    if fresh or key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+def invalidate():
+    """Forget everything memoized in this request (after a write)"""
+    memo = _memo.get()
+    if memo:
+        memo.clear()
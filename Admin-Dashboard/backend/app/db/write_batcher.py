@@ -0,0 +1,195 @@
+"""
+Write coalescing for Firestore.
+
+Services queue their writes on a WriteBatcher instead of calling
+DocumentReference.set/update/delete one by one. Writes to the same document
+are merged (later fields win, Increments add up) and everything is committed
+as one WriteBatch when the scope ends, or earlier once max_batch_size
+documents are queued. Committed documents are dropped from the request
+memo and the read cache.
+
+    with WriteBatcher() as batch:
+        batch.update(entry_ref, {"isOut": True})
+        batch.set(map_ref, session_map)
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+from google.cloud import firestore
+from app.db.firestore import get_db
+from app.db.request_memo import invalidate
+from app.db.read_cache import read_cache
+
+# Firestore allows 500 writes per batch
+MAX_WRITES_PER_BATCH = 500
+
+def _combine(old: Any, new: Any) -> Any:
+    """Value of a field written twice; Increments add up"""
+    if isinstance(new, firestore.Increment):
+        if isinstance(old, firestore.Increment):
+            return firestore.Increment(old.value + new.value)
+        if isinstance(old, (int, float)) and not isinstance(old, bool):
+            return old + new.value
+    return new
+
+class _PendingWrite:
+    __slots__ = ("kind", "ref", "data", "merge")
+
+    def __init__(self, kind: str, ref, data: Optional[Dict[str, Any]], merge: bool):
+        self.kind = kind
+        self.ref = ref
+        self.data = dict(data) if data is not None else None
+        self.merge = merge
+
+    def absorb(self, kind: str, data: Optional[Dict[str, Any]], merge: bool) -> bool:
+        """Merge a later write to the same document; False if it needs its own write"""
+        if kind == "delete" or (kind == "set" and not merge):
+            self.kind, self.data, self.merge = kind, (dict(data) if data is not None else None), merge
+            return True
+        if self.kind == "delete":
+            if kind == "update":
+                return False
+            self.kind, self.data, self.merge = "set", dict(data), False
+            return True
+
+        for key, value in data.items():
+            self.data[key] = _combine(self.data.get(key), value)
+        if self.kind == "update" and kind == "set":
+            self.kind, self.merge = "set", True
+        return True
+
+    def apply(self, batch):
+        if self.kind == "set":
+            batch.set(self.ref, self.data, merge=self.merge)
+        elif self.kind == "update":
+            batch.update(self.ref, self.data)
+        else:
+            batch.delete(self.ref)
+
+class WriteMetrics:
+    """Process-wide counters of batched writes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.scopes = 0
+        self.writes_requested = 0
+        self.writes_coalesced = 0
+        self.documents_committed = 0
+        self.round_trips = 0
+
+    def record(self, requested: int, coalesced: int, committed: int, round_trips: int):
+        with self._lock:
+            self.scopes += 1
+            self.writes_requested += requested
+            self.writes_coalesced += coalesced
+            self.documents_committed += committed
+            self.round_trips += round_trips
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            saved = max(0, self.writes_requested - self.round_trips)
+            return {
+                "scopes": self.scopes,
+                "writes_requested": self.writes_requested,
+                "writes_coalesced": self.writes_coalesced,
+                "documents_committed": self.documents_committed,
+                "round_trips": self.round_trips,
+                # Without batching every requested write was its own round trip
+                "round_trips_saved": saved,
+                "round_trips_saved_per_scope": (saved / self.scopes) if self.scopes else 0.0
+            }
+
+write_metrics = WriteMetrics()
+
+class WriteBatcher:
+    """Collects writes and commits them in as few WriteBatch round trips as possible"""
+
+    def __init__(self, db=None, max_batch_size: int = 400):
+        self.db = db
+        self.max_batch_size = max(1, min(MAX_WRITES_PER_BATCH, max_batch_size))
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._order: List[_PendingWrite] = []
+        self._requested = 0
+        self._coalesced = 0
+        self._committed = 0
+        self._round_trips = 0
+
+    def set(self, ref, data: Dict[str, Any], merge: bool = False):
+        """Queue DocumentReference.set"""
+        self._queue("set", ref, data, merge)
+
+    def update(self, ref, fields: Dict[str, Any]):
+        """Queue DocumentReference.update"""
+        self._queue("update", ref, fields, False)
+
+    def delete(self, ref):
+        """Queue DocumentReference.delete"""
+        self._queue("delete", ref, None, False)
+
+    def _queue(self, kind: str, ref, data: Optional[Dict[str, Any]], merge: bool):
+        self._requested += 1
+        pending = self._pending.get(ref.path)
+        if pending is not None and pending.absorb(kind, data, merge):
+            self._coalesced += 1
+            return
+
+        write = _PendingWrite(kind, ref, data, merge)
+        self._pending[ref.path] = write
+        self._order.append(write)
+        if len(self._order) >= self.max_batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Commit queued writes in order; returns the number of documents written"""
+        written = 0
+        writes, self._order, self._pending = self._order, [], {}
+        for start in range(0, len(writes), self.max_batch_size):
+            chunk = writes[start:start + self.max_batch_size]
+            batch = (self.db or get_db()).batch()
+            for write in chunk:
+                write.apply(batch)
+            self._round_trips += 1
+            batch.commit()
+            written += len(chunk)
+            for write in chunk:
+                read_cache.invalidate_path(write.ref.path)
+        self._committed += written
+        if written:
+            invalidate()
+        return written
+
+    def stage(self, transaction) -> int:
+        """Add queued writes to a Transaction instead of committing them.
+        The transaction may retry and stage again, so the writes stay queued
+        until committed() is called."""
+        for write in self._order:
+            write.apply(transaction)
+        return len(self._order)
+
+    def committed(self):
+        """Queued writes went out with the transaction they were staged on"""
+        if self._order:
+            self._committed += len(self._order)
+            self._round_trips += 1
+            for write in self._order:
+                read_cache.invalidate_path(write.ref.path)
+            invalidate()
+        self.discard()
+
+    def discard(self):
+        """Drop queued writes"""
+        self._order, self._pending = [], {}
+
+    def __enter__(self) -> "WriteBatcher":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if exc_type is None:
+                self.flush()
+            else:
+                # Nothing is written when the scope fails half-way
+                self.discard()
+        finally:
+            write_metrics.record(self._requested, self._coalesced, self._committed, self._round_trips)
+        return False
@@ -1,14 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import json
 import os
 from app.api.session_router import router as session_router
 from app.api.parking_router import router as parking_router
 from app.api.auth_router import router as auth_router
 from app.api.debug_router import router as debug_router
 from app.db.firestore import firestore_db
+from app.db.write_batcher import write_metrics
+from app.db.read_cache import read_cache
+from app.db.request_memo import request_memo
 from app.core.config import settings
 from app.services.session_service import SessionService
+from app.services.occupancy_service import OccupancyService, available_slots_writer
+from app.services.visit_service import VisitService
+from app.services.stats_engine import get_snapshot
+from app.services.live_stats import live_stats_hub, RESYNC
 
 # Create FastAPI app
 app = FastAPI(
@@ -24,14 +33,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Page-Token"],  # Session listing pagination
 )
 
+@app.middleware("http")
+async def request_memo_scope(request, call_next):
+    """Let services within one request share the collection reads"""
+    with request_memo():
+        return await call_next(request)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(session_router)
 app.include_router(parking_router)
 app.include_router(debug_router)
 
+async def _reconcile_occupancy_periodically(interval: int):
+    """Recompute the occupancy counters from scratch every `interval` seconds"""
+    while True:
+        try:
+            await asyncio.to_thread(OccupancyService().reconcile)
+        except Exception as e:
+            print(f"Occupancy reconciliation failed: {e}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_occupancy_reconciliation():
+    """Start the occupancy reconciliation job"""
+    if settings.occupancy_reconcile_interval > 0:
+        app.state.occupancy_reconciler = asyncio.create_task(
+            _reconcile_occupancy_periodically(settings.occupancy_reconcile_interval)
+        )
+
+@app.on_event("shutdown")
+async def stop_occupancy_reconciliation():
+    """Stop the occupancy reconciliation job"""
+    task = getattr(app.state, "occupancy_reconciler", None)
+    if task:
+        task.cancel()
+
+async def _sync_visits_periodically(interval: int):
+    """Materialize the visits of sessions written by the gate devices every `interval` seconds"""
+    visit_service = VisitService()
+    while True:
+        try:
+            await asyncio.to_thread(visit_service.sync_recent)
+        except Exception as e:
+            print(f"Visit sync failed: {e}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_visit_sync():
+    """Start the visit sync job"""
+    if settings.visit_sync_interval > 0:
+        app.state.visit_sync = asyncio.create_task(_sync_visits_periodically(settings.visit_sync_interval))
+
+@app.on_event("shutdown")
+async def stop_visit_sync():
+    """Stop the visit sync job"""
+    task = getattr(app.state, "visit_sync", None)
+    if task:
+        task.cancel()
+
+@app.on_event("shutdown")
+async def flush_available_slots():
+    """Write a pending available slots correction"""
+    await asyncio.to_thread(available_slots_writer.stop)
+
+@app.on_event("startup")
+async def start_live_stats():
+    """Attach the live stats listeners, which also count entries written by the gate devices"""
+    await asyncio.to_thread(live_stats_hub.ensure_started)
+
+@app.on_event("shutdown")
+async def stop_live_stats():
+    """Detach the live stats listeners"""
+    live_stats_hub.stop()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -54,6 +132,10 @@ async def health_check():
         return {
             "status": "healthy",
             "firebase": "connected",
+            "firestore_writes": write_metrics.get_stats(),
+            "live_stats": live_stats_hub.get_stats(),
+            "read_cache": read_cache.get_stats(),
+            "available_slots_writer": available_slots_writer.get_stats(),
             "timestamp": "2025-06-26T00:00:00Z"
         }
     except Exception as e:
@@ -77,6 +159,32 @@ async def get_dashboard_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/dashboard/stream")
+async def stream_dashboard(request: Request):
+    """Server-sent events with dashboard stats: a 'snapshot' event on connect, then 'delta' events.
+    All connected dashboards share one set of Firestore listeners."""
+    live_stats_hub.ensure_started()
+    queue = live_stats_hub.subscribe(asyncio.get_running_loop())
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is RESYNC:
+                    message = live_stats_hub.full_message()
+                yield f"event: {message['type']}\ndata: {json.dumps(message, default=str)}\n\n"
+        finally:
+            live_stats_hub.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @app.patch("/api/dashboard/total-slots")
 async def update_total_slots(request: dict):
     """Update total parking slots"""
@@ -107,6 +215,26 @@ async def update_total_slots(request: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/dashboard/occupancy")
+async def get_occupancy():
+    """Occupancy counters and the last reconciliation result"""
+    try:
+        counters = await asyncio.to_thread(OccupancyService().get_counters)
+        return {
+            "counters": counters,
+            "last_reconcile": OccupancyService.last_reconcile()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/dashboard/occupancy/reconcile")
+async def reconcile_occupancy():
+    """Recompute occupancy counters from the session collections and report drift"""
+    try:
+        return await asyncio.to_thread(OccupancyService().reconcile)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/dashboard/debug")
 async def get_dashboard_debug():
     """Debug endpoint to show stats calculation logic"""
@@ -114,19 +242,17 @@ async def get_dashboard_debug():
         session_service = SessionService()
 
         # Get detailed info for debugging
-        collection_ref = session_service.collection_name
-        from app.db.firestore import get_collection, get_document
+        from app.db.firestore import get_document
 
-        # Get all sessions
-        sessions_ref = get_collection(collection_ref)
-        all_sessions = list(sessions_ref.stream())
+        # Get all sessions (the request's shared snapshot)
+        snapshot = get_snapshot()
 
         # Separate by gate
         in_sessions = []
         out_sessions = []
 
-        for doc in all_sessions:
-            doc_data = doc.to_dict()
+        for doc in snapshot.session_docs:
+            doc_data = snapshot.sessions[doc.id]
             gate = doc_data.get("gate")
             plate_number = doc_data.get("plateNumber") or doc_data.get("platenumber")
 
@@ -227,6 +353,27 @@ async def get_database_schema():
                 },
                 "document_id": "Auto-generated UUID"
             },
+            "Visit": {
+                "description": "Materialized entry/exit pairs listed by /api/sessions/enhanced",
+                "fields": {
+                    "entrySessionId": "str|null - Entry session ID",
+                    "exitSessionId": "str|null - Exit session ID",
+                    "faceUrl": "str|null - Entry face image URL",
+                    "plateUrl": "str|null - Entry plate image URL",
+                    "exitFaceUrl": "str|null - Exit face image URL",
+                    "exitPlateUrl": "str|null - Exit plate image URL",
+                    "licensePlate": "str - Plate number",
+                    "faceId": "str - Face index identifier",
+                    "entryTime": "timestamp|null - Entry time",
+                    "exitTime": "timestamp|null - Exit time",
+                    "duration": "int|null - Minutes parked",
+                    "status": "str - 'active', 'completed' or 'failed'",
+                    "faceMatchVerified": "bool - Exit has a face matching result",
+                    "faceMatchResult": "bool|null - Whether faces matched",
+                    "lastActivity": "timestamp - Exit time, else entry time (listing order)"
+                },
+                "document_id": "Entry session ID (exit session ID for an unpaired exit)"
+            },
             "IsNewSession": {
                 "description": "Status tracking for new sessions",
                 "fields": {
@@ -0,0 +1,358 @@
+"""
+Live dashboard statistics pushed to connected dashboards.
+
+LiveStatsHub keeps one Firestore on_snapshot listener per collection
+(Session, SessionMap, MatchingVerify and the ParkingMeta/slotCounter
+document) for the whole process, however many dashboards are connected.
+The first snapshot loads the state once; every later change only
+re-evaluates the entry sessions it can affect, and the resulting stats
+delta is pushed to each subscriber's queue (served as server-sent events
+by /api/dashboard/stream). New entry sessions the API did not count (those
+written by the gate devices) are added to the occupancy counters from here,
+and the visits of changed sessions are materialized before the change is
+announced, so dashboards refetching the listing see them (this also stamps
+their createdAt, which orders the listings).
+"""
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.db.firestore import get_collection, get_document
+from app.db.pagination import ORDER_FIELD
+from app.services.occupancy_service import (
+    OccupancyService, META_COLLECTION, META_DOCUMENT, DEFAULT_TOTAL_SLOTS, COUNTED_FIELD, is_countable_plate
+)
+from app.services.session_pairing_service import SessionPairingService
+from app.services.visit_service import VisitService
+
+WATCHED_COLLECTIONS = ("Session", "SessionMap", "MatchingVerify")
+
+# Put on a subscriber queue that overflowed: send the full state instead of the lost deltas
+RESYNC = object()
+
+class LiveStatsHub:
+    """Incrementally maintained dashboard stats, fed by a single set of listeners"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.pairing = SessionPairingService()
+        self.visits = VisitService()
+        self._lock = threading.RLock()
+        self._watches: List[Any] = []
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._reset()
+
+        self.changes_applied = 0
+        self.events_sent = 0
+        self.resyncs = 0
+        self.sessions_counted = 0
+        self.visits_synced = 0
+
+    def _reset(self):
+        self._ready: Set[str] = set()
+
+        # Mirrored documents and the indexes the pairing rules need
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self._timestamps: Dict[str, Optional[datetime]] = {}
+        self._maps: Dict[str, Tuple[str, str]] = {}
+        self._maps_by_entry: Dict[str, Set[str]] = {}
+        self._maps_by_exit: Dict[str, Set[str]] = {}
+        self._verifications: Dict[str, Dict[str, Any]] = {}
+        self._verifications_by_session: Dict[str, List[str]] = {}
+
+        # Derived state
+        self._parked: Dict[str, Dict[str, Any]] = {}
+        self._exited: Set[str] = set()
+        self._gate_counts = {"In": 0, "Out": 0}
+        self._total_slots = DEFAULT_TOTAL_SLOTS
+        self._last_stats: Dict[str, Any] = {}
+
+    # ---------------- Listener lifecycle ----------------
+
+    def ensure_started(self):
+        """Attach the listeners (once per process)"""
+        with self._lock:
+            if self._watches:
+                return
+            for name in WATCHED_COLLECTIONS:
+                self._watches.append(get_collection(name).on_snapshot(
+                    lambda docs, changes, read_time, name=name: self._on_changes(name, changes)
+                ))
+            self._watches.append(get_document(META_COLLECTION, META_DOCUMENT).on_snapshot(
+                lambda docs, changes, read_time: self._on_changes(META_COLLECTION, changes)
+            ))
+            print(f"Live stats listening on {', '.join(WATCHED_COLLECTIONS)} and {META_COLLECTION}")
+
+    def stop(self):
+        """Detach the listeners"""
+        with self._lock:
+            for watch in self._watches:
+                watch.unsubscribe()
+            self._watches = []
+            self._reset()
+
+    @property
+    def ready(self) -> bool:
+        return len(self._ready) == len(WATCHED_COLLECTIONS) + 1
+
+    # ---------------- Subscribers ----------------
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+        """Queue receiving delta messages; starts with the full state once loaded"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = loop
+            if self.ready:
+                queue.put_nowait(RESYNC)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def full_message(self) -> Dict[str, Any]:
+        """The whole current state, sent on connect and after a queue overflow"""
+        with self._lock:
+            return {
+                "type": "snapshot",
+                "stats": dict(self._last_stats),
+                "vehicles": list(self._parked.values())
+            }
+
+    def _broadcast(self, message: Any):
+        with self._lock:
+            for queue, loop in list(self._subscribers.items()):
+                try:
+                    loop.call_soon_threadsafe(self._offer, queue, message)
+                except RuntimeError:
+                    # Event loop already closed
+                    self._subscribers.pop(queue, None)
+
+    def _offer(self, queue: asyncio.Queue, message: Any):
+        """Runs on the subscriber's loop"""
+        if queue.full():
+            # A slow client gets the full state instead of every delta it missed
+            while not queue.empty():
+                queue.get_nowait()
+            self.resyncs += 1
+            message = RESYNC
+        queue.put_nowait(message)
+        self.events_sent += 1
+
+    # ---------------- Incremental state ----------------
+
+    def timestamp(self, session_id: str) -> Optional[datetime]:
+        """Parsed timestamp of a mirrored session (cached)"""
+        if session_id not in self._timestamps:
+            self._timestamps[session_id] = SessionPairingService._parse_timestamp(
+                self.sessions[session_id].get("timestamp")
+            )
+        return self._timestamps[session_id]
+
+    def _on_changes(self, collection: str, changes: List[Any]):
+        """Listener callback (Firestore watch thread)"""
+        uncounted = []
+        changed_sessions = []
+        message = None
+        try:
+            with self._lock:
+                affected = set()
+                for change in changes:
+                    doc_id = change.document.id
+                    removed = change.type.name == "REMOVED"
+                    data = None if removed else change.document.to_dict()
+                    old = self.sessions.get(doc_id) if collection == "Session" else None
+                    affected |= self._apply(collection, doc_id, data)
+                    # Sessions already there when listening started are covered by
+                    # reconcile() and VisitService.sync_recent()
+                    if collection != "Session" or collection not in self._ready or removed:
+                        continue
+                    if change.type.name == "ADDED" and data.get("gate") == "In" and not data.get(COUNTED_FIELD):
+                        uncounted.append(doc_id)
+                    if not _only_bookkeeping(old, data):
+                        changed_sessions.append(doc_id)
+                self.changes_applied += len(changes)
+
+                was_ready = self.ready
+                self._ready.add(collection)
+                if not self.ready:
+                    return
+                if not was_ready:
+                    # Everything is loaded: evaluate every entry once, then only what changes
+                    for entry_id in list(self.sessions):
+                        self._refresh_entry(entry_id)
+                    self._last_stats = self._stats()
+                    self._broadcast(RESYNC)
+                    return
+
+                parked_before = set(self._parked)
+                for entry_id in affected:
+                    self._refresh_entry(entry_id)
+                message = self._delta(self._stats(), parked_before, collection, len(changes))
+        except Exception as e:
+            print(f"Error applying {collection} changes to live stats: {e}")
+
+        # Outside the lock: these write to Firestore
+        self._count_sessions(uncounted)
+        self._sync_visits(changed_sessions)
+        if message:
+            self._broadcast(message)
+
+    def _count_sessions(self, session_ids: List[str]):
+        """Add entries written outside the API to the occupancy counters (once, across processes)"""
+        occupancy = OccupancyService()
+        for session_id in session_ids:
+            try:
+                if occupancy.count_session(get_document("Session", session_id)):
+                    self.sessions_counted += 1
+            except Exception as e:
+                print(f"Error counting session {session_id}: {e}")
+
+    def _sync_visits(self, session_ids: List[str]):
+        """Materialize the visits of changed sessions (those written by the API already are)"""
+        if not session_ids:
+            return
+        try:
+            self.visits_synced += self.visits.sync(session_ids)
+        except Exception as e:
+            print(f"Error syncing visits of {len(session_ids)} sessions: {e}")
+
+    def _apply(self, collection: str, doc_id: str, data: Optional[Dict[str, Any]]) -> Set[str]:
+        """Update the mirror; returns entry session ids whose status may have changed"""
+        if collection == "Session":
+            old = self.sessions.pop(doc_id, None)
+            self._timestamps.pop(doc_id, None)
+            if old and old.get("gate") in self._gate_counts:
+                self._gate_counts[old["gate"]] -= 1
+            if data is not None:
+                self.sessions[doc_id] = data
+                if data.get("gate") in self._gate_counts:
+                    self._gate_counts[data["gate"]] += 1
+            # The session itself as an entry, and entries paired with it as an exit
+            return {doc_id} | self._entries_for_exit(doc_id)
+
+        if collection == "SessionMap":
+            affected = set()
+            old = self._maps.pop(doc_id, None)
+            if old:
+                self._maps_by_entry.get(old[0], set()).discard(doc_id)
+                self._maps_by_exit.get(old[1], set()).discard(doc_id)
+                affected.add(old[0])
+            if data is not None:
+                pair = (data.get("entrySessionID"), data.get("exitSessionID"))
+                self._maps[doc_id] = pair
+                self._maps_by_entry.setdefault(pair[0], set()).add(doc_id)
+                self._maps_by_exit.setdefault(pair[1], set()).add(doc_id)
+                affected.add(pair[0])
+            return affected
+
+        if collection == "MatchingVerify":
+            affected = set()
+            old = self._verifications.pop(doc_id, None)
+            if old:
+                session_id = old.get("sessionID")
+                ids = self._verifications_by_session.get(session_id, [])
+                if doc_id in ids:
+                    ids.remove(doc_id)
+                affected |= self._entries_for_exit(session_id)
+            if data is not None:
+                self._verifications[doc_id] = data
+                self._verifications_by_session.setdefault(data.get("sessionID"), []).append(doc_id)
+                affected |= self._entries_for_exit(data.get("sessionID"))
+            return affected
+
+        # ParkingMeta/slotCounter: only the slot total matters here
+        self._total_slots = (data or {}).get("total", DEFAULT_TOTAL_SLOTS)
+        return set()
+
+    def _entries_for_exit(self, exit_id: str) -> Set[str]:
+        return {self._maps[map_id][0] for map_id in self._maps_by_exit.get(exit_id, ())}
+
+    def _refresh_entry(self, entry_id: str):
+        """Re-evaluate whether one entry session is exited / still parked"""
+        exited = any(self._is_valid_map(map_id) for map_id in self._maps_by_entry.get(entry_id, ()))
+        if exited:
+            self._exited.add(entry_id)
+        else:
+            self._exited.discard(entry_id)
+
+        session = self.sessions.get(entry_id)
+        plate_number = (session.get("plateNumber") or session.get("platenumber")) if session else None
+        if session and session.get("gate") == "In" and not exited and is_countable_plate(plate_number):
+            self._parked[entry_id] = {
+                "session_id": entry_id,
+                "face_index": session.get("faceIndex"),
+                "plate_number": plate_number,
+                "entry_time": session.get("timestamp"),
+                "status": "currently_parked"
+            }
+        else:
+            self._parked.pop(entry_id, None)
+
+    def _is_valid_map(self, map_id: str) -> bool:
+        entry_id, exit_id = self._maps[map_id]
+        if entry_id not in self.sessions or exit_id not in self.sessions:
+            return False
+        verification_ids = self._verifications_by_session.get(exit_id)
+        if not verification_ids:
+            return False
+        # First verification per exit, as the pairing service picks it
+        verification = self._verifications[verification_ids[0]]
+        return self.pairing.is_valid_pair(self, entry_id, exit_id, verification)
+
+    def _stats(self) -> Dict[str, Any]:
+        current = len(self._parked)
+        return {
+            "current_vehicles": current,
+            "total_entries": self._gate_counts["In"],
+            "total_exits": self._gate_counts["Out"],
+            "verified_exits": len(self._exited),
+            "available_slots": max(0, self._total_slots - current),
+            "total_slots": self._total_slots
+        }
+
+    def _delta(self, stats: Dict[str, Any], parked_before: Set[str], collection: str,
+               change_count: int) -> Optional[Dict[str, Any]]:
+        """Delta message for a change (None when there is nothing to announce)"""
+        changed = {key: value for key, value in stats.items() if self._last_stats.get(key) != value}
+        self._last_stats = stats
+        arrived = [self._parked[entry_id] for entry_id in self._parked.keys() - parked_before]
+        left = sorted(parked_before - self._parked.keys())
+        if not changed and not arrived and not left and collection == META_COLLECTION:
+            return None
+        # Session list changes are announced too, so dashboards refetch them only when needed
+        return {
+            "type": "delta",
+            "stats": changed,
+            "parked": {"arrived": arrived, "left": left},
+            "collection": collection,
+            "changes": change_count
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Listener and subscriber counters"""
+        with self._lock:
+            return {
+                "listening": bool(self._watches),
+                "ready": self.ready,
+                "subscribers": len(self._subscribers),
+                "sessions_mirrored": len(self.sessions),
+                "changes_applied": self.changes_applied,
+                "sessions_counted": self.sessions_counted,
+                "visits_synced": self.visits_synced,
+                "events_sent": self.events_sent,
+                "resyncs": self.resyncs
+            }
+
+# Session fields written by the backend itself, not shown in visits
+_BOOKKEEPING_FIELDS = (COUNTED_FIELD, ORDER_FIELD)
+
+def _only_bookkeeping(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> bool:
+    """The change only set bookkeeping fields (counted marker, createdAt) on a session"""
+    if old is None:
+        return False
+    strip = lambda data: {key: value for key, value in data.items() if key not in _BOOKKEEPING_FIELDS}
+    return strip(new) == strip(old)
+
+live_stats_hub = LiveStatsHub()
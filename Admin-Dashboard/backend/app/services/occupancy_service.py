@@ -0,0 +1,323 @@
+"""
+Incrementally maintained occupancy counters.
+
+ParkingMeta/slotCounter holds:
+    total         - slots (editable by admin)
+    occupied      - vehicles currently parked
+    totalEntries  - In sessions ever created
+    available     - free slots, decremented/incremented by the gate devices
+
+The counters change in a transaction together with the writes that cause
+them (entry session created, exit finalized, plate of an entry corrected),
+so dashboard reads are a single document get. Entry sessions written by the
+gate devices are counted from the Session change feed (count_session), and
+every counted entry carries occupancyCounted so it is counted only once.
+reconcile() recomputes the counters from the Session/SessionMap/MatchingVerify
+collections and reports drift.
+
+Reads never write. The dashboard's available is derived from total and
+occupied on read. The stored field belongs to the gate devices: the backend
+only creates it, shifts it when total changes, and otherwise leaves it
+alone. With settings.write_available_slots the derived value is written
+over it instead, through AvailableSlotsWriter, which coalesces requests
+within a short delay and writes only if the value still differs.
+"""
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from google.cloud import firestore
+from app.db.firestore import get_db, get_document
+from app.db.write_batcher import WriteBatcher
+from app.db.read_cache import read_cache
+from app.core.config import settings
+
+META_COLLECTION = "ParkingMeta"
+META_DOCUMENT = "slotCounter"
+DEFAULT_TOTAL_SLOTS = 10
+
+# Set on an entry session once it is included in the counters
+COUNTED_FIELD = "occupancyCounted"
+
+def is_countable_plate(plate_number: Optional[str]) -> bool:
+    """Entries without a detected plate are not counted as parked vehicles"""
+    return bool(plate_number) and plate_number not in ["N/A", "Detecting...", ""]
+
+def _counters(total: int, occupied: int, total_entries: int) -> Dict[str, Any]:
+    occupied = max(0, occupied)
+    return {
+        "total": total,
+        "occupied": occupied,
+        "totalEntries": max(0, total_entries),
+        "available": max(0, total - occupied)
+    }
+
+def _stored(counters: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Counter fields to write over the stored document data"""
+    if settings.write_available_slots or "available" not in data:
+        return counters
+    return {key: value for key, value in counters.items() if key != "available"}
+
+class OccupancyService:
+    # Last reconciliation result, shared by all instances
+    _last_reconcile: Optional[Dict[str, Any]] = None
+    _reconcile_lock = threading.Lock()
+
+    def _meta_ref(self):
+        return get_document(META_COLLECTION, META_DOCUMENT)
+
+    def read_meta(self) -> Dict[str, Any]:
+        """ParkingMeta/slotCounter as stored ({} if missing), through the read cache"""
+        def load():
+            doc = self._meta_ref().get()
+            return doc.to_dict() if doc.exists else None
+        return read_cache.get(META_COLLECTION, META_DOCUMENT, load) or {}
+
+    def _written(self):
+        # Counter transactions write the document directly, not through a WriteBatcher
+        read_cache.invalidate(META_COLLECTION, META_DOCUMENT)
+
+    def get_counters(self) -> Dict[str, Any]:
+        """Read the counters (one cached document get); initialized by reconciling on first use"""
+        data = self.read_meta()
+        if "occupied" not in data or "totalEntries" not in data:
+            self.reconcile()
+            data = self.read_meta()
+        counters = _counters(data.get("total", DEFAULT_TOTAL_SLOTS), data.get("occupied", 0), data.get("totalEntries", 0))
+        if settings.write_available_slots and data.get("available") != counters["available"]:
+            available_slots_writer.request()
+        return counters
+
+    def record(self, occupied_delta: int = 0, entries_delta: int = 0,
+               batch: Optional[WriteBatcher] = None) -> Optional[Dict[str, Any]]:
+        """Apply counter deltas in a transaction, committing the writes queued on batch with them.
+        Returns the new counters, or None if they were not initialized yet (the writes are
+        still committed and the counters are then computed from scratch)."""
+        return self._transact(lambda transaction: (occupied_delta, entries_delta), batch)[1]
+
+    def _transact(self, deltas: Callable[[Any], Optional[Tuple[int, int]]],
+                  batch: Optional[WriteBatcher]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Run record() with deltas(transaction) deciding, inside the transaction, what to apply.
+        deltas may read documents; when it returns None nothing is written and the batch is
+        discarded. Returns (applied, counters)."""
+        meta_ref = self._meta_ref()
+        transaction = get_db().transaction()
+
+        @firestore.transactional
+        def apply(transaction):
+            snapshot = meta_ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else {}
+            change = deltas(transaction)
+            if change is None:
+                return False, None
+            if batch is not None:
+                batch.stage(transaction)
+            if "occupied" not in data or "totalEntries" not in data:
+                return True, None
+            counters = _counters(data.get("total", DEFAULT_TOTAL_SLOTS),
+                                 data["occupied"] + change[0],
+                                 data["totalEntries"] + change[1])
+            transaction.set(meta_ref, _stored(counters, data), merge=True)
+            return True, counters
+
+        applied, counters = apply(transaction)
+        if not applied:
+            if batch is not None:
+                batch.discard()
+            return False, None
+        self._written()
+        if batch is not None:
+            batch.committed()
+        if counters is None:
+            self.reconcile()
+        return True, counters
+
+    def record_entry(self, plate_number: Optional[str], batch: Optional[WriteBatcher] = None):
+        """New In session (queued on batch, which must also set COUNTED_FIELD on it)"""
+        return self.record(1 if is_countable_plate(plate_number) else 0, 1, batch)
+
+    def record_exit(self, entry_ref, batch: Optional[WriteBatcher] = None, vacate: bool = True) -> bool:
+        """Entry leaving with a verified exit (queued on batch, which must set isOut on it).
+        The entry is read in the transaction: if it is already out (a concurrent finalize)
+        nothing is written and False is returned. Only counted plates free a slot."""
+        def deltas(transaction):
+            snapshot = entry_ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else None
+            if data is None or data.get("isOut"):
+                return None
+            plate_number = data.get("plateNumber") or data.get("platenumber")
+            return (-1 if vacate and is_countable_plate(plate_number) else 0), 0
+
+        return self._transact(deltas, batch)[0]
+
+    def count_session(self, session_ref) -> bool:
+        """Count an entry session written outside the API (e.g. by a gate device), once.
+        True if it was counted now."""
+        def deltas(transaction):
+            snapshot = session_ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else None
+            if data is None or data.get("gate") != "In" or data.get(COUNTED_FIELD):
+                return None
+            plate_number = data.get("plateNumber") or data.get("platenumber")
+            return (1 if is_countable_plate(plate_number) else 0), 1
+
+        batch = WriteBatcher()
+        batch.update(session_ref, {COUNTED_FIELD: True})
+        return self._transact(deltas, batch)[0]
+
+    def set_total(self, total_slots: int) -> Dict[str, Any]:
+        """Change total slots; the stored available moves by the same amount"""
+        meta_ref = self._meta_ref()
+        self.get_counters()  # make sure occupied is initialized
+        transaction = get_db().transaction()
+
+        @firestore.transactional
+        def apply(transaction):
+            data = meta_ref.get(transaction=transaction).to_dict() or {}
+            counters = _counters(total_slots, data.get("occupied", 0), data.get("totalEntries", 0))
+            stored = _stored(counters, data)
+            if "available" not in stored:
+                old_total = data.get("total", DEFAULT_TOTAL_SLOTS)
+                stored["available"] = max(0, data["available"] + total_slots - old_total)
+            transaction.set(meta_ref, stored, merge=True)
+            return counters
+
+        counters = apply(transaction)
+        self._written()
+        return counters
+
+    def reconcile(self) -> Dict[str, Any]:
+        """Recompute the counters from scratch and report how far they had drifted.
+        Changes recorded while the collections are scanned are carried over."""
+        from app.services.stats_engine import StatsEngine
+        with self._reconcile_lock:
+            meta_ref = self._meta_ref()
+            before = meta_ref.get()
+            before = before.to_dict() if before.exists else {}
+            started = datetime.now()
+
+            stats = StatsEngine().compute(fresh=True)
+            actual_occupied = stats["current_vehicles"]
+            actual_entries = stats["total_entries"]
+
+            transaction = get_db().transaction()
+
+            @firestore.transactional
+            def apply(transaction):
+                now = meta_ref.get(transaction=transaction)
+                now = now.to_dict() if now.exists else {}
+                # Deltas recorded while scanning are carried over on top of the scan
+                # (a write racing the scan itself is corrected by the next run)
+                occupied = actual_occupied + now.get("occupied", 0) - before.get("occupied", now.get("occupied", 0))
+                entries = actual_entries + now.get("totalEntries", 0) - before.get("totalEntries", now.get("totalEntries", 0))
+                counters = _counters(now.get("total", DEFAULT_TOTAL_SLOTS), occupied, entries)
+                transaction.set(meta_ref, _stored(counters, now), merge=True)
+                return counters
+
+            counters = apply(transaction)
+            self._written()
+
+            initialized = "occupied" in before and "totalEntries" in before
+            result = {
+                "initialized": initialized,
+                "counters": counters,
+                "recomputed": {"occupied": actual_occupied, "totalEntries": actual_entries},
+                "drift": {
+                    "occupied": before.get("occupied", 0) - actual_occupied,
+                    "totalEntries": before.get("totalEntries", 0) - actual_entries
+                } if initialized else None,
+                "started_at": started.isoformat(),
+                "duration_ms": round((datetime.now() - started).total_seconds() * 1000, 1)
+            }
+            OccupancyService._last_reconcile = result
+
+        if result["drift"] and any(result["drift"].values()):
+            print(f"Occupancy counters drifted: {result['drift']} (corrected to {counters})")
+        return result
+
+    @classmethod
+    def last_reconcile(cls) -> Optional[Dict[str, Any]]:
+        """Result of the most recent reconciliation in this process"""
+        return cls._last_reconcile
+
+class AvailableSlotsWriter:
+    """
+    Debounced writer for ParkingMeta/slotCounter.available.
+
+    request() only schedules a flush `delay` seconds later, so any number of
+    requests in that window (e.g. every dashboard polling the stats) end in
+    one transaction, which re-derives the value and writes it only if the
+    stored one differs. Only requested with settings.write_available_slots.
+    """
+
+    def __init__(self, delay: float = 2.0):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+        self.requested = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.written = 0
+
+    def request(self):
+        """Persist the derived available count soon (coalesced)"""
+        with self._lock:
+            self.requested += 1
+            if self._timer is not None:
+                self.coalesced += 1
+                return
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> bool:
+        """Write available now if it differs from total - occupied; True if written"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.flushes += 1
+
+        meta_ref = get_document(META_COLLECTION, META_DOCUMENT)
+        transaction = get_db().transaction()
+
+        @firestore.transactional
+        def apply(transaction):
+            snapshot = meta_ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else {}
+            if "occupied" not in data:
+                return False
+            available = max(0, data.get("total", DEFAULT_TOTAL_SLOTS) - max(0, data["occupied"]))
+            if data.get("available") == available:
+                return False
+            transaction.update(meta_ref, {"available": available})
+            return True
+
+        try:
+            written = apply(transaction)
+        except Exception as e:
+            print(f"Error writing available slots: {e}")
+            return False
+        if written:
+            self.written += 1
+            read_cache.invalidate(META_COLLECTION, META_DOCUMENT)
+        return written
+
+    def stop(self):
+        """Write a pending request before shutting down"""
+        with self._lock:
+            pending = self._timer is not None
+        if pending:
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "delay_seconds": self.delay,
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "written": self.written
+        }
+
+available_slots_writer = AvailableSlotsWriter(settings.available_slots_write_delay)
@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
-from app.db.firestore import get_collection, get_document
+from datetime import datetime, timezone
+from app.db.firestore import get_collection, get_document, get_db
+from app.db.pagination import MAX_PAGE_SIZE, ORDER_FIELD, encode_page_token, paginate, stream_in
 
 class SessionPairingService:
     """
@@ -18,21 +19,17 @@ class SessionPairingService:
         Get all verified session pairs using face matching verification.
         Returns list of paired sessions with verification status.
         """
-        try:
-            # Get all session maps (entry-exit pairs)
-            session_maps = self._get_all_session_maps()
-
-            # Get all matching verifications
-            matching_verifications = self._get_all_matching_verifications()
+        from app.services.stats_engine import get_snapshot
 
-            # Get all sessions
-            all_sessions = self._get_all_sessions()
-            sessions_dict = {doc.id: doc.to_dict() for doc in all_sessions}
+        try:
+            # Sessions and verifications are looked up through the snapshot's
+            # hash indexes, so this is linear in the number of session maps
+            snapshot = get_snapshot()
+            sessions_dict = snapshot.sessions
 
             verified_pairs = []
 
-            for session_map in session_maps:
-                map_data = session_map.to_dict()
+            for map_data in snapshot.session_maps:
                 entry_id = map_data.get("entrySessionID")
                 exit_id = map_data.get("exitSessionID")
 
@@ -46,7 +43,7 @@ class SessionPairingService:
                     continue
 
                 # Find matching verification for this exit session
-                verification = self._find_verification_for_session(exit_id, matching_verifications)
+                verification = self._find_verification_for_session(exit_id)
 
                 pair_info = {
                     "entry_session_id": entry_id,
@@ -55,7 +52,7 @@ class SessionPairingService:
                     "exit_session": exit_session,
                     "face_match_verified": verification is not None,
                     "face_match_result": verification.get("isMatch") if verification else None,
-                    "is_valid_pair": self._is_valid_session_pair(entry_session, exit_session, verification)
+                    "is_valid_pair": self.is_valid_pair(snapshot, entry_id, exit_id, verification)
                 }
 
                 verified_pairs.append(pair_info)
@@ -70,256 +67,145 @@ class SessionPairingService:
         """
         Get accurate count of current vehicles using face matching verification.
         """
-        try:
-            # Get all verified pairs
-            verified_pairs = self.get_verified_session_pairs()
-
-            # Get all IN sessions
-            in_sessions = self._get_sessions_by_gate("In")
-
-            # Track which entry sessions have valid exits
-            exited_entry_sessions = set()
-
-            for pair in verified_pairs:
-                # Only count as exited if face matching passed
-                if pair["is_valid_pair"] and pair["face_match_result"]:
-                    exited_entry_sessions.add(pair["entry_session_id"])
-
-            # Count vehicles still in parking
-            current_vehicles = []
-            for doc in in_sessions:
-                session_data = doc.to_dict()
-
-                # Skip if this entry session has a verified exit
-                if doc.id in exited_entry_sessions:
-                    continue
-
-                # Check if session has valid plate number
-                plate_number = session_data.get("plateNumber") or session_data.get("platenumber")
-                if not plate_number or plate_number in ["N/A", "Detecting...", ""]:
-                    continue
+        from app.services.stats_engine import StatsEngine
 
-                current_vehicles.append({
-                    "session_id": doc.id,
-                    "face_index": session_data.get("faceIndex"),
-                    "plate_number": plate_number,
-                    "entry_time": session_data.get("timestamp"),
-                    "status": "currently_parked"
-                })
+        try:
+            # One pass over the request's snapshot of the collections
+            stats = StatsEngine().compute()
 
             return {
-                "count": len(current_vehicles),
-                "vehicles": current_vehicles,
-                "verified_exits": len(exited_entry_sessions),
-                "total_entries": len(in_sessions)
+                "count": stats["current_vehicles"],
+                "vehicles": stats["vehicles"],
+                "verified_exits": stats["verified_exits"],
+                "total_entries": stats["total_entries"]
             }
 
         except Exception as e:
             print(f"Error calculating current vehicles: {e}")
             return {"count": 0, "vehicles": [], "verified_exits": 0, "total_entries": 0}
 
-    def get_enhanced_grouped_sessions(self) -> List[Dict[str, Any]]:
-        """
-        Get enhanced grouped sessions with proper verification status.
+    def get_grouped_page(self, limit: int = 100, page_token: Optional[str] = None,
+                         verified: bool = True) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
-        try:
-            # Get verified pairs
-            verified_pairs = self.get_verified_session_pairs()
-
-            # Get all sessions
-            all_sessions = self._get_all_sessions()
-            sessions_dict = {doc.id: doc.to_dict() for doc in all_sessions}
-
-            grouped_sessions = []
-            used_session_ids = set()
-
-            # Process verified pairs first
-            for pair in verified_pairs:
-                entry_session = pair["entry_session"]
-                exit_session = pair["exit_session"]
-
-                # If the pair is NOT valid (e.g. plate/face mismatch, timestamp issue),
-                # skip grouping them together so they will be treated as separate
-                # unmatched sessions below (entry -> active, exit -> failed). This keeps
-                # current_vehicles count consistent with visible 'active' sessions.
-                if not (pair["is_valid_pair"] and pair["face_match_result"]):
-                    # We only skip pairing; DO NOT mark IDs as used yet so they fall into
-                    # the unmatched processing later.
-                    continue
+        One page of grouped sessions, most recent activity first.
 
-                # Convert session data
-                entry_time = self._parse_timestamp(entry_session.get("timestamp"))
-                exit_time = self._parse_timestamp(exit_session.get("timestamp"))
-
-                plate_number = (entry_session.get("plateNumber") or
-                              entry_session.get("platenumber") or
-                              exit_session.get("plateNumber") or
-                              exit_session.get("platenumber") or "Unknown")
-
-                face_index = (entry_session.get("faceIndex") or
-                             exit_session.get("faceIndex") or "Unknown")
-
-                # Determine status based on verification (only completed reaches here)
-                status = "completed"
-
-                duration = None
-                if entry_time and exit_time:
-                    duration = int((exit_time - entry_time).total_seconds() / 60)
-
-                grouped_session = {
-                    "face_id": face_index,
-                    "license_plate": plate_number,
-                    "entry_time": entry_time,
-                    "exit_time": exit_time,
-                    "status": status,
-                    "duration": duration,
-
-                    # Entry session data
-                    "entry_session_id": pair["entry_session_id"],
-                    "face_url": entry_session.get("faceUrl"),
-                    "plate_url": entry_session.get("plateUrl"),
-
-                    # Exit session data
-                    "exit_session_id": pair["exit_session_id"],
-                    "exit_face_url": exit_session.get("faceUrl"),
-                    "exit_plate_url": exit_session.get("plateUrl"),
-
-                    # Verification data
-                    "face_match_verified": pair["face_match_verified"],
-                    "face_match_result": pair["face_match_result"]
-                }
+        Sessions are read newest first with a timestamp cursor and each page is
+        paired through SessionMap / MatchingVerify lookups for its own session
+        ids only, so the cost of a page does not depend on the history size.
+        A pair is listed at its exit session (which is newer than the entry);
+        an entry without a valid pair is listed as active.
 
-                grouped_sessions.append(grouped_session)
-                used_session_ids.add(pair["entry_session_id"])
-                used_session_ids.add(pair["exit_session_id"])
-
-            # Add unpaired IN sessions (still parking)
-            in_sessions = self._get_sessions_by_gate("In")
-            for doc in in_sessions:
-                if doc.id not in used_session_ids:
-                    session_data = doc.to_dict()
-                    entry_time = self._parse_timestamp(session_data.get("timestamp"))
-
-                    plate_number = (session_data.get("plateNumber") or
-                                  session_data.get("platenumber") or "Unknown")
-
-                    grouped_session = {
-                        "face_id": session_data.get("faceIndex", "Unknown"),
-                        "license_plate": plate_number,
-                        "entry_time": entry_time,
-                        "exit_time": None,
-                        "status": "active",  # Still parking
-                        "duration": None,
-
-                        # Entry session data
-                        "entry_session_id": doc.id,
-                        "face_url": session_data.get("faceUrl"),
-                        "plate_url": session_data.get("plateUrl"),
-
-                        # No exit data
-                        "exit_session_id": None,
-                        "exit_face_url": None,
-                        "exit_plate_url": None,
-
-                        # No verification data
-                        "face_match_verified": False,
-                        "face_match_result": None
-                    }
-
-                    grouped_sessions.append(grouped_session)
-                    used_session_ids.add(doc.id)
-
-            # Add unpaired OUT sessions (exit without entry OR invalid pair skipped above)
-            out_sessions = self._get_sessions_by_gate("Out")
-            for doc in out_sessions:
-                if doc.id not in used_session_ids:
-                    session_data = doc.to_dict()
-                    exit_time = self._parse_timestamp(session_data.get("timestamp"))
-
-                    plate_number = (session_data.get("plateNumber") or
-                                  session_data.get("platenumber") or "Unknown")
-
-                    grouped_session = {
-                        "face_id": session_data.get("faceIndex", "Unknown"),
-                        "license_plate": plate_number,
-                        "entry_time": None,
-                        "exit_time": exit_time,
-                        "status": "failed",  # Exit without valid entry pairing
-                        "duration": None,
-
-                        # No entry data
-                        "entry_session_id": None,
-                        "face_url": None,
-                        "plate_url": None,
-
-                        # Exit session data
-                        "exit_session_id": doc.id,
-                        "exit_face_url": session_data.get("faceUrl"),
-                        "exit_plate_url": session_data.get("plateUrl"),
-
-                        # No (valid) verification data here
-                        "face_match_verified": False,
-                        "face_match_result": None
-                    }
-
-                    grouped_sessions.append(grouped_session)
-
-            # Sort by most recent activity
-            grouped_sessions.sort(key=lambda x: max(
-                x["entry_time"] or datetime.min,
-                x["exit_time"] or datetime.min
-            ), reverse=True)
-
-            return grouped_sessions
+        Args:
+            limit: Rows per page
+            page_token: Token returned with the previous page
+            verified: Pair only on a successful face match (unpaired exits are
+                "failed"); otherwise any SessionMap pairs an entry with its exit
 
-        except Exception as e:
-            print(f"Error getting enhanced grouped sessions: {e}")
-            return []
-
-    def _get_all_sessions(self) -> List[Any]:
-        """Get all sessions from Firestore"""
-        collection_ref = get_collection(self.session_collection)
-        return list(collection_ref.stream())
-
-    def _get_sessions_by_gate(self, gate: str) -> List[Any]:
-        """Get sessions by gate type"""
-        collection_ref = get_collection(self.session_collection)
-        query = collection_ref.where("gate", "==", gate)
-        return list(query.stream())
+        Returns:
+            (rows in the grouped_row format, next page token or None)
 
-    def _get_all_session_maps(self) -> List[Any]:
-        """Get all session maps"""
-        collection_ref = get_collection(self.session_map_collection)
-        return list(collection_ref.stream())
-
-    def _get_all_matching_verifications(self) -> List[Dict[str, Any]]:
-        """Get all matching verifications"""
-        try:
-            collection_ref = get_collection(self.matching_verify_collection)
-            docs = list(collection_ref.stream())
-            return [{"id": doc.id, **doc.to_dict()} for doc in docs]
-        except Exception as e:
-            print(f"Error getting matching verifications: {e}")
-            return []
+        Raises:
+            ValueError: page_token is invalid
+        """
+        scope = "grouped:verified" if verified else "grouped:mapped"
+        query = get_collection(self.session_collection)
+        limit = max(1, min(MAX_PAGE_SIZE, limit))
+
+        rows = []
+        token = page_token
+        while True:
+            docs, next_token = paginate(query, scope, limit, token)
+            page = PairIndex.load(self, docs)
+            for position, doc in enumerate(docs):
+                row = self._page_row(page, doc.id, verified)
+                if row:
+                    rows.append(row)
+                if len(rows) >= limit:
+                    if position == len(docs) - 1:
+                        return rows, next_token
+                    return rows, encode_page_token(scope, doc.get(ORDER_FIELD), doc.id)
+            if not next_token:
+                return rows, None
+            token = next_token
+
+    def _page_row(self, page: "PairIndex", session_id: str, verified: bool) -> Optional[Dict[str, Any]]:
+        """Row for one session of a page (None for an entry listed with its exit)"""
+        gate = page.sessions[session_id].get("gate")
+        if gate == "Out":
+            pair = page.pair_for_exit(session_id, verified)
+            if pair:
+                entry_id, verification = pair
+                return self.grouped_row(
+                    page, entry_id, session_id, "completed",
+                    verification is not None, verification.get("isMatch") if verification else None
+                )
+            return self.grouped_row(page, None, session_id, "failed" if verified else "completed")
+        if gate == "In":
+            if page.exited(session_id, verified):
+                return None
+            return self.grouped_row(page, session_id, None, "active")
+        return None
 
-    def _find_verification_for_session(self, session_id: str, verifications: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    def grouped_row(self, snapshot, entry_id: Optional[str], exit_id: Optional[str], status: str,
+                     face_match_verified: bool = False, face_match_result: Optional[bool] = None) -> Dict[str, Any]:
+        """Grouped session row for an entry and/or exit session of a snapshot"""
+        entry_session = snapshot.sessions[entry_id] if entry_id else {}
+        exit_session = snapshot.sessions[exit_id] if exit_id else {}
+        entry_time = snapshot.timestamp(entry_id) if entry_id else None
+        exit_time = snapshot.timestamp(exit_id) if exit_id else None
+
+        plate_number = (entry_session.get("plateNumber") or
+                        entry_session.get("platenumber") or
+                        exit_session.get("plateNumber") or
+                        exit_session.get("platenumber") or "Unknown")
+
+        face_index = (entry_session.get("faceIndex") or
+                      exit_session.get("faceIndex") or "Unknown")
+
+        duration = None
+        if entry_time and exit_time:
+            duration = int((exit_time - entry_time).total_seconds() / 60)
+
+        return {
+            "face_id": face_index,
+            "license_plate": plate_number,
+            "entry_time": entry_time,
+            "exit_time": exit_time,
+            "status": status,
+            "duration": duration,
+
+            # Entry session data
+            "entry_session_id": entry_id,
+            "face_url": entry_session.get("faceUrl"),
+            "plate_url": entry_session.get("plateUrl"),
+
+            # Exit session data
+            "exit_session_id": exit_id,
+            "exit_face_url": exit_session.get("faceUrl"),
+            "exit_plate_url": exit_session.get("plateUrl"),
+
+            # Verification data
+            "face_match_verified": face_match_verified,
+            "face_match_result": face_match_result
+        }
+
+    def _find_verification_for_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Find matching verification for a session"""
-        for verification in verifications:
-            if verification.get("sessionID") == session_id:
-                return verification
-        return None
+        from app.services.stats_engine import get_snapshot
+        return get_snapshot().verification_by_session.get(session_id)
 
-    def _is_valid_session_pair(self, entry_session: Dict[str, Any], exit_session: Dict[str, Any], verification: Optional[Dict[str, Any]]) -> bool:
-        """Check if a session pair is valid"""
-        if not verification:
-            return False
-        if not verification.get("isMatch"):
+    def is_valid_pair(self, snapshot, entry_id: str, exit_id: str, verification: Optional[Dict[str, Any]]) -> bool:
+        """Check if a pair of a snapshot's sessions is valid, reusing its parsed timestamps"""
+        if not verification or not verification.get("isMatch"):
             return False
-        entry_time = self._parse_timestamp(entry_session.get("timestamp"))
-        exit_time = self._parse_timestamp(exit_session.get("timestamp"))
+        entry_time = snapshot.timestamp(entry_id)
+        exit_time = snapshot.timestamp(exit_id)
         if entry_time and exit_time and entry_time >= exit_time:
             return False
-        # Ensure plate and face indices align
+        return self._same_vehicle(snapshot.sessions[entry_id], snapshot.sessions[exit_id])
+
+    def _same_vehicle(self, entry_session: Dict[str, Any], exit_session: Dict[str, Any]) -> bool:
+        """Ensure plate and face indices align"""
         entry_plate = entry_session.get("plateNumber") or entry_session.get("platenumber")
         exit_plate = exit_session.get("plateNumber") or exit_session.get("platenumber")
         if entry_plate and exit_plate and entry_plate != exit_plate:
@@ -330,7 +216,8 @@ class SessionPairingService:
             return False
         return True
 
-    def _parse_timestamp(self, timestamp) -> Optional[datetime]:
+    @staticmethod
+    def _parse_timestamp(timestamp) -> Optional[datetime]:
         """Parse timestamp from various formats"""
         if not timestamp:
             return None
@@ -349,3 +236,100 @@ class SessionPairingService:
         except Exception as e:
             print(f"Error parsing timestamp {timestamp}: {e}")
             return None
+
+    @staticmethod
+    def created_at(timestamp) -> Optional[datetime]:
+        """UTC createdAt for a session timestamp (device Timestamps are UTC, API ISO strings local time)"""
+        if not timestamp:
+            return None
+        try:
+            if not hasattr(timestamp, "astimezone"):
+                timestamp = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+            # A naive value is taken as local time
+            return timestamp.astimezone(timezone.utc)
+        except Exception as e:
+            print(f"Error parsing timestamp {timestamp}: {e}")
+            return None
+
+class PairIndex:
+    """
+    SessionMap / MatchingVerify index for one page of sessions: the maps
+    touching the page's sessions, the sessions on the other side of them and
+    the exits' verifications, each read with 'in' queries on the page's ids.
+    Provides sessions / timestamp() like SessionSnapshot, so is_valid_pair
+    and grouped_row work on it.
+    """
+
+    def __init__(self, pairing: SessionPairingService, sessions: Dict[str, Dict[str, Any]]):
+        self.pairing = pairing
+        self.sessions = sessions
+        self.maps_by_entry: Dict[str, List[str]] = {}
+        self.maps_by_exit: Dict[str, List[str]] = {}
+        self.verification_by_session: Dict[str, Dict[str, Any]] = {}
+        self._timestamps: Dict[str, Optional[datetime]] = {}
+
+    @classmethod
+    def load(cls, pairing: SessionPairingService, docs: List[Any]) -> "PairIndex":
+        index = cls(pairing, {doc.id: doc.to_dict() for doc in docs})
+        in_ids = [doc_id for doc_id, data in index.sessions.items() if data.get("gate") == "In"]
+        out_ids = [doc_id for doc_id, data in index.sessions.items() if data.get("gate") == "Out"]
+
+        maps = get_collection(pairing.session_map_collection)
+        map_docs = {}
+        for doc in stream_in(maps, "entrySessionID", in_ids):
+            map_docs[doc.id] = doc.to_dict()
+        for doc in stream_in(maps, "exitSessionID", out_ids):
+            map_docs[doc.id] = doc.to_dict()
+        for map_data in map_docs.values():
+            entry_id = map_data.get("entrySessionID")
+            exit_id = map_data.get("exitSessionID")
+            if entry_id and exit_id:
+                index.maps_by_entry.setdefault(entry_id, []).append(exit_id)
+                index.maps_by_exit.setdefault(exit_id, []).append(entry_id)
+
+        # Partners on other pages, fetched in one batched read
+        missing = {session_id for session_id in list(index.maps_by_entry) + list(index.maps_by_exit)
+                   if session_id not in index.sessions}
+        if missing:
+            references = [get_document(pairing.session_collection, session_id) for session_id in missing]
+            for doc in get_db().get_all(references):
+                if doc.exists:
+                    index.sessions[doc.id] = doc.to_dict()
+
+        verifications = get_collection(pairing.matching_verify_collection)
+        for doc in stream_in(verifications, "sessionID", list(index.maps_by_exit)):
+            index.verification_by_session.setdefault(doc.get("sessionID"), {"id": doc.id, **doc.to_dict()})
+        return index
+
+    def timestamp(self, session_id: str) -> Optional[datetime]:
+        if session_id not in self._timestamps:
+            self._timestamps[session_id] = SessionPairingService._parse_timestamp(self.sessions[session_id].get("timestamp"))
+        return self._timestamps[session_id]
+
+    def _paired(self, entry_id: str, exit_id: str, verified: bool) -> bool:
+        if entry_id not in self.sessions or exit_id not in self.sessions:
+            return False
+        if verified:
+            return self.pairing.is_valid_pair(self, entry_id, exit_id, self.verification_by_session.get(exit_id))
+        # The entry has to be older than the exit, it is listed on the exit's row
+        entry_time = self.timestamp(entry_id)
+        exit_time = self.timestamp(exit_id)
+        return not (entry_time and exit_time and entry_time >= exit_time)
+
+    def pair_for_exit(self, exit_id: str, verified: bool) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        """(entry id, verification) of the first valid pair of an exit session"""
+        for entry_id in self.maps_by_exit.get(exit_id, ()):
+            if self._paired(entry_id, exit_id, verified):
+                return entry_id, self.verification_by_session.get(exit_id)
+        return None
+
+    def pair_for_entry(self, entry_id: str, verified: bool) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        """(exit id, verification) of the first valid pair of an entry session"""
+        for exit_id in self.maps_by_entry.get(entry_id, ()):
+            if self._paired(entry_id, exit_id, verified):
+                return exit_id, self.verification_by_session.get(exit_id)
+        return None
+
+    def exited(self, entry_id: str, verified: bool) -> bool:
+        """Whether an entry session is listed with one of its exits"""
+        return self.pair_for_entry(entry_id, verified) is not None
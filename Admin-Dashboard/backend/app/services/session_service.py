@@ -1,12 +1,17 @@
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timezone
 import uuid
 from app.db.firestore import get_collection, get_document, get_db
+from app.db.write_batcher import WriteBatcher
+from app.db.read_cache import read_cache
+from app.db.pagination import ORDER_FIELD, paginate
 from app.models.session_model import (
     Session, SessionResponse, SessionCreateRequest, SessionUpdateRequest,
     MatchingVerify, SessionMap, PlateMap, ParkingSlot
 )
 from app.services.session_pairing_service import SessionPairingService
+from app.services.occupancy_service import OccupancyService, COUNTED_FIELD, is_countable_plate
+from app.services.visit_service import VisitService
 
 def _convert_session_data(session_data: dict) -> dict:
     """Convert Firebase session data to format compatible with Pydantic model"""
@@ -27,6 +32,8 @@ def _convert_session_data(session_data: dict) -> dict:
 class SessionService:
     def __init__(self):
         self.collection_name = "Session"
+        self.occupancy = OccupancyService()
+        self.visits = VisitService()
 
     def create_session(self, session_data: SessionCreateRequest) -> str:
         """Create new session and return session ID. (No longer auto-checks out on Out session creation)"""
@@ -41,12 +48,23 @@ class SessionService:
             plateNumber=session_data.plate_number
         )
         session_dict = session.model_dump(by_alias=True)
-        doc_ref = get_document(self.collection_name, session_id)
-        doc_ref.set(session_dict)
-
-        # Plate mapping (fast lookup)
-        plate_map_service = PlateMapService()
-        plate_map_service.create_plate_map(session_data.plate_number, session_id)
+        # Listing order (timestamp is a local ISO string, device sessions have Timestamps)
+        session_dict[ORDER_FIELD] = datetime.now(timezone.utc)
+        if session_data.gate == "In":
+            # Counted below; the change feed must not count it again
+            session_dict[COUNTED_FIELD] = True
+
+        # Session and plate mapping (fast lookup) are committed together
+        with WriteBatcher() as batch:
+            batch.set(get_document(self.collection_name, session_id), session_dict)
+            plate_map_service = PlateMapService()
+            plate_map_service.create_plate_map(session_data.plate_number, session_id, batch=batch)
+            self.visits.record_session(session_id, session_dict, batch)
+            if session_data.gate == "In":
+                # Commits the writes above together with the occupancy counters
+                self.occupancy.record_entry(session_data.plate_number, batch=batch)
+        # Write-through: get_session right after creating it needs no read
+        read_cache.put(self.collection_name, session_id, session_dict)
 
         # NOTE: We removed the auto-checkout here to avoid premature completion before verification.
         # Verification + mapping will be handled explicitly via finalize_exit_session.
@@ -60,12 +78,14 @@ class SessionService:
 
     def get_session(self, session_id: str) -> Optional[SessionResponse]:
         """Get session by ID"""
-        doc_ref = get_document(self.collection_name, session_id)
-        doc = doc_ref.get()
-
-        if doc.exists:
-            session_data = doc.to_dict()
-            session_data = _convert_session_data(session_data)
+        def load():
+            doc = get_document(self.collection_name, session_id).get()
+            return doc.to_dict() if doc.exists else None
+
+        cached = read_cache.get(self.collection_name, session_id, load)
+        if cached:
+            # Converted on a copy, the cached dict stays as stored
+            session_data = _convert_session_data(dict(cached))
             session = Session(**session_data)
             return SessionResponse(session_id=session_id, session=session)
         return None
@@ -85,10 +105,40 @@ class SessionService:
 
         return sessions
 
+    def get_sessions_page(self, gate: Optional[str] = None, limit: int = 100,
+                          page_token: Optional[str] = None) -> Tuple[List[SessionResponse], Optional[str]]:
+        """Newest sessions first, one page at a time (all gates when gate is None)"""
+        query = get_collection(self.collection_name)
+        if gate:
+            query = query.where("gate", "==", gate)
+        docs, next_token = paginate(query, f"sessions:{gate or 'all'}", limit, page_token)
+
+        sessions = []
+        for doc in docs:
+            session_data = _convert_session_data(doc.to_dict())
+            sessions.append(SessionResponse(session_id=doc.id, session=Session(**session_data)))
+        return sessions, next_token
+
     def update_plate_number(self, session_id: str, plate_number: str) -> bool:
         """Update plate number for session"""
         doc_ref = get_document(self.collection_name, session_id)
-        doc_ref.update({"plateNumber": plate_number})
+        doc = doc_ref.get()
+        data = doc.to_dict() if doc.exists else {}
+        old_plate = data.get("plateNumber") or data.get("platenumber")
+
+        with WriteBatcher() as batch:
+            batch.update(doc_ref, {"plateNumber": plate_number})
+            # An entry whose plate becomes (un)readable enters (leaves) the occupancy count
+            if data.get("gate") == "In" and not data.get("isOut"):
+                delta = int(is_countable_plate(plate_number)) - int(is_countable_plate(old_plate))
+                if delta:
+                    self.occupancy.record(occupied_delta=delta, batch=batch)
+
+        # The visit shows the corrected plate
+        try:
+            self.visits.sync([session_id])
+        except Exception as e:
+            print(f"Error updating visit of session {session_id}: {e}")
         return True
 
     def finalize_exit_session(self, exit_session_id: str) -> Dict[str, Any]:
@@ -149,26 +199,33 @@ class SessionService:
                     except Exception:
                         ts_val = datetime.min
                 if ts_val <= exit_time_value:
-                    candidates.append((doc.id, ts_val))
+                    candidates.append((doc.id, ts_val, data))
 
             if not candidates:
                 return {"success": False, "message": "No matching entry session found to finalize"}
 
             # Most recent candidate before exit
             candidates.sort(key=lambda x: x[1], reverse=True)
-            entry_session_id, entry_time_val = candidates[0]
+            entry_session_id, entry_time_val, entry_data = candidates[0]
 
-            # 4. Mark entry isOut & create SessionMap
+            # 4. Mark entry isOut & create SessionMap (one transaction with the occupancy counters)
             entry_ref = get_document(self.collection_name, entry_session_id)
-            entry_ref.update({"isOut": True})
-
-            # Create mapping if not existing
             existing_map = self._find_existing_map(entry_session_id, exit_session_id)
-            if not existing_map:
-                session_map_service = SessionMapService()
-                map_id = session_map_service.create_session_map(entry_session_id, exit_session_id)
-            else:
-                map_id = existing_map
+            with WriteBatcher() as batch:
+                batch.update(entry_ref, {"isOut": True})
+                self.visits.record_exit(entry_session_id, entry_data, exit_session_id, exit_data,
+                                        verify_docs[0].to_dict(), batch)
+
+                # Create mapping if not existing
+                if not existing_map:
+                    session_map_service = SessionMapService()
+                    map_id = session_map_service.create_session_map(entry_session_id, exit_session_id, batch=batch)
+                else:
+                    map_id = existing_map
+
+                # Re-checks isOut in the transaction: a concurrent finalize writes nothing here
+                if not self.occupancy.record_exit(entry_ref, batch=batch, vacate=not existing_map):
+                    return {"success": False, "message": "Entry session was already finalized"}
 
             current_count = self.get_current_vehicles_count()
             return {
@@ -194,15 +251,9 @@ class SessionService:
             return None
 
     def get_current_vehicles_count(self) -> int:
-        """Count current vehicles in parking using face matching verification"""
+        """Current vehicles in parking from the occupancy counters"""
         try:
-            pairing_service = SessionPairingService()
-            result = pairing_service.get_current_vehicles_accurate()
-
-            count = result.get("count", 0)
-            print(f"Current vehicles in parking: {count} (verified exits: {result.get('verified_exits', 0)})")
-
-            return count
+            return self.occupancy.get_counters()["occupied"]
 
         except Exception as e:
             print(f"Error counting current vehicles: {e}")
@@ -211,12 +262,7 @@ class SessionService:
     def get_total_entries_count(self) -> int:
         """Count total entries (all In sessions)"""
         try:
-            collection_ref = get_collection(self.collection_name)
-
-            # Count all In sessions
-            query = collection_ref.where("gate", "==", "In")
-            docs = list(query.stream())
-            return len(docs)
+            return self.occupancy.get_counters()["totalEntries"]
 
         except Exception as e:
             print(f"Error counting total entries: {e}")
@@ -225,27 +271,19 @@ class SessionService:
     def get_available_slots_count(self) -> int:
         """Get available slots count calculated as total - current_vehicles"""
         try:
-            total_slots = self.get_total_slots_count()
-            current_vehicles = self.get_current_vehicles_count()
-            available = max(0, total_slots - current_vehicles)  # Don't go negative
-
-            # Update the available count in Firebase for consistency
-            self._update_available_slots_in_firebase(available)
-
-            return available
+            # Kept in Firebase by the occupancy counters on every change
+            return self.occupancy.get_counters()["available"]
 
         except Exception as e:
             print(f"Error calculating available slots count: {e}")
             return 0
 
     def get_total_slots_count(self) -> int:
-        """Get total slots count from ParkingMeta/slotCounter"""
+        """Get total slots count from ParkingMeta/slotCounter (read cache)"""
         try:
-            doc_ref = get_document("ParkingMeta", "slotCounter")
-            doc = doc_ref.get()
+            data = self.occupancy.read_meta()
 
-            if doc.exists:
-                data = doc.to_dict()
+            if data:
                 return data.get("total", 10)  # Default to 10 if not set
             else:
                 # Create default document if it doesn't exist
@@ -262,33 +300,16 @@ class SessionService:
             if total_slots < 0:
                 raise ValueError("Total slots cannot be negative")
 
-            doc_ref = get_document("ParkingMeta", "slotCounter")
-
-            # Calculate new available count
-            current_vehicles = self.get_current_vehicles_count()
-            available = max(0, total_slots - current_vehicles)
-
             # Update both total and available
-            doc_ref.set({
-                "total": total_slots,
-                "available": available
-            }, merge=True)
+            counters = self.occupancy.set_total(total_slots)
 
-            print(f"Updated total slots to {total_slots}, available: {available}")
+            print(f"Updated total slots to {total_slots}, available: {counters['available']}")
             return True
 
         except Exception as e:
             print(f"Error updating total slots: {e}")
             return False
 
-    def _update_available_slots_in_firebase(self, available: int):
-        """Update available slots count in Firebase"""
-        try:
-            doc_ref = get_document("ParkingMeta", "slotCounter")
-            doc_ref.set({"available": available}, merge=True)
-        except Exception as e:
-            print(f"Error updating available slots in Firebase: {e}")
-
     def _create_default_slot_counter(self):
         """Create default slotCounter document"""
         try:
@@ -297,6 +318,7 @@ class SessionService:
                 "total": 10,
                 "available": 10
             })
+            read_cache.invalidate("ParkingMeta", "slotCounter")
             print("Created default slotCounter document")
         except Exception as e:
             print(f"Error creating default slotCounter: {e}")
@@ -304,16 +326,13 @@ class SessionService:
     def get_dashboard_stats(self) -> Dict[str, Any]:
         """Get comprehensive dashboard statistics"""
         try:
-            current_vehicles = self.get_current_vehicles_count()
-            total_entries = self.get_total_entries_count()
-            available_slots = self.get_available_slots_count()
-            total_slots = self.get_total_slots_count()
+            counters = self.occupancy.get_counters()
 
             return {
-                "current_vehicles": current_vehicles,
-                "total_entries": total_entries,
-                "available_slots": available_slots,
-                "total_slots": total_slots
+                "current_vehicles": counters["occupied"],
+                "total_entries": counters["totalEntries"],
+                "available_slots": counters["available"],
+                "total_slots": counters["total"]
             }
 
         except Exception as e:
@@ -342,9 +361,10 @@ class SessionService:
             if docs:
                 # Update matching sessions
                 updated_sessions = []
-                for doc in docs:
-                    doc.reference.update({"isOut": True})
-                    updated_sessions.append(doc.id)
+                with WriteBatcher() as batch:
+                    for doc in docs:
+                        batch.update(doc.reference, {"isOut": True})
+                        updated_sessions.append(doc.id)
 
                 # Update current vehicle count
                 current_count = self.get_current_vehicles_count()
@@ -432,8 +452,9 @@ class SessionMapService:
     def __init__(self):
         self.collection_name = "SessionMap"
 
-    def create_session_map(self, entry_session_id: str, exit_session_id: str) -> str:
-        """Create mapping between entry and exit session"""
+    def create_session_map(self, entry_session_id: str, exit_session_id: str,
+                           batch: Optional[WriteBatcher] = None) -> str:
+        """Create mapping between entry and exit session (queued on batch if given)"""
         map_id = str(uuid.uuid4())
 
         session_map = SessionMap(
@@ -442,7 +463,10 @@ class SessionMapService:
         )
 
         doc_ref = get_document(self.collection_name, map_id)
-        doc_ref.set(session_map.model_dump(by_alias=True))
+        if batch is not None:
+            batch.set(doc_ref, session_map.model_dump(by_alias=True))
+        else:
+            doc_ref.set(session_map.model_dump(by_alias=True))
 
         return map_id
 
@@ -450,11 +474,14 @@ class PlateMapService:
     def __init__(self):
         self.collection_name = "PlateMap"
 
-    def create_plate_map(self, plate_number: str, session_id: str):
-        """Create mapping from license plate to session ID"""
+    def create_plate_map(self, plate_number: str, session_id: str, batch: Optional[WriteBatcher] = None):
+        """Create mapping from license plate to session ID (queued on batch if given)"""
         # Use plate number as document ID
         doc_ref = get_document(self.collection_name, plate_number)
-        doc_ref.set({"sessionID": session_id})
+        if batch is not None:
+            batch.set(doc_ref, {"sessionID": session_id})
+        else:
+            doc_ref.set({"sessionID": session_id})
 
     def get_session_by_plate(self, plate_number: str) -> Optional[str]:
         """Get session ID by license plate number"""
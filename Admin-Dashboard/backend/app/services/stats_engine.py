@@ -0,0 +1,133 @@
+"""
+Single-pass dashboard statistics.
+
+SessionSnapshot reads Session, SessionMap and MatchingVerify once each
+(memoized for the request, so the pairing service and the stats share it)
+and StatsEngine derives every dashboard figure from it in one pass over the
+sessions, instead of each figure rescanning the collections. The hash
+indexes the pairing logic needs are built on the snapshot, once.
+"""
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Dict, List, Optional
+
+from app.db.firestore import get_collection
+from app.db.request_memo import memoized
+from app.services.occupancy_service import OccupancyService, DEFAULT_TOTAL_SLOTS, is_countable_plate
+from app.services.session_pairing_service import SessionPairingService
+
+class SessionSnapshot:
+    """Session, SessionMap and MatchingVerify documents read at one point in time"""
+
+    def __init__(self, session_docs: List[Any], map_docs: List[Any], verify_docs: List[Any]):
+        self.session_docs = session_docs
+        self.map_docs = map_docs
+        # Decoded once; services read these instead of calling to_dict() again
+        self.sessions: Dict[str, Dict[str, Any]] = {doc.id: doc.to_dict() for doc in session_docs}
+        self.session_maps: List[Dict[str, Any]] = [doc.to_dict() for doc in map_docs]
+        self.verifications: List[Dict[str, Any]] = [{"id": doc.id, **doc.to_dict()} for doc in verify_docs]
+        self._timestamps: Dict[str, Optional[datetime]] = {}
+
+    @classmethod
+    def load(cls) -> "SessionSnapshot":
+        """Stream the three collections"""
+        return cls(
+            list(get_collection("Session").stream()),
+            list(get_collection("SessionMap").stream()),
+            list(get_collection("MatchingVerify").stream())
+        )
+
+    def sessions_by_gate(self, gate: str) -> List[Any]:
+        """Session documents of one gate"""
+        return self.docs_by_gate.get(gate, [])
+
+    @cached_property
+    def docs_by_gate(self) -> Dict[str, List[Any]]:
+        """Session documents per gate"""
+        index: Dict[str, List[Any]] = {}
+        for doc in self.session_docs:
+            index.setdefault(self.sessions[doc.id].get("gate"), []).append(doc)
+        return index
+
+    @cached_property
+    def verification_by_session(self) -> Dict[str, Dict[str, Any]]:
+        """First MatchingVerify per sessionID"""
+        index: Dict[str, Dict[str, Any]] = {}
+        for verification in self.verifications:
+            index.setdefault(verification.get("sessionID"), verification)
+        return index
+
+    def timestamp(self, session_id: str) -> Optional[datetime]:
+        """Parsed timestamp of a session (parsed once, on first use)"""
+        if session_id not in self._timestamps:
+            self._timestamps[session_id] = SessionPairingService._parse_timestamp(self.sessions[session_id].get("timestamp"))
+        return self._timestamps[session_id]
+
+def get_snapshot(fresh: bool = False) -> SessionSnapshot:
+    """Snapshot shared by everything in the current request (fresh=True re-reads it)"""
+    return memoized("session_snapshot", SessionSnapshot.load, fresh=fresh)
+
+class StatsEngine:
+    def __init__(self):
+        self.pairing = SessionPairingService()
+
+    def compute(self, fresh: bool = False) -> Dict[str, Any]:
+        """All dashboard figures from one snapshot (memoized for the request)"""
+        if fresh:
+            return memoized("dashboard_stats", lambda: self.aggregate(get_snapshot(fresh=True)), fresh=True)
+        return memoized("dashboard_stats", lambda: self.aggregate(get_snapshot()))
+
+    def aggregate(self, snapshot: SessionSnapshot, total_slots: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compute the figures in one pass over the sessions.
+        An entry has left when a SessionMap pairs it with an exit whose face
+        match succeeded (same rules as SessionPairingService).
+        """
+        exited_entries = set()
+        for map_data in snapshot.session_maps:
+            entry_id = map_data.get("entrySessionID")
+            exit_id = map_data.get("exitSessionID")
+            if entry_id not in snapshot.sessions or exit_id not in snapshot.sessions:
+                continue
+            verification = snapshot.verification_by_session.get(exit_id)
+            if verification and self.pairing.is_valid_pair(snapshot, entry_id, exit_id, verification):
+                exited_entries.add(entry_id)
+
+        total_entries = 0
+        total_exits = 0
+        vehicles = []
+        for session_id, session_data in snapshot.sessions.items():
+            gate = session_data.get("gate")
+            if gate == "Out":
+                total_exits += 1
+                continue
+            if gate != "In":
+                continue
+            total_entries += 1
+            if session_id in exited_entries:
+                continue
+            plate_number = session_data.get("plateNumber") or session_data.get("platenumber")
+            if not is_countable_plate(plate_number):
+                continue
+            vehicles.append({
+                "session_id": session_id,
+                "face_index": session_data.get("faceIndex"),
+                "plate_number": plate_number,
+                "entry_time": session_data.get("timestamp"),
+                "status": "currently_parked"
+            })
+
+        if total_slots is None:
+            total_slots = self._total_slots()
+        return {
+            "current_vehicles": len(vehicles),
+            "total_entries": total_entries,
+            "total_exits": total_exits,
+            "verified_exits": len(exited_entries),
+            "available_slots": max(0, total_slots - len(vehicles)),
+            "total_slots": total_slots,
+            "vehicles": vehicles
+        }
+
+    def _total_slots(self) -> int:
+        return OccupancyService().read_meta().get("total", DEFAULT_TOTAL_SLOTS)
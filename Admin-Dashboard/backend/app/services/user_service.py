@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime
 from app.db.firestore import firestore_db
+from app.db.read_cache import read_cache
 from app.models.user_model import UserCreate, UserInDB, User
 from app.core.auth import get_password_hash, verify_password
 import uuid
@@ -13,7 +14,7 @@ class UserService:
     async def create_user(self, user_data: UserCreate) -> UserInDB:
         """Create a new user"""
         # Check if username already exists
-        existing_user = await self.get_user_by_username(user_data.username)
+        existing_user = await self.get_user_by_username(user_data.username, fresh=True)
         if existing_user:
             raise ValueError("Username already exists")
         
@@ -39,12 +40,13 @@ class UserService:
         
         # Save to Firestore
         self.collection.document(user_id).set(user_doc)
+        read_cache.invalidate("users")
         
         return UserInDB(**user_doc)
 
-    async def get_user_by_username(self, username: str) -> Optional[UserInDB]:
-        """Get user by username"""
-        try:
+    async def get_user_by_username(self, username: str, fresh: bool = False) -> Optional[UserInDB]:
+        """Get user by username (read cache: called on every authenticated request; fresh skips it)"""
+        def load():
             query = self.collection.where("username", "==", username).limit(1)
             docs = query.stream()
             
@@ -53,6 +55,11 @@ class UserService:
                 return UserInDB(**user_data)
             
             return None
+
+        try:
+            if fresh:
+                return load()
+            return read_cache.get("users", f"username:{username}", load)
         except Exception as e:
             print(f"Error getting user by username: {e}")
             return None
@@ -72,21 +79,28 @@ class UserService:
             print(f"Error getting user by email: {e}")
             return None
 
-    async def get_user_by_id(self, user_id: str) -> Optional[UserInDB]:
-        """Get user by ID"""
-        try:
+    async def get_user_by_id(self, user_id: str, fresh: bool = False) -> Optional[UserInDB]:
+        """Get user by ID (read cache; fresh skips it)"""
+        def load():
             doc = self.collection.document(user_id).get()
             if doc.exists:
                 user_data = doc.to_dict()
                 return UserInDB(**user_data)
             return None
+
+        try:
+            if fresh:
+                return load()
+            return read_cache.get("users", f"id:{user_id}", load)
         except Exception as e:
             print(f"Error getting user by ID: {e}")
             return None
 
     async def authenticate_user(self, username: str, password: str) -> Optional[UserInDB]:
         """Authenticate user with username and password"""
-        user = await self.get_user_by_username(username)
+        # Read past the cache: another worker may have just deactivated the user
+        # or changed the password, and its invalidation does not reach this process
+        user = await self.get_user_by_username(username, fresh=True)
         if not user:
             return None
         
@@ -102,7 +116,7 @@ class UserService:
         """Update user data"""
         try:
             # Get current user
-            current_user = await self.get_user_by_id(user_id)
+            current_user = await self.get_user_by_id(user_id, fresh=True)
             if not current_user:
                 return None
             
@@ -116,9 +130,10 @@ class UserService:
             
             # Update in Firestore
             self.collection.document(user_id).update(update_data)
+            read_cache.invalidate("users")
             
             # Return updated user
-            return await self.get_user_by_id(user_id)
+            return await self.get_user_by_id(user_id, fresh=True)
         except Exception as e:
             print(f"Error updating user: {e}")
             return None
@@ -131,6 +146,7 @@ class UserService:
                 "updated_at": datetime.utcnow()
             }
             self.collection.document(user_id).update(update_data)
+            read_cache.invalidate("users")
             return True
         except Exception as e:
             print(f"Error deleting user: {e}")
@@ -0,0 +1,165 @@
+"""
+Materialized visits.
+
+A Visit document is one row of the enhanced session listing, already
+paired: the entry and/or exit session ids, their image URLs, plate, face
+index, duration and face match result. It is written when a session is
+created through the API and completed in finalize_exit_session, so
+/api/sessions/enhanced is a single query ordered by lastActivity.
+
+Document ids follow the rows: the entry session id, or the exit session id
+for an exit without a verified entry. Sessions written directly by the gate
+devices are materialized from the Session change feed (LiveStatsHub) and,
+for those written while nothing was listening, by sync_recent(); backfill()
+rebuilds every visit from the raw collections.
+
+Materializing a session also stamps createdAt (the listing order, see
+app.db.pagination) on sessions that lack it, i.e. those of the gate devices.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db.firestore import get_collection, get_db, get_document
+from app.db.pagination import ORDER_FIELD, paginate
+from app.db.write_batcher import WriteBatcher
+from app.services.session_pairing_service import SessionPairingService, PairIndex
+
+VISIT_COLLECTION = "Visit"
+
+class VisitService:
+    # When sync_recent last ran, shared by all instances
+    _last_sync: Optional[datetime] = None
+
+    def __init__(self):
+        self.pairing = SessionPairingService()
+
+    # ---------------- Writes from the session service ----------------
+
+    def record_session(self, session_id: str, session_data: Dict[str, Any], batch: WriteBatcher):
+        """Queue the visit of a new session: active for an entry, failed (not verified yet) for an exit"""
+        index = PairIndex(self.pairing, {session_id: session_data})
+        if session_data.get("gate") == "In":
+            self._write(self.pairing.grouped_row(index, session_id, None, "active"), batch)
+        elif session_data.get("gate") == "Out":
+            self._write(self.pairing.grouped_row(index, None, session_id, "failed"), batch)
+
+    def record_exit(self, entry_id: str, entry_data: Dict[str, Any], exit_id: str, exit_data: Dict[str, Any],
+                    verification: Dict[str, Any], batch: WriteBatcher):
+        """Queue the completion of an entry's visit by a verified exit"""
+        index = PairIndex(self.pairing, {entry_id: entry_data, exit_id: exit_data})
+        row = self.pairing.grouped_row(index, entry_id, exit_id, "completed", True, verification.get("isMatch"))
+        self._write(row, batch)
+
+    def sync(self, session_ids: List[str], batch: Optional[WriteBatcher] = None) -> int:
+        """Rebuild the visits of some sessions from the raw collections"""
+        references = [get_document(self.pairing.session_collection, session_id) for session_id in session_ids]
+        docs = [doc for doc in get_db().get_all(references) if doc.exists]
+        if batch is not None:
+            return self._materialize(docs, batch)
+        with WriteBatcher() as batch:
+            return self._materialize(docs, batch)
+
+    def sync_recent(self, overlap: int = 60) -> int:
+        """Materialize sessions created since the previous run (e.g. by the gate devices)"""
+        started = datetime.now(timezone.utc)
+        since = (VisitService._last_sync or started - timedelta(days=1)) - timedelta(seconds=overlap)
+        sessions = get_collection(self.pairing.session_collection)
+        # Devices write Timestamps and the API local-time ISO strings, which Firestore compares separately
+        docs = {}
+        for value in (since, since.astimezone().replace(tzinfo=None).isoformat()):
+            for doc in sessions.where("timestamp", ">=", value).stream():
+                docs[doc.id] = doc
+        with WriteBatcher() as batch:
+            synced = self._materialize(list(docs.values()), batch)
+        VisitService._last_sync = started
+        return synced
+
+    def backfill(self, page_size: int = 300) -> Dict[str, Any]:
+        """Rebuild every visit from the Session, SessionMap and MatchingVerify history"""
+        sessions = get_collection(self.pairing.session_collection)
+        pages = 0
+        synced = 0
+        token = None
+        while True:
+            # By document id: sessions without createdAt yet are stamped here
+            docs, token = paginate(sessions, "visits:backfill", page_size, token, order_field=None)
+            with WriteBatcher() as batch:
+                synced += self._materialize(docs, batch)
+            pages += 1
+            print(f"Visit backfill: {synced} sessions in {pages} pages")
+            if not token:
+                break
+
+        return {"sessions": synced, "pages": pages}
+
+    def _materialize(self, docs: List[Any], batch: WriteBatcher) -> int:
+        """Queue the visit row of each session, paired through one index for all of them"""
+        index = PairIndex.load(self.pairing, docs)
+        for doc in docs:
+            row = self._row(index, doc.id)
+            if row:
+                self._write(row, batch)
+            if not doc.get(ORDER_FIELD):
+                created_at = self.pairing.created_at(doc.get("timestamp"))
+                if created_at:
+                    batch.update(doc.reference, {ORDER_FIELD: created_at})
+        return len(docs)
+
+    def _row(self, index: PairIndex, session_id: str) -> Optional[Dict[str, Any]]:
+        gate = index.sessions[session_id].get("gate")
+        if gate == "In":
+            pair = index.pair_for_entry(session_id, verified=True)
+            if pair:
+                exit_id, verification = pair
+                return self.pairing.grouped_row(index, session_id, exit_id, "completed", True, verification.get("isMatch"))
+            return self.pairing.grouped_row(index, session_id, None, "active")
+        if gate == "Out":
+            pair = index.pair_for_exit(session_id, verified=True)
+            if pair:
+                entry_id, verification = pair
+                return self.pairing.grouped_row(index, entry_id, session_id, "completed", True, verification.get("isMatch"))
+            return self.pairing.grouped_row(index, None, session_id, "failed")
+        return None
+
+    def _write(self, row: Dict[str, Any], batch: WriteBatcher):
+        visit = _visit_document(row)
+        batch.set(get_document(VISIT_COLLECTION, row["entry_session_id"] or row["exit_session_id"]), visit)
+        if row["entry_session_id"] and row["exit_session_id"]:
+            # The exit was listed on its own until it was paired
+            batch.delete(get_document(VISIT_COLLECTION, row["exit_session_id"]))
+
+    # ---------------- Reads ----------------
+
+    def get_page(self, limit: int = 100, page_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Visits by most recent activity, one page at a time (ValueError for an invalid token)"""
+        docs, next_token = paginate(get_collection(VISIT_COLLECTION), "visits", limit, page_token,
+                                    order_field="lastActivity")
+        return [doc.to_dict() for doc in docs], next_token
+
+def _visit_document(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Visit fields, named as the dashboard reads them"""
+    return {
+        "faceId": row["face_id"],
+        "licensePlate": row["license_plate"],
+        "entryTime": row["entry_time"],
+        "exitTime": row["exit_time"],
+        "status": row["status"],
+        "duration": row["duration"],
+
+        # Entry data
+        "entrySessionId": row["entry_session_id"],
+        "faceUrl": row["face_url"],
+        "plateUrl": row["plate_url"],
+
+        # Exit data
+        "exitSessionId": row["exit_session_id"],
+        "exitFaceUrl": row["exit_face_url"],
+        "exitPlateUrl": row["exit_plate_url"],
+
+        # Verification data
+        "faceMatchVerified": row["face_match_verified"],
+        "faceMatchResult": row["face_match_result"],
+
+        # Listing order
+        "lastActivity": row["exit_time"] or row["entry_time"]
+    }
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Script to build the Visit collection from the existing Session, SessionMap
+and MatchingVerify documents. Safe to run again: every visit is rewritten
+from the raw collections.
+"""
+import argparse
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.visit_service import VisitService
+
+def backfill_visits(page_size: int):
+    """Materialize the visits of every session"""
+    try:
+        result = VisitService().backfill(page_size)
+        print(f"Visits rebuilt from {result['sessions']} sessions ({result['pages']} pages)")
+    except Exception as e:
+        print(f"Error backfilling visits: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the Visit collection")
+    parser.add_argument("--page-size", type=int, default=300, help="Sessions per page")
+    backfill_visits(parser.parse_args().page_size)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard statistics over a large session history
+
+Runs against the in-memory Firestore stand-in filled with synthetic
+sessions and reports wall time, document reads and round trips for:
+- per-figure scans: the previous get_dashboard_stats call pattern (current
+  vehicles twice, total entries, total slots twice, plus a write); the
+  verification lookup uses a dict here, the old list search would not
+  finish at this size
+- StatsEngine.compute: one snapshot, one pass
+- nested callers in one request (stats, pairing count, debug snapshot)
+  sharing the request memo
+- the ParkingMeta counters read by get_dashboard_stats
+
+Usage (from Admin-Dashboard/backend):
+    python -m benchmarks.bench_dashboard_stats --sessions 100000
+"""
+import argparse
+import time
+from typing import Callable
+
+from benchmarks.fake_firestore import FakeFirestore, install
+
+db = install(FakeFirestore())
+
+from benchmarks.legacy_pairing import is_valid_session_pair  # noqa: E402
+from benchmarks.parking_data import generate  # noqa: E402
+from app.db.request_memo import request_memo  # noqa: E402
+from app.services.occupancy_service import is_countable_plate  # noqa: E402
+from app.services.session_pairing_service import SessionPairingService  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+from app.services.stats_engine import StatsEngine, get_snapshot  # noqa: E402
+
+def legacy_dashboard_stats() -> dict:
+    """The previous get_dashboard_stats: every figure rescans what it needs"""
+    pairing = SessionPairingService()
+
+    def current_vehicles() -> int:
+        maps = [doc.to_dict() for doc in db.collection("SessionMap").stream()]
+        verifications = {}
+        for doc in db.collection("MatchingVerify").stream():
+            verifications.setdefault(doc.get("sessionID"), doc.to_dict())
+        sessions = {doc.id: doc.to_dict() for doc in db.collection("Session").stream()}
+        exited = set()
+        for map_data in maps:
+            entry = sessions.get(map_data.get("entrySessionID"))
+            exit_ = sessions.get(map_data.get("exitSessionID"))
+            verification = verifications.get(map_data.get("exitSessionID"))
+            if entry and exit_ and verification and verification.get("isMatch") and \
+                    is_valid_session_pair(pairing, entry, exit_, verification):
+                exited.add(map_data["entrySessionID"])
+        in_docs = db.collection("Session").where("gate", "==", "In").stream()
+        return sum(1 for doc in in_docs if doc.id not in exited and
+                   is_countable_plate(doc.get("plateNumber") or doc.get("platenumber")))
+
+    def total_slots() -> int:
+        return db.collection("ParkingMeta").document("slotCounter").get().to_dict().get("total", 10)
+
+    current = current_vehicles()
+    total_entries = len(list(db.collection("Session").where("gate", "==", "In").stream()))
+    available = max(0, total_slots() - current_vehicles())
+    db.collection("ParkingMeta").document("slotCounter").set({"available": available}, merge=True)
+    return {"current_vehicles": current, "total_entries": total_entries,
+            "available_slots": available, "total_slots": total_slots()}
+
+def engine_stats() -> dict:
+    with request_memo():
+        return StatsEngine().compute()
+
+def nested_callers() -> dict:
+    """What one request touching several services costs"""
+    with request_memo():
+        stats = StatsEngine().compute()
+        SessionPairingService().get_current_vehicles_accurate()
+        len(get_snapshot().sessions_by_gate("Out"))
+        return stats
+
+def counter_stats() -> dict:
+    return SessionService().get_dashboard_stats()
+
+def measure(label: str, func: Callable, repeat: int) -> dict:
+    result = func()  # warm-up
+    db.reset_counters()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<30} {elapsed_ms:>9.1f} ms  reads={db.reads // repeat:>8}  "
+          f"round_trips={db.round_trips // repeat:>3}  writes={db.writes // repeat}")
+    return result
+
+def main(args):
+    counts = generate(db, args.sessions, seed=args.seed)
+    print("Documents: " + ", ".join(f"{name}={count}" for name, count in counts.items()))
+    print("-" * 86)
+
+    legacy = measure("per-figure scans (previous)", legacy_dashboard_stats, args.repeat)
+    engine = measure("StatsEngine.compute", engine_stats, args.repeat)
+    measure("nested callers, one request", nested_callers, args.repeat)
+    measure("ParkingMeta counters", counter_stats, args.repeat)
+
+    for key in ("current_vehicles", "total_entries", "available_slots", "total_slots"):
+        assert legacy[key] == engine[key], f"{key}: {legacy[key]} != {engine[key]}"
+    print("-" * 86)
+    print(f"figures agree: current_vehicles={engine['current_vehicles']} total_entries={engine['total_entries']} "
+          f"available_slots={engine['available_slots']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard statistics benchmark")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: session listing cost as the history grows
+
+For each size the in-memory Firestore stand-in is filled with synthetic
+sessions and the following are measured (time, document reads):
+- full: the previous listing, which grouped the whole history
+- first page / page 10: get_grouped_page with --page-size rows, following
+  the page tokens
+
+Usage (from Admin-Dashboard/backend):
+    python -m benchmarks.bench_session_pages --sizes 1000,10000,100000
+"""
+import argparse
+import gc
+import time
+from datetime import datetime
+from typing import Callable, Tuple
+
+from benchmarks.fake_firestore import FakeFirestore, install
+
+db = install(FakeFirestore())
+
+from benchmarks.parking_data import generate  # noqa: E402
+from app.db.request_memo import request_memo  # noqa: E402
+from app.services.session_pairing_service import SessionPairingService  # noqa: E402
+from app.services.stats_engine import get_snapshot  # noqa: E402
+
+def measured(func: Callable) -> Tuple[float, int]:
+    db.reset_counters()
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000, db.reads
+
+def full_listing():
+    """The previous get_enhanced_grouped_sessions: pair every session of the snapshot, then sort"""
+    with request_memo():
+        pairing = SessionPairingService()
+        snapshot = get_snapshot()
+        rows = []
+        used = set()
+        for pair in pairing.get_verified_session_pairs():
+            if pair["is_valid_pair"] and pair["face_match_result"]:
+                rows.append(pairing.grouped_row(snapshot, pair["entry_session_id"], pair["exit_session_id"],
+                                                "completed", True, True))
+                used.update((pair["entry_session_id"], pair["exit_session_id"]))
+        for gate, status in (("In", "active"), ("Out", "failed")):
+            for doc in snapshot.sessions_by_gate(gate):
+                if doc.id not in used:
+                    rows.append(pairing.grouped_row(snapshot, doc.id if gate == "In" else None,
+                                                    doc.id if gate == "Out" else None, status))
+        rows.sort(key=lambda row: max(row["entry_time"] or datetime.min, row["exit_time"] or datetime.min),
+                  reverse=True)
+        return rows
+
+def main(args):
+    pairing = SessionPairingService()
+    print(f"{'sessions':>9} {'full ms':>9} {'full reads':>11} {'page ms':>9} {'page reads':>11} "
+          f"{'page 10 ms':>11} {'page 10 reads':>14}")
+    print("-" * 80)
+    for size in (int(value) for value in args.sizes.split(",")):
+        db.clear()
+        gc.collect()
+        generate(db, size, seed=args.seed)
+
+        # Build the fake's indexes outside the timings, a real Firestore keeps them up to date
+        pairing.get_grouped_page(args.page_size)
+
+        full_ms, full_reads = measured(full_listing)
+        page_ms, page_reads = measured(lambda: pairing.get_grouped_page(args.page_size))
+
+        token = None
+        for _ in range(9):
+            _, token = pairing.get_grouped_page(args.page_size, token)
+        deep_ms, deep_reads = measured(lambda: pairing.get_grouped_page(args.page_size, token))
+
+        print(f"{size:>9} {full_ms:>9.1f} {full_reads:>11} {page_ms:>9.1f} {page_reads:>11} "
+              f"{deep_ms:>11.1f} {deep_reads:>14}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paginated session listing benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: session pairing cost as the history grows
+
+For each size the in-memory Firestore stand-in is filled with synthetic
+sessions and the following are timed:
+- linear lookup: the previous get_verified_session_pairs, which searched
+  the MatchingVerify list for every SessionMap (only run up to
+  --linear-max sessions, it is quadratic)
+- indexed: get_verified_session_pairs over the snapshot's hash indexes,
+  with and without reading the snapshot
+
+Usage (from Admin-Dashboard/backend):
+    python -m benchmarks.bench_session_pairing --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import gc
+import time
+from typing import Callable
+
+from benchmarks.fake_firestore import FakeFirestore, install
+
+db = install(FakeFirestore())
+
+from benchmarks.legacy_pairing import is_valid_session_pair  # noqa: E402
+from benchmarks.parking_data import generate  # noqa: E402
+from app.db.request_memo import request_memo  # noqa: E402
+from app.services.session_pairing_service import SessionPairingService  # noqa: E402
+from app.services.stats_engine import get_snapshot  # noqa: E402
+
+def linear_verified_pairs() -> int:
+    """The previous get_verified_session_pairs: list search per session map"""
+    pairing = SessionPairingService()
+    session_maps = list(db.collection("SessionMap").stream())
+    verifications = [{"id": doc.id, **doc.to_dict()} for doc in db.collection("MatchingVerify").stream()]
+    sessions = {doc.id: doc.to_dict() for doc in db.collection("Session").stream()}
+    pairs = 0
+    for session_map in session_maps:
+        map_data = session_map.to_dict()
+        entry = sessions.get(map_data.get("entrySessionID"))
+        exit_ = sessions.get(map_data.get("exitSessionID"))
+        if not entry or not exit_:
+            continue
+        verification = None
+        for candidate in verifications:
+            if candidate.get("sessionID") == map_data.get("exitSessionID"):
+                verification = candidate
+                break
+        is_valid_session_pair(pairing, entry, exit_, verification)
+        pairs += 1
+    return pairs
+
+def indexed_verified_pairs() -> int:
+    with request_memo():
+        return len(SessionPairingService().get_verified_session_pairs())
+
+def timed(func: Callable) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+def main(args):
+    print(f"{'sessions':>9} {'maps':>8} {'linear ms':>11} {'indexed ms':>11} {'pairing only':>13}")
+    print("-" * 57)
+    for size in (int(value) for value in args.sizes.split(",")):
+        db.clear()
+        gc.collect()
+        counts = generate(db, size, seed=args.seed)
+
+        linear = f"{timed(linear_verified_pairs):>11.1f}" if size <= args.linear_max else f"{'skipped':>11}"
+        indexed = timed(indexed_verified_pairs)
+        with request_memo():
+            snapshot = get_snapshot()
+            pairing_only = timed(lambda: SessionPairingService().get_verified_session_pairs())
+            del snapshot
+
+        print(f"{size:>9} {counts['SessionMap']:>8} {linear} {indexed:>11.1f} {pairing_only:>13.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session pairing scaling benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--linear-max", type=int, default=20000, help="Largest size to run the quadratic lookup on")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Firestore writes caused by dashboards reading the stats
+
+Simulates --dashboards dashboards polling the stats every --poll seconds
+for --seconds, while the gates record entries and exits and a gate device
+patches ParkingMeta/slotCounter.available on its own now and then. Counts
+the writes to the slotCounter document:
+- previous: every stats read wrote available back (the former
+  _update_available_slots_in_firebase)
+- current: SessionService.get_dashboard_stats, which derives available on
+  read and leaves the stored field to the devices
+- current (write_available_slots): the same, with corrections written
+  through the debounced AvailableSlotsWriter
+
+Usage (from Admin-Dashboard/backend):
+    python -m benchmarks.bench_stats_writes --dashboards 20 --seconds 10
+"""
+import argparse
+import random
+import threading
+import time
+from typing import Callable, Dict
+
+from benchmarks.fake_firestore import FakeFirestore, install
+
+db = install(FakeFirestore())
+
+from benchmarks.parking_data import generate  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.read_cache import read_cache  # noqa: E402
+from app.services.occupancy_service import (  # noqa: E402
+    OccupancyService, META_COLLECTION, META_DOCUMENT, DEFAULT_TOTAL_SLOTS, available_slots_writer
+)
+from app.services.session_service import SessionService  # noqa: E402
+
+def previous_dashboard_stats() -> Dict[str, int]:
+    """Stats read as before: derive available, then write it back on every call"""
+    meta_ref = db.collection(META_COLLECTION).document(META_DOCUMENT)
+    data = meta_ref.get().to_dict() or {}
+    available = max(0, data.get("total", DEFAULT_TOTAL_SLOTS) - data.get("occupied", 0))
+    meta_ref.set({"available": available}, merge=True)
+    return {"current_vehicles": data.get("occupied", 0), "available_slots": available}
+
+def simulate(stats: Callable[[], Dict], args) -> Dict[str, int]:
+    stop = threading.Event()
+    counts = {"stats_reads": 0, "gate_events": 0, "device_patches": 0}
+    lock = threading.Lock()
+
+    def dashboard():
+        while not stop.wait(args.poll):
+            stats()
+            with lock:
+                counts["stats_reads"] += 1
+
+    def gate():
+        occupancy = OccupancyService()
+        rng = random.Random(args.seed)
+        while not stop.wait(args.gate_interval):
+            if rng.random() < 0.5:
+                occupancy.record_entry("51A-00000")
+            else:
+                occupancy.record(occupied_delta=-1)
+            with lock:
+                counts["gate_events"] += 1
+
+    def device():
+        # The gate device decrements available itself, out of step with the counters
+        meta_ref = db.collection(META_COLLECTION).document(META_DOCUMENT)
+        while not stop.wait(args.device_interval):
+            available = (meta_ref.get().to_dict() or {}).get("available", 0)
+            meta_ref.update({"available": max(0, available - 1)})
+            with lock:
+                counts["device_patches"] += 1
+
+    threads = [threading.Thread(target=dashboard) for _ in range(args.dashboards)]
+    threads += [threading.Thread(target=gate), threading.Thread(target=device)]
+    db.reset_counters()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    available_slots_writer.stop()
+
+    counts["slot_counter_writes"] = db.writes
+    counts["stats_writes"] = db.writes - counts["gate_events"] - counts["device_patches"]
+    return counts
+
+def main(args):
+    generate(db, args.sessions, seed=args.seed)
+    OccupancyService().reconcile()
+    available_slots_writer.delay = args.write_delay
+
+    print(f"{args.dashboards} dashboards polling every {args.poll}s for {args.seconds}s, "
+          f"gate event every {args.gate_interval}s, device patch every {args.device_interval}s")
+    print(f"{'':>10} {'stats reads':>12} {'gate events':>12} {'device patches':>15} "
+          f"{'writes from stats':>18} {'slotCounter writes':>19}")
+    print("-" * 92)
+    runs = (
+        ("previous", previous_dashboard_stats, False),
+        ("current", SessionService().get_dashboard_stats, False),
+        ("writer", SessionService().get_dashboard_stats, True)
+    )
+    for name, stats, write_available in runs:
+        settings.write_available_slots = write_available
+        read_cache.clear()
+        result = simulate(stats, args)
+        print(f"{name:>10} {result['stats_reads']:>12} {result['gate_events']:>12} {result['device_patches']:>15} "
+              f"{result['stats_writes']:>18} {result['slot_counter_writes']:>19}")
+    print(f"available slots writer: {available_slots_writer.get_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stats endpoint write volume benchmark")
+    parser.add_argument("--dashboards", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--poll", type=float, default=0.5, help="Seconds between stats reads per dashboard")
+    parser.add_argument("--gate-interval", type=float, default=1.0, help="Seconds between gate entries/exits")
+    parser.add_argument("--device-interval", type=float, default=3.0, help="Seconds between device patches")
+    parser.add_argument("--write-delay", type=float, default=2.0, help="AvailableSlotsWriter delay")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
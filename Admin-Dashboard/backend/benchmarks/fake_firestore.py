@@ -0,0 +1,381 @@
+"""
+In-memory Firestore stand-in for benchmarks.
+
+Implements the subset of the google-cloud-firestore client the services use
+(collection/document references, where/order_by/start_after/limit queries,
+stream, get, get_all, set, update, delete, WriteBatch, transactions,
+on_snapshot listeners) over plain dicts, and counts document reads, document writes and round trips so the
+benchmarks can report what a change saves against the real backend.
+Listener callbacks run synchronously in the writing thread.
+
+install() registers it as app.db.firestore, so it must run before any
+app module is imported.
+"""
+import bisect
+import copy
+import functools
+import operator
+import sys
+import types
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.cloud import firestore
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, options: value in options,
+    "array_contains": lambda value, item: isinstance(value, list) and item in value
+}
+
+# Firestore orders values of different types by type first
+_TYPE_ORDER = {type(None): 0, bool: 1, int: 2, float: 2, datetime: 3, str: 4}
+
+def _compare_values(a: Any, b: Any) -> int:
+    rank_a = _TYPE_ORDER.get(type(a), 5)
+    rank_b = _TYPE_ORDER.get(type(b), 5)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    return (a > b) - (a < b)
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.copy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+class _ChangeType:
+    def __init__(self, name: str):
+        self.name = name
+
+class FakeChange:
+    def __init__(self, kind: str, document: FakeSnapshot):
+        self.type = _ChangeType(kind)
+        self.document = document
+
+class FakeWatch:
+    def __init__(self, watchers: List, callback):
+        self._watchers = watchers
+        self._callback = callback
+
+    def unsubscribe(self):
+        if self._callback in self._watchers:
+            self._watchers.remove(self._callback)
+
+class FakeDocument:
+    def __init__(self, db: "FakeFirestore", collection: str, doc_id: str):
+        self._db = db
+        self.collection = collection
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def get(self, transaction=None) -> FakeSnapshot:
+        self._db.round_trips += 1
+        self._db.reads += 1
+        return FakeSnapshot(self, self._db._docs(self.collection).get(self.id))
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._db.round_trips += 1
+        self._db._write(self, "set", data, merge)
+
+    def update(self, data: Dict[str, Any]):
+        self._db.round_trips += 1
+        self._db._write(self, "update", data, False)
+
+    def delete(self):
+        self._db.round_trips += 1
+        self._db._write(self, "delete", None, False)
+
+    def on_snapshot(self, callback) -> FakeWatch:
+        """Listen to this document; called now and after every change"""
+        watchers = self._db._document_watchers.setdefault(self.path, [])
+        watchers.append(callback)
+        data = self._db._docs(self.collection).get(self.id)
+        self._db.reads += 1
+        snapshot = FakeSnapshot(self, data)
+        callback([snapshot], [FakeChange("ADDED", snapshot)] if data is not None else [], None)
+        return FakeWatch(watchers, callback)
+
+class FakeQuery:
+    def __init__(self, db: "FakeFirestore", collection: str, filters: Tuple = (), limit: Optional[int] = None,
+                 orders: Tuple = (), cursor: Optional[Dict[str, Any]] = None):
+        self._db = db
+        self.collection = collection
+        self._filters = filters
+        self._limit = limit
+        self._orders = orders
+        self._cursor = cursor
+
+    def _copy(self, **changes) -> "FakeQuery":
+        state = {"filters": self._filters, "limit": self._limit, "orders": self._orders, "cursor": self._cursor}
+        state.update(changes)
+        return FakeQuery(self._db, self.collection, **state)
+
+    def document(self, doc_id: str) -> FakeDocument:
+        return FakeDocument(self._db, self.collection, doc_id)
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count)
+
+    def order_by(self, field: str, direction: str = firestore.Query.ASCENDING) -> "FakeQuery":
+        return self._copy(orders=self._orders + ((field, direction == firestore.Query.DESCENDING),))
+
+    def start_after(self, values: Dict[str, Any]) -> "FakeQuery":
+        return self._copy(cursor=values)
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        for field, op, value in self._filters:
+            if field not in data:
+                return False
+            try:
+                if not _OPERATORS[op](data[field], value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def stream(self):
+        self._db.round_trips += 1
+        docs = self._db._docs(self.collection)
+        if self._orders:
+            doc_ids = self._db._ordered(self.collection, self._orders)
+            start = 0
+            if self._cursor is not None:
+                key = self._db._order_key(self._orders)
+                start = bisect.bisect_right(doc_ids, key(self._cursor_id(), self._cursor), key=lambda doc_id: key(doc_id, docs[doc_id]))
+            candidates = ((doc_id, docs[doc_id]) for doc_id in doc_ids[start:])
+        elif self._filters and self._filters[0][1] in ("==", "in"):
+            # Equality filters are served from a field index, as Firestore does
+            field, op, value = self._filters[0]
+            by_value = self._db._field_index(self.collection, field)
+            doc_ids = [doc_id for option in (value if op == "in" else [value])
+                       for doc_id in by_value.get(option, ())]
+            candidates = [(doc_id, docs[doc_id]) for doc_id in doc_ids]
+        else:
+            candidates = list(docs.items())
+        results = []
+        for doc_id, data in candidates:
+            if self._matches(data):
+                results.append(FakeSnapshot(FakeDocument(self._db, self.collection, doc_id), data))
+                if self._limit is not None and len(results) >= self._limit:
+                    break
+        # Firestore bills a query that returns nothing as one read
+        self._db.reads += max(1, len(results))
+        return iter(results)
+
+    def _cursor_id(self) -> str:
+        return self._cursor.get("__name__", "")
+
+    def get(self) -> List[FakeSnapshot]:
+        return list(self.stream())
+
+    def on_snapshot(self, callback) -> FakeWatch:
+        """Listen to the whole collection (filters are not applied)"""
+        watchers = self._db._collection_watchers.setdefault(self.collection, [])
+        watchers.append(callback)
+        docs = [FakeSnapshot(FakeDocument(self._db, self.collection, doc_id), data)
+                for doc_id, data in self._db._docs(self.collection).items()]
+        self._db.reads += max(1, len(docs))
+        callback(docs, [FakeChange("ADDED", doc) for doc in docs], None)
+        return FakeWatch(watchers, callback)
+
+class FakeWriteBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference: FakeDocument, data: Dict[str, Any], merge: bool = False):
+        self._writes.append((reference, "set", data, merge))
+
+    def update(self, reference: FakeDocument, data: Dict[str, Any]):
+        self._writes.append((reference, "update", data, False))
+
+    def delete(self, reference: FakeDocument):
+        self._writes.append((reference, "delete", None, False))
+
+    def commit(self):
+        self._db.round_trips += 1
+        writes, self._writes = self._writes, []
+        with self._db._deliver_after():
+            for reference, kind, data, merge in writes:
+                self._db._write(reference, kind, data, merge)
+
+    def _clean_up(self):
+        self._writes = []
+
+class FakeTransaction(FakeWriteBatch):
+    """Writes are applied on commit; reads go straight to the store"""
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._collection_watchers: Dict[str, List] = {}
+        self._document_watchers: Dict[str, List] = {}
+        self._pending_changes: Optional[List[Tuple[FakeDocument, str, Optional[Dict[str, Any]]]]] = None
+        # The fake's indexes: sorted document ids per (collection, order_by fields)
+        # and document ids per value per (collection, field)
+        self._indexes: Dict[Tuple[str, Any], Any] = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.reads = 0
+        self.writes = 0
+        self.round_trips = 0
+
+    def _docs(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        return self.collections.setdefault(collection, {})
+
+    def _ordered(self, collection: str, orders: Tuple) -> List[str]:
+        """Document ids sorted by orders (built on first use after a write)"""
+        if (collection, orders) not in self._indexes:
+            docs = self._docs(collection)
+            key = self._order_key(orders)
+            # As in Firestore, documents without an order_by field are left out
+            fields = [field for field, _ in orders if field != "__name__"]
+            doc_ids = [doc_id for doc_id, data in docs.items() if all(field in data for field in fields)]
+            self._indexes[(collection, orders)] = sorted(doc_ids, key=lambda doc_id: key(doc_id, docs[doc_id]))
+        return self._indexes[(collection, orders)]
+
+    def _field_index(self, collection: str, field: str) -> Dict[Any, List[str]]:
+        """Document ids per value of a field (built on first use after a write)"""
+        if (collection, field) not in self._indexes:
+            index: Dict[Any, List[str]] = {}
+            for doc_id, data in self._docs(collection).items():
+                try:
+                    index.setdefault(data.get(field), []).append(doc_id)
+                except TypeError:
+                    # Unhashable values are never matched by == / in here
+                    pass
+            self._indexes[(collection, field)] = index
+        return self._indexes[(collection, field)]
+
+    @staticmethod
+    def _order_key(orders: Tuple):
+        """Sort key over (doc id, data) for order_by fields ("__name__" is the document id)"""
+        def compare(a: Tuple[str, Dict[str, Any]], b: Tuple[str, Dict[str, Any]]) -> int:
+            for field, descending in orders:
+                value_a = a[0] if field == "__name__" else a[1].get(field)
+                value_b = b[0] if field == "__name__" else b[1].get(field)
+                result = _compare_values(value_a, value_b)
+                if result:
+                    return -result if descending else result
+            return 0
+        sort_key = functools.cmp_to_key(compare)
+        return lambda doc_id, data: sort_key((doc_id, data))
+
+    def _write(self, reference: FakeDocument, kind: str, data: Optional[Dict[str, Any]], merge: bool):
+        self.writes += 1
+        self._invalidate(reference.collection)
+        docs = self._docs(reference.collection)
+        existed = reference.id in docs
+        if kind == "delete":
+            docs.pop(reference.id, None)
+            if existed:
+                self._changed(reference, "REMOVED", None)
+            return
+        if kind == "update" and not existed:
+            raise KeyError(f"No document to update: {reference.path}")
+        current = dict(docs.get(reference.id) or {}) if (merge or kind == "update") else {}
+        for field, value in data.items():
+            if isinstance(value, firestore.Increment):
+                value = current.get(field, 0) + value.value
+            current[field] = value
+        docs[reference.id] = current
+        self._changed(reference, "MODIFIED" if existed else "ADDED", current)
+
+    def _invalidate(self, collection: str):
+        for index in [index for index in self._indexes if index[0] == collection]:
+            del self._indexes[index]
+
+    def _changed(self, reference: FakeDocument, kind: str, data: Optional[Dict[str, Any]]):
+        if self._pending_changes is not None:
+            self._pending_changes.append((reference, kind, data))
+        else:
+            self._deliver([(reference, kind, data)])
+
+    @contextmanager
+    def _deliver_after(self):
+        """Hold listener callbacks until a batch has been applied, then deliver them together"""
+        self._pending_changes = []
+        try:
+            yield
+        finally:
+            changes, self._pending_changes = self._pending_changes, None
+            self._deliver(changes)
+
+    def _deliver(self, changes: List[Tuple[FakeDocument, str, Optional[Dict[str, Any]]]]):
+        by_collection: Dict[str, List[FakeChange]] = {}
+        for reference, kind, data in changes:
+            change = FakeChange(kind, FakeSnapshot(reference, data))
+            by_collection.setdefault(reference.collection, []).append(change)
+            for callback in list(self._document_watchers.get(reference.path, ())):
+                self.reads += 1
+                callback([change.document], [change], None)
+        for collection, collection_changes in by_collection.items():
+            for callback in list(self._collection_watchers.get(collection, ())):
+                self.reads += len(collection_changes)
+                callback([change.document for change in collection_changes], collection_changes, None)
+
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def get_all(self, references: List[FakeDocument]):
+        """Batched document read: one round trip"""
+        self.round_trips += 1
+        for reference in references:
+            self.reads += 1
+            yield FakeSnapshot(reference, self._docs(reference.collection).get(reference.id))
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction(self)
+
+    def clear(self):
+        """Drop every document"""
+        self.collections.clear()
+        self._indexes.clear()
+
+    def load(self, collection: str, documents: Dict[str, Dict[str, Any]]):
+        """Bulk-insert documents without counting them as writes"""
+        self._invalidate(collection)
+        self._docs(collection).update(documents)
+
+def _transactional(func):
+    """firestore.transactional for FakeTransaction: run once, then commit"""
+    def run(transaction, *args, **kwargs):
+        result = func(transaction, *args, **kwargs)
+        transaction.commit()
+        return result
+    return run
+
+def install(db: Optional[FakeFirestore] = None) -> FakeFirestore:
+    """Register db (or a new FakeFirestore) as app.db.firestore"""
+    db = db or FakeFirestore()
+    module = types.ModuleType("app.db.firestore")
+    module.firestore_db = types.SimpleNamespace(db=db)
+    module.get_db = lambda: db
+    module.get_collection = lambda name: db.collection(name)
+    module.get_document = lambda collection, doc_id: db.collection(collection).document(doc_id)
+    sys.modules["app.db.firestore"] = module
+
+    # Transactions on the fake have nothing to retry against
+    firestore.transactional = _transactional
+    return db
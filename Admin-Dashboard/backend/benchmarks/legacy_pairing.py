@@ -0,0 +1,23 @@
+"""
+Baseline pair validation for the benchmarks.
+
+Copy of the per-pair check SessionPairingService used before pairs were
+validated against a snapshot's parsed timestamps (is_valid_pair): both
+timestamps are parsed again for every pair.
+"""
+from typing import Any, Dict, Optional
+
+from app.services.session_pairing_service import SessionPairingService
+
+def is_valid_session_pair(pairing: SessionPairingService, entry_session: Dict[str, Any],
+                          exit_session: Dict[str, Any], verification: Optional[Dict[str, Any]]) -> bool:
+    """Check if a session pair is valid"""
+    if not verification:
+        return False
+    if not verification.get("isMatch"):
+        return False
+    entry_time = pairing._parse_timestamp(entry_session.get("timestamp"))
+    exit_time = pairing._parse_timestamp(exit_session.get("timestamp"))
+    if entry_time and exit_time and entry_time >= exit_time:
+        return False
+    return pairing._same_vehicle(entry_session, exit_session)
@@ -0,0 +1,86 @@
+"""
+Synthetic parking history for benchmarks.
+
+Generates In sessions, most of them followed by an Out session, a
+SessionMap pairing the two and a MatchingVerify result, shaped like the
+documents the gate devices and the AI services write: device sessions have
+a Firestore Timestamp, API sessions a local-time ISO string. Every session
+already has the createdAt the visit backfill stamps.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from benchmarks.fake_firestore import FakeFirestore
+
+def _plate(rng: random.Random) -> str:
+    return f"{rng.randint(10, 99)}{rng.choice('ABCDEFGHK')}-{rng.randint(10000, 99999)}"
+
+def _times(utc: datetime, device: bool) -> Dict[str, Any]:
+    """timestamp as the writer stores it, plus createdAt"""
+    timestamp = utc if device else utc.astimezone().replace(tzinfo=None).isoformat()
+    return {"timestamp": timestamp, "createdAt": utc}
+
+def generate(db: FakeFirestore, sessions: int, seed: int = 0, exit_ratio: float = 0.8,
+             match_ratio: float = 0.95, undetected_ratio: float = 0.02,
+             device_ratio: float = 0.5, days: int = 365) -> Dict[str, int]:
+    """
+    Fill db with about `sessions` Session documents plus their maps and verifications
+
+    Returns:
+        Number of documents written per collection
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    span = days * 86400
+    docs = {"Session": {}, "SessionMap": {}, "MatchingVerify": {}, "PlateMap": {}}
+
+    while len(docs["Session"]) < sessions:
+        entry_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        plate = "Detecting..." if rng.random() < undetected_ratio else _plate(rng)
+        face_index = f"face_{rng.randint(0, sessions)}"
+        entry_time = start + timedelta(seconds=rng.randint(0, span))
+        has_exit = rng.random() < exit_ratio and len(docs["Session"]) + 2 <= sessions
+        is_match = rng.random() < match_ratio
+        device = rng.random() < device_ratio
+
+        docs["Session"][entry_id] = {
+            "plateUrl": f"https://example.com/plates/{entry_id}.jpg",
+            "faceUrl": f"https://example.com/faces/{entry_id}.jpg",
+            "gate": "In",
+            **_times(entry_time, device),
+            "isOut": has_exit and is_match,
+            "faceIndex": face_index,
+            "plateNumber": plate
+        }
+        docs["PlateMap"][plate] = {"sessionID": entry_id}
+        if not has_exit:
+            continue
+
+        exit_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        exit_time = entry_time + timedelta(minutes=rng.randint(5, 600))
+        docs["Session"][exit_id] = {
+            "plateUrl": f"https://example.com/plates/{exit_id}.jpg",
+            "faceUrl": f"https://example.com/faces/{exit_id}.jpg",
+            "gate": "Out",
+            **_times(exit_time, device),
+            "isOut": False,
+            "faceIndex": face_index,
+            "plateNumber": plate
+        }
+        docs["MatchingVerify"][str(uuid.UUID(int=rng.getrandbits(128)))] = {
+            "sessionID": exit_id,
+            "isMatch": is_match
+        }
+        if is_match:
+            docs["SessionMap"][str(uuid.UUID(int=rng.getrandbits(128)))] = {
+                "entrySessionID": entry_id,
+                "exitSessionID": exit_id
+            }
+
+    for collection, collection_docs in docs.items():
+        db.load(collection, collection_docs)
+    total = max(10, sessions // 4)
+    db.load("ParkingMeta", {"slotCounter": {"total": total, "available": total}})
+    return {collection: len(collection_docs) for collection, collection_docs in docs.items()}
@@ -8,7 +8,9 @@ import type { GroupedSession, DashboardStats } from '../types/types'
 import type { SessionResponse } from '../services/apiService'
 import '../styles/dashboard.css'
 
-const REFRESH_INTERVAL = 3000 // 3 seconds
+const REFRESH_INTERVAL = 3000 // 3 seconds (fallback polling when the live stream is unavailable)
+const SESSIONS_REFRESH_DELAY = 1000 // coalesce bursts of session changes from the stream
+const PAGE_SIZE = 100
 
 const Dashboard: React.FC = () => {
   const [groupedSessions, setGroupedSessions] = useState<GroupedSession[]>([])
@@ -24,6 +26,17 @@ const Dashboard: React.FC = () => {
   const loadingRef = useRef(false)
   const [error, setError] = useState<string | null>(null)
   const [isAutoRefreshing, setIsAutoRefreshing] = useState(true)
+  const [nextPageToken, setNextPageToken] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  // Sessions loaded so far (refreshes reload as many, stream callbacks see the latest value)
+  const loadedCountRef = useRef(PAGE_SIZE)
+
+  const showSessions = (data: { sessions: GroupedSession[]; nextPageToken: string | null }) => {
+    loadedCountRef.current = Math.max(PAGE_SIZE, data.sessions.length)
+    setGroupedSessions(data.sessions)
+    setFilteredSessions(data.sessions)
+    setNextPageToken(data.nextPageToken)
+  }
 
   // Centralized function to load all dashboard data
   const loadDashboardData = async (mode: 'initial' | 'refresh' = 'refresh') => {
@@ -36,11 +49,10 @@ const Dashboard: React.FC = () => {
     try {
       const [statsData, sessionsData] = await Promise.all([
         apiService.getDashboardStats(),
-        apiService.getEnhancedGroupedSessions()
+        apiService.getEnhancedGroupedSessions(loadedCountRef.current, PAGE_SIZE)
       ])
       setStats(statsData)
-      setGroupedSessions(sessionsData)
-      setFilteredSessions(sessionsData)
+      showSessions(sessionsData)
     } catch (err) {
       console.error('Error loading dashboard data:', err)
       setError(err instanceof Error ? err.message : 'Failed to load dashboard data')
@@ -57,20 +69,59 @@ const Dashboard: React.FC = () => {
     await loadDashboardData()
   }
 
-  // Main useEffect for initial load and auto-refresh
+  // Reload only the session list (stats arrive through the live stream)
+  const loadSessions = async () => {
+    try {
+      showSessions(await apiService.getEnhancedGroupedSessions(loadedCountRef.current, PAGE_SIZE))
+    } catch (err) {
+      console.error('Error loading sessions:', err)
+    }
+  }
+
+  // Append the next page of older sessions
+  const loadMoreSessions = async () => {
+    if (!nextPageToken || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const page = await apiService.getEnhancedGroupedSessionsPage(PAGE_SIZE, nextPageToken)
+      showSessions({ sessions: [...groupedSessions, ...page.sessions], nextPageToken: page.nextPageToken })
+    } catch (err) {
+      console.error('Error loading more sessions:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // Main useEffect for initial load and live updates
   useEffect(() => {
     loadDashboardData('initial')
+    if (!isAutoRefreshing) return
 
-    // Set up auto-refresh every 3 seconds for real-time updates
-    const refreshInterval = setInterval(() => {
-      if (isAutoRefreshing) {
-        loadDashboardData('refresh')
-      }
-    }, REFRESH_INTERVAL) // Refresh every 3 seconds
+    let refreshInterval: ReturnType<typeof setInterval> | null = null
+    let sessionsTimer: ReturnType<typeof setTimeout> | null = null
+    const startPolling = () => {
+      if (!refreshInterval) refreshInterval = setInterval(() => loadDashboardData('refresh'), REFRESH_INTERVAL)
+    }
 
-    // Cleanup interval on unmount
+    // Stats are pushed by the server; the session list is refetched only when sessions change
+    const unsubscribe = typeof EventSource === 'undefined' ? (startPolling(), () => {}) : apiService.subscribeDashboardStream({
+      onStats: (statsData) => {
+        setStats(statsData)
+        if (refreshInterval) { clearInterval(refreshInterval); refreshInterval = null }
+      },
+      onSessionsChanged: () => {
+        if (sessionsTimer) clearTimeout(sessionsTimer)
+        sessionsTimer = setTimeout(loadSessions, SESSIONS_REFRESH_DELAY)
+      },
+      // EventSource reconnects by itself; poll meanwhile
+      onError: startPolling
+    })
+
+    // Cleanup on unmount
     return () => {
-      clearInterval(refreshInterval)
+      unsubscribe()
+      if (refreshInterval) clearInterval(refreshInterval)
+      if (sessionsTimer) clearTimeout(sessionsTimer)
     }
   }, [isAutoRefreshing]) // Re-run if auto-refresh setting changes
 
@@ -179,7 +230,13 @@ const Dashboard: React.FC = () => {
             <div className="dashboard-main">
               <div className="dashboard-left">
                 <SearchFilters onSearch={handleSearch} onClear={clearFilters} />
-                <VehicleHistory sessions={filteredSessions} onRefresh={() => loadDashboardData('refresh')} />
+                <VehicleHistory
+                  sessions={filteredSessions}
+                  onRefresh={() => loadDashboardData('refresh')}
+                  onLoadMore={loadMoreSessions}
+                  hasMore={!!nextPageToken}
+                  loadingMore={loadingMore}
+                />
               </div>
               <div className="dashboard-right">
                 <LiveSessions onNewSession={handleNewSession} />
@@ -8,9 +8,13 @@ import apiService from '../services/apiService'
 interface VehicleHistoryProps {
   sessions: GroupedSession[]
   onRefresh?: () => void | Promise<void>
+  // Shown as a "Load more" button while older sessions remain
+  onLoadMore?: () => void | Promise<void>
+  hasMore?: boolean
+  loadingMore?: boolean
 }
 
-const VehicleHistory: React.FC<VehicleHistoryProps> = ({ sessions, onRefresh }) => {
+const VehicleHistory: React.FC<VehicleHistoryProps> = ({ sessions, onRefresh, onLoadMore, hasMore, loadingMore }) => {
   const handleFinalize = async (exitSessionId?: string) => {
     if (!exitSessionId) return
     try {
@@ -187,6 +191,14 @@ const VehicleHistory: React.FC<VehicleHistoryProps> = ({ sessions, onRefresh })
           </tbody>
         </table>
       </div>
+
+      {onLoadMore && hasMore && (
+        <div className="load-more">
+          <button className="load-more-button" onClick={() => onLoadMore()} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -1,16 +1,22 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import VehicleHistory from './VehicleHistory'
 import SearchFilters from './SearchFilters'
 import apiService from '../services/apiService'
 import type { GroupedSession } from '../types/types'
 import '../styles/dashboard.css'
 
+const PAGE_SIZE = 100
+
 const VehicleHistoryPage: React.FC = () => {
   const [groupedSessions, setGroupedSessions] = useState<GroupedSession[]>([])
   const [filteredSessions, setFilteredSessions] = useState<GroupedSession[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [isAutoRefreshing, setIsAutoRefreshing] = useState(true)
+  const [nextPageToken, setNextPageToken] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  // Sessions loaded so far (refreshes reload as many, the interval sees the latest value)
+  const loadedCountRef = useRef(PAGE_SIZE)
 
   // Centralized function to load vehicle history data
     const loadVehicleData = async () => {
@@ -19,11 +25,13 @@ const VehicleHistoryPage: React.FC = () => {
         setError(null);
 
         console.log('Loading vehicle data with enhanced API...');
-        const data = await apiService.getEnhancedGroupedSessions(); // Use enhanced API
-        console.log('Loaded', data.length, 'enhanced sessions');
+        const data = await apiService.getEnhancedGroupedSessions(loadedCountRef.current, PAGE_SIZE);
+        console.log('Loaded', data.sessions.length, 'enhanced sessions');
 
-        setGroupedSessions(data);
-        setFilteredSessions(data);
+        loadedCountRef.current = Math.max(PAGE_SIZE, data.sessions.length);
+        setGroupedSessions(data.sessions);
+        setFilteredSessions(data.sessions);
+        setNextPageToken(data.nextPageToken);
 
       } catch (err) {
         console.error('Error loading vehicle data:', err);
@@ -31,7 +39,27 @@ const VehicleHistoryPage: React.FC = () => {
       } finally {
         setLoading(false);
       }
-    };  useEffect(() => {
+    };
+
+  // Append the next page of older sessions
+  const loadMoreSessions = async () => {
+    if (!nextPageToken || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const page = await apiService.getEnhancedGroupedSessionsPage(PAGE_SIZE, nextPageToken)
+      const sessions = [...groupedSessions, ...page.sessions]
+      loadedCountRef.current = sessions.length
+      setGroupedSessions(sessions)
+      setFilteredSessions(sessions)
+      setNextPageToken(page.nextPageToken)
+    } catch (err) {
+      console.error('Error loading more sessions:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  useEffect(() => {
     // Initial load
     loadVehicleData()
 
@@ -164,7 +192,13 @@ const VehicleHistoryPage: React.FC = () => {
         </div>
 
         <SearchFilters onSearch={handleSearch} onClear={clearFilters} />
-        <VehicleHistory sessions={filteredSessions} onRefresh={loadVehicleData} />
+        <VehicleHistory
+          sessions={filteredSessions}
+          onRefresh={loadVehicleData}
+          onLoadMore={loadMoreSessions}
+          hasMore={!!nextPageToken}
+          loadingMore={loadingMore}
+        />
       </div>
     </div>
   )
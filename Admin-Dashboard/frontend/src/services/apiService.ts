@@ -121,24 +121,41 @@ class ApiService {
   }
 
   // ---------------- Enhanced Grouping ----------------
-  async getEnhancedGroupedSessions(): Promise<GroupedSession[]> {
+  // Newest first, one page at a time; pass nextPageToken back to get the following page
+  async getEnhancedGroupedSessionsPage(limit: number = 100, pageToken?: string | null): Promise<{ sessions: GroupedSession[]; nextPageToken: string | null }> {
+    const params = new URLSearchParams();
+    params.append('limit', limit.toString());
+    if (pageToken) params.append('page_token', pageToken);
+    const response = await fetch(`${this.baseURL}/api/sessions/enhanced?${params}`);
+    if (!response.ok) throw new Error('Failed to fetch enhanced sessions');
+    const data = await response.json();
+    const sessions = data.map((s: any): GroupedSession => ({
+      faceId: s.faceId,
+      licensePlate: s.licensePlate,
+      entryTime: s.entryTime ? new Date(s.entryTime) : null,
+      exitTime: s.exitTime ? new Date(s.exitTime) : null,
+      status: s.status, duration: s.duration,
+      entrySessionId: s.entrySessionId, entryGate: 'In', faceUrl: s.faceUrl, plateUrl: s.plateUrl,
+      exitSessionId: s.exitSessionId, exitGate: 'Out', exitFaceUrl: s.exitFaceUrl, exitPlateUrl: s.exitPlateUrl,
+      faceMatchVerified: s.faceMatchVerified, faceMatchResult: s.faceMatchResult
+    }));
+    return { sessions, nextPageToken: response.headers.get('X-Next-Page-Token') };
+  }
+  // Newest sessions, following page tokens until at least minCount are loaded (or the history ends);
+  // nextPageToken continues after them
+  async getEnhancedGroupedSessions(minCount: number = 100, pageSize: number = 100): Promise<{ sessions: GroupedSession[]; nextPageToken: string | null }> {
     try {
-      const response = await fetch(`${this.baseURL}/api/sessions/enhanced`);
-      if (!response.ok) throw new Error('Failed to fetch enhanced sessions');
-      const data = await response.json();
-      return data.map((s: any): GroupedSession => ({
-        faceId: s.faceId,
-        licensePlate: s.licensePlate,
-        entryTime: s.entryTime ? new Date(s.entryTime) : null,
-        exitTime: s.exitTime ? new Date(s.exitTime) : null,
-        status: s.status, duration: s.duration,
-        entrySessionId: s.entrySessionId, entryGate: 'In', faceUrl: s.faceUrl, plateUrl: s.plateUrl,
-        exitSessionId: s.exitSessionId, exitGate: 'Out', exitFaceUrl: s.exitFaceUrl, exitPlateUrl: s.exitPlateUrl,
-        faceMatchVerified: s.faceMatchVerified, faceMatchResult: s.faceMatchResult
-      }));
+      const sessions: GroupedSession[] = [];
+      let nextPageToken: string | null = null;
+      do {
+        const page = await this.getEnhancedGroupedSessionsPage(pageSize, nextPageToken);
+        sessions.push(...page.sessions);
+        nextPageToken = page.nextPageToken;
+      } while (nextPageToken && sessions.length < minCount);
+      return { sessions, nextPageToken };
     } catch (e) {
       console.error('Enhanced grouping failed, fallback to naive:', e);
-      return this.getGroupedSessions();
+      return { sessions: await this.getGroupedSessions(), nextPageToken: null };
     }
   }
 
@@ -168,6 +185,25 @@ class ApiService {
     } catch (e) { console.error('Naive grouping error:', e); return [] }
   }
 
+  // ---------------- Live stream ----------------
+  // Server-sent events: a 'snapshot' on connect, then 'delta' events with only the changed stats.
+  // Every open dashboard is served from the same Firestore listener on the backend.
+  subscribeDashboardStream(handlers: { onStats: (stats: DashboardStats) => void; onSessionsChanged?: () => void; onError?: () => void }): () => void {
+    const source = new EventSource(`${this.baseURL}/api/dashboard/stream`);
+    let current: DashboardStats | null = null;
+    source.addEventListener('snapshot', (event) => {
+      const message = JSON.parse((event as MessageEvent).data);
+      current = message.stats; handlers.onStats(message.stats); handlers.onSessionsChanged?.();
+    });
+    source.addEventListener('delta', (event) => {
+      const message = JSON.parse((event as MessageEvent).data);
+      if (current && Object.keys(message.stats).length) { current = { ...current, ...message.stats }; handlers.onStats(current) }
+      if (message.collection !== 'ParkingMeta') handlers.onSessionsChanged?.();
+    });
+    source.onerror = () => handlers.onError?.();
+    return () => source.close();
+  }
+
   // ---------------- Polling ----------------
   async pollForNewSessions(callback: (sessions: SessionResponse[]) => void, interval: number = 5000) {
     const poll = async () => { try { const st = await this.getNewSessionStatus(); if (st?.status) { const recent = await this.getSessions(undefined, 10); callback(recent) } } catch(e){ console.error('Polling error:', e) } };